@@ -0,0 +1,325 @@
+"""
+API latency benchmark for the station and bbox endpoints.
+
+    python -m benchmarks.api --seed --grid 200x300 --wave-stations 50000 --archive-cycles 20
+    python -m benchmarks.api --requests 2000 --concurrency 8 --json api.json
+
+--seed loads `--archive-cycles` synthetic cycles (12 hours apart) of both
+apps through the ETLs into the database of config.settings, so the last
+one is the forecast and the archive holds ~12h per cycle. Point settings
+at a local PostGIS: seeding truncates the forecast tables.
+
+The replay sends a fixed mix of point and bbox queries, generated from
+--random-seed, so runs on different commits see the same requests. The
+requests go through the full Django/DRF stack in-process (django.test
+Client), `--concurrency` threads at a time, each with its own database
+connection. For every request the SQL is timed with an execute wrapper:
+"db ms" is the time spent in cursor.execute, "other ms" the rest of the
+request (view code, serialization, rendering), and "queries" the number
+of statements. The response cache is an empty local-memory cache; with
+--warm the mix is replayed once before measuring, to measure cache hits.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import write_wind_netcdf, write_wave_tabs
+
+# نسبت درخواست‌ها در ترکیب پیش‌فرض
+DEFAULT_MIX = {
+    'wind.forecast.station': 30,
+    'wind.forecast.bbox': 10,
+    'wind.archive.station': 8,
+    'wind.archive.bbox': 2,
+    'wave.forecast.station': 30,
+    'wave.forecast.bbox': 10,
+    'wave.archive.station': 8,
+    'wave.archive.bbox': 2,
+}
+
+ENDPOINTS = {
+    'wind.forecast.station': '/api/wind/v1/windforecast/station/',
+    'wind.forecast.bbox': '/api/wind/v1/windforecast/bbox/',
+    'wind.archive.station': '/api/wind/v1/windarchive/station/',
+    'wind.archive.bbox': '/api/wind/v1/windarchive/bbox/',
+    'wave.forecast.station': '/api/wave/v1/waveforecast/station/',
+    'wave.forecast.bbox': '/api/wave/v1/waveforecast/bbox/',
+    'wave.archive.station': '/api/wave/v1/wavearchive/station/',
+    'wave.archive.bbox': '/api/wave/v1/wavearchive/bbox/',
+}
+
+BBOX_MAX_DEGREES = 0.5
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def _setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _grid(value):
+    n_lat, n_lon = value.lower().split('x')
+    return int(n_lat), int(n_lon)
+
+
+def _mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, weight = item.split('=')
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r} (one of {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight)
+    return mix
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='Load synthetic cycles into the database first')
+    parser.add_argument('--grid', type=_grid, default=(100, 150), help='Wind grid as LATxLON for --seed (default 100x150)')
+    parser.add_argument('--hours', type=int, default=72, help='Time steps per seeded cycle (default 72)')
+    parser.add_argument('--wave-stations', type=int, default=20000, help='Wave sea points for --seed (default 20000)')
+    parser.add_argument('--archive-cycles', type=int, default=10, help='Cycles loaded by --seed (default 10)')
+    parser.add_argument('--requests', type=int, default=1000, help='Requests to replay (default 1000)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent requests (default 4)')
+    parser.add_argument('--mix', type=_mix, default=DEFAULT_MIX, help='Request mix as endpoint=weight,...')
+    parser.add_argument('--bbox-size', type=float, default=0.25, help=f'bbox edge in degrees (max {BBOX_MAX_DEGREES})')
+    parser.add_argument('--window-hours', type=int, default=24, help='Time range of each query (default 24)')
+    parser.add_argument('--random-seed', type=int, default=0, help='Seed of the request mix (default 0)')
+    parser.add_argument('--warm', action='store_true', help='Replay the mix once before measuring (cache hits)')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this file')
+    return parser.parse_args(argv)
+
+
+# ---------- seeding ----------
+
+def seed_database(args):
+    from windforecastapp.utils.ETL_wind_utils import etl_netcdf_to_db
+    from waveforecastapp.utils.ETL_wave_utils import etl_csv_to_db
+
+    n_lat, n_lon = args.grid
+    last = pd.Timestamp.now(tz='UTC').tz_localize(None).floor('12h')
+    starts = [last - pd.Timedelta(hours=12 * i) for i in reversed(range(args.archive_cycles))]
+    with tempfile.TemporaryDirectory() as workdir:
+        nc_path = os.path.join(workdir, 'wind.nc')
+        tab01 = os.path.join(workdir, 'tab01.csv')
+        tab41 = os.path.join(workdir, 'tab41.csv')
+        for i, start in enumerate(starts, 1):
+            sys.stderr.write(f"seeding cycle {i}/{len(starts)} ({start})\n")
+            write_wind_netcdf(nc_path, n_lat, n_lon, args.hours, start, seed=i)
+            etl_netcdf_to_db(nc_path, time_block=1, copy_format='binary')
+            write_wave_tabs(tab01, tab41, args.wave_stations, args.hours, start, seed=i)
+            etl_csv_to_db(tab01, tab41, copy_format='binary')
+
+
+# ---------- request mix ----------
+
+def _extent(model):
+    from common.utils.station_registry import load_station_coords
+    _, lat, lon = load_station_coords(model)
+    if not lat.size:
+        raise RuntimeError(f"{model._meta.db_table} is empty; run with --seed first")
+    return lat.min(), lat.max(), lon.min(), lon.max()
+
+
+def _time_span(model):
+    from django.db.models import Min, Max
+    span = model.objects.aggregate(first=Min('forecast_time'), last=Max('forecast_time'))
+    if span['first'] is None:
+        raise RuntimeError(f"{model._meta.db_table} is empty; run with --seed first")
+    return pd.Timestamp(span['first']).tz_convert(None), pd.Timestamp(span['last']).tz_convert(None)
+
+
+def build_requests(args):
+    """[(endpoint name, query params)] of the replay, reproducible from --random-seed."""
+    from windforecastapp.models import WindStationModel, WindForecastModel, WindArchiveModel
+    from waveforecastapp.models import WaveStationModel, WaveForecastModel, WaveArchiveModel
+
+    context = {
+        'wind': (_extent(WindStationModel), {'forecast': _time_span(WindForecastModel), 'archive': _time_span(WindArchiveModel)}),
+        'wave': (_extent(WaveStationModel), {'forecast': _time_span(WaveForecastModel), 'archive': _time_span(WaveArchiveModel)}),
+    }
+    rng = np.random.default_rng(args.random_seed)
+    names = list(args.mix)
+    weights = np.array([args.mix[name] for name in names], dtype=float)
+    chosen = rng.choice(len(names), size=args.requests, p=weights / weights.sum())
+    size = min(args.bbox_size, BBOX_MAX_DEGREES)
+    window = pd.Timedelta(hours=args.window_hours)
+
+    requests = []
+    for index in chosen:
+        name = names[index]
+        app, table, kind = name.split('.')
+        (min_lat, max_lat, min_lon, max_lon), spans = context[app]
+        first, last = spans[table]
+        offset = rng.uniform(0, max((last - first - window).total_seconds(), 0))
+        start = (first + pd.Timedelta(seconds=offset)).floor('h')
+        end = start + window
+
+        if kind == 'station':
+            params = {
+                'lat': round(rng.uniform(min_lat, max_lat), 4),
+                'lon': round(rng.uniform(min_lon, max_lon), 4),
+                'startdate': start.strftime(TIME_FORMAT),
+                'enddate': end.strftime(TIME_FORMAT),
+            }
+        else:
+            lat0 = rng.uniform(min_lat, max(min_lat, max_lat - size))
+            lon0 = rng.uniform(min_lon, max(min_lon, max_lon - size))
+            params = {
+                'min_lat': round(lat0, 4), 'max_lat': round(lat0 + size, 4),
+                'min_lon': round(lon0, 4), 'max_lon': round(lon0 + size, 4),
+                'start_date': start.strftime(TIME_FORMAT),
+                'end_date': end.strftime(TIME_FORMAT),
+            }
+        requests.append((name, params))
+    return requests
+
+
+# ---------- replay ----------
+
+class _QueryTimer:
+    """execute_wrapper that sums the time and number of the statements of one request."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+_local = threading.local()
+
+
+def _client():
+    from django.test import Client
+    if not hasattr(_local, 'client'):
+        _local.client = Client(HTTP_HOST='localhost')
+    return _local.client
+
+
+def send(request):
+    from django.db import connection
+    name, params = request
+    timer = _QueryTimer()
+    start = time.perf_counter()
+    with connection.execute_wrapper(timer):
+        response = _client().get(ENDPOINTS[name], params)
+        # پاسخ‌های stream شده هم کامل خوانده می‌شوند
+        size = len(b''.join(response.streaming_content)) if response.streaming else len(response.content)
+    total = time.perf_counter() - start
+    return {
+        'endpoint': name,
+        'status': response.status_code,
+        'total_ms': total * 1000,
+        'db_ms': timer.seconds * 1000,
+        'queries': timer.queries,
+        'bytes': size,
+    }
+
+
+def _close_connection(_):
+    from django.db import connection
+    connection.close()
+
+
+def replay(requests, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        samples = list(pool.map(send, requests))
+        elapsed = time.perf_counter() - start
+        list(pool.map(_close_connection, range(concurrency)))
+    return samples, elapsed
+
+
+def summarize(samples):
+    frame = pd.DataFrame(samples)
+    frame['other_ms'] = frame['total_ms'] - frame['db_ms']
+    rows = []
+    for name, group in [*frame.groupby('endpoint', sort=True), ('all', frame)]:
+        total = group['total_ms']
+        rows.append({
+            'endpoint': name,
+            'requests': int(len(group)),
+            'errors': int((group['status'] >= 400).sum()),
+            'p50_ms': round(float(total.quantile(0.50)), 2),
+            'p90_ms': round(float(total.quantile(0.90)), 2),
+            'p99_ms': round(float(total.quantile(0.99)), 2),
+            'db_ms': round(float(group['db_ms'].mean()), 2),
+            'other_ms': round(float(group['other_ms'].mean()), 2),
+            'queries': round(float(group['queries'].mean()), 2),
+            'kb': round(float(group['bytes'].mean()) / 1024, 1),
+        })
+    return rows
+
+
+def print_summary(rows, elapsed, stream=sys.stdout):
+    stream.write(
+        f"{'endpoint':<24}{'n':>6}{'err':>5}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}"
+        f"{'db ms':>9}{'other ms':>10}{'queries':>9}{'KB':>8}\n"
+    )
+    for row in rows:
+        stream.write(
+            f"{row['endpoint']:<24}{row['requests']:>6}{row['errors']:>5}{row['p50_ms']:>9.1f}{row['p90_ms']:>9.1f}"
+            f"{row['p99_ms']:>9.1f}{row['db_ms']:>9.1f}{row['other_ms']:>10.1f}{row['queries']:>9.1f}{row['kb']:>8.1f}\n"
+        )
+    total = next(row['requests'] for row in rows if row['endpoint'] == 'all')
+    stream.write(f"{total} requests in {elapsed:.2f} s ({total / elapsed:.1f} req/s)\n")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    _setup_django()
+    from django.test.utils import override_settings
+
+    if args.seed:
+        seed_database(args)
+
+    # کش فایل سرور دست نمی‌خورد؛ هر اجرا با کش خالی شروع می‌شود
+    with override_settings(
+        ALLOWED_HOSTS=['localhost'],
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'api-benchmark'}},
+    ):
+        requests = build_requests(args)
+        if args.warm:
+            replay(requests, args.concurrency)
+        samples, elapsed = replay(requests, args.concurrency)
+
+    rows = summarize(samples)
+    print_summary(rows, elapsed)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'commit': _git_commit(),
+                'args': {k: v for k, v in vars(args).items() if k not in ('json', 'seed')},
+                'elapsed_s': round(elapsed, 3),
+                'results': rows,
+            }, f, indent=2, default=str)
+    return rows
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+ETL benchmark: rows/s and peak RSS of each ingestion stage on synthetic data.
+
+    python -m benchmarks.etl --grid 200x300 --hours 72 --wave-stations 50000
+    python -m benchmarks.etl --db --workers 4 --json results.json
+
+Without --db only the read/reshape stages run. With --db the full ETLs
+run against the DATABASES of config.settings (point it at a local
+PostGIS): they TRUNCATE the forecast tables and append to the archive.
+Every DB stage loads its own cycle, 12 hours after the previous one, so
+the archive append is measured too.
+
+Each stage runs in a fresh spawned process, so its peak RSS (ru_maxrss of
+the stage process and of the ETL workers it starts) is its own.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+from benchmarks.synthetic import write_wind_netcdf, write_wave_tabs
+
+
+def _init_stage():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _peak_rss_mb():
+    # لینوکس: KB
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def wind_read(nc_path):
+    import xarray as xr
+    from windforecastapp.utils.ETL_wind_utils import grid_stations, grid_to_station_frame, drop_duplicate_times
+    with xr.open_dataset(nc_path) as ds:
+        ds = drop_duplicate_times(ds)
+        station_ids = grid_stations(ds['lat'].values, ds['lon'].values)['station_id'].to_numpy()
+        grid_to_station_frame(ds, station_ids)
+
+
+def wind_etl(nc_path, **options):
+    from windforecastapp.utils.ETL_wind_utils import etl_netcdf_to_db
+    etl_netcdf_to_db(nc_path, **options)
+
+
+def wave_read(tab01_path, tab41_path):
+    from waveforecastapp.utils.wave_csv import read_wave_tabs
+    read_wave_tabs(tab01_path, tab41_path)
+
+
+def wave_etl(tab01_path, tab41_path, **options):
+    from waveforecastapp.utils.ETL_wave_utils import etl_csv_to_db
+    etl_csv_to_db(tab01_path, tab41_path, **options)
+
+
+def _measure(func, args, options):
+    start = time.perf_counter()
+    func(*args, **options)
+    return time.perf_counter() - start, _peak_rss_mb()
+
+
+def run_stage(name, func, args, rows, options=None):
+    """Run one stage in its own process; returns its result row."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_stage) as pool:
+        seconds, peak_rss = pool.submit(_measure, func, args, options or {}).result()
+    return {
+        'stage': name,
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_s': round(rows / seconds) if seconds else None,
+        'peak_rss_mb': round(peak_rss, 1),
+    }
+
+
+def _grid(value):
+    n_lat, n_lon = value.lower().split('x')
+    return int(n_lat), int(n_lon)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--grid', type=_grid, default=(100, 150), help='Wind grid as LATxLON (default 100x150)')
+    parser.add_argument('--hours', type=int, default=72, help='Time steps per cycle (default 72)')
+    parser.add_argument('--wave-stations', type=int, default=20000, help='Wave sea points (default 20000)')
+    parser.add_argument('--start', type=str, default=None, help='First cycle time (default: the current 12h cycle)')
+    parser.add_argument('--db', action='store_true', help='Also run the full ETLs against the configured database')
+    parser.add_argument('--workers', type=int, default=0, help='Add --workers N stages to the DB run')
+    parser.add_argument('--only', choices=['wind', 'wave'], default=None, help='Benchmark one app only')
+    parser.add_argument('--workdir', type=str, default=None, help='Where to write the synthetic files (default: a temp dir)')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this file')
+    return parser.parse_args(argv)
+
+
+def build_stages(args, workdir):
+    """[(name, func, args, rows, options)] with their synthetic input files written."""
+    n_lat, n_lon = args.grid
+    start = pd.Timestamp(args.start) if args.start else pd.Timestamp.now(tz='UTC').tz_localize(None).floor('12h')
+    cycles = iter(start + pd.Timedelta(hours=12 * i) for i in range(1000))
+    stages = []
+
+    if args.only in (None, 'wind'):
+        wind_variants = [('wind.read', wind_read, {})]
+        if args.db:
+            wind_variants += [
+                ('wind.etl.csv', wind_etl, {}),
+                ('wind.etl.binary', wind_etl, {'copy_format': 'binary'}),
+                ('wind.etl.stream', wind_etl, {'time_block': 1, 'copy_format': 'binary'}),
+                ('wind.etl.series', wind_etl, {'time_block': 1, 'storage': 'series'}),
+                ('wind.etl.bulk', wind_etl, {'copy_format': 'binary', 'load_mode': 'bulk'}),
+            ]
+            if args.workers > 1:
+                wind_variants.append((f'wind.etl.workers{args.workers}', wind_etl, {'workers': args.workers, 'copy_format': 'binary'}))
+        for name, func, options in wind_variants:
+            path = os.path.join(workdir, f'{name}.nc')
+            rows = write_wind_netcdf(path, n_lat, n_lon, args.hours, next(cycles))
+            stages.append((name, func, (path,), rows, options))
+
+    if args.only in (None, 'wave'):
+        wave_variants = [('wave.read', wave_read, {})]
+        if args.db:
+            wave_variants += [
+                ('wave.etl.csv', wave_etl, {}),
+                ('wave.etl.binary', wave_etl, {'copy_format': 'binary'}),
+                ('wave.etl.swap', wave_etl, {'copy_format': 'binary', 'load_mode': 'swap'}),
+                ('wave.etl.bulk', wave_etl, {'copy_format': 'binary', 'load_mode': 'bulk'}),
+            ]
+            if args.workers > 1:
+                wave_variants.append((f'wave.etl.workers{args.workers}', wave_etl, {'workers': args.workers, 'copy_format': 'binary'}))
+        for name, func, options in wave_variants:
+            tab01 = os.path.join(workdir, f'{name}.tab01.csv')
+            tab41 = os.path.join(workdir, f'{name}.tab41.csv')
+            rows = write_wave_tabs(tab01, tab41, args.wave_stations, args.hours, next(cycles))
+            stages.append((name, func, (tab01, tab41), rows, options))
+
+    return stages
+
+
+def print_results(results, stream=sys.stdout):
+    stream.write(f"{'stage':<24}{'rows':>12}{'seconds':>10}{'rows/s':>12}{'peak RSS MB':>14}\n")
+    for row in results:
+        stream.write(
+            f"{row['stage']:<24}{row['rows']:>12}{row['seconds']:>10.2f}"
+            f"{row['rows_per_s'] or 0:>12}{row['peak_rss_mb']:>14.1f}\n"
+        )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        stages = build_stages(args, workdir)
+        results = []
+        for name, func, stage_args, rows, options in stages:
+            results.append(run_stage(name, func, stage_args, rows, options))
+            print_results(results[-1:], sys.stderr)
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': {k: v for k, v in vars(args).items() if k != 'json'}, 'results': results}, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Synthetic inputs for the ETL benchmarks, shaped like the real cycle files:
+
+- a merged wind netCDF (time, lat, lon) with the variables etl_netcdf_to_db
+  reads (T2, WS10, wind_direction, WG10, WS50, WG50, plus u10/v10),
+- a tab01.csv / tab41.csv pair for etl_csv_to_db, with the units row after
+  the header and the rows in time-major blocks, as the model writes them.
+"""
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+TAB_TIME_FORMAT = '%Y/%m/%d %H:%M:%S'
+
+
+def cycle_times(start, n_time, freq='h'):
+    return pd.date_range(pd.Timestamp(start), periods=n_time, freq=freq)
+
+
+def write_wind_netcdf(path, n_lat, n_lon, n_time, start, seed=0):
+    """Merged wind file with an n_lat x n_lon grid and n_time hourly steps."""
+    rng = np.random.default_rng(seed)
+    shape = (n_time, n_lat, n_lon)
+    u10 = rng.normal(0, 5, shape).astype(np.float32)
+    v10 = rng.normal(0, 5, shape).astype(np.float32)
+    ws10 = np.sqrt(u10 ** 2 + v10 ** 2)
+    ws50 = ws10 * 1.1488
+    variables = {
+        'u10': u10,
+        'v10': v10,
+        'T2': rng.normal(295, 8, shape).astype(np.float32),
+        'WS10': ws10,
+        'wind_direction': (np.arctan2(-u10, -v10) * 180 / np.pi) % 360,
+        'WG10': ws10 * 1.3,
+        'WS50': ws50,
+        'WG50': ws50 * 1.3,
+    }
+    ds = xr.Dataset(
+        {name: (['time', 'lat', 'lon'], values) for name, values in variables.items()},
+        coords={
+            'time': cycle_times(start, n_time),
+            'lat': np.round(np.linspace(24.0, 40.0, n_lat), 5),
+            'lon': np.round(np.linspace(44.0, 63.0, n_lon), 5),
+        },
+    )
+    ds.to_netcdf(path)
+    return n_lat * n_lon * n_time
+
+
+def write_wave_tabs(tab01_path, tab41_path, n_stations, n_time, start, seed=0):
+    """tab01/tab41 pair for n_stations sea points and n_time hourly steps."""
+    rng = np.random.default_rng(seed)
+    lat = np.round(rng.uniform(24.0, 30.0, n_stations), 4)
+    lon = np.round(rng.uniform(48.0, 60.0, n_stations), 4)
+    times = cycle_times(start, n_time).strftime(TAB_TIME_FORMAT)
+    n_rows = n_stations * n_time
+
+    tab01 = pd.DataFrame({
+        'Time': np.repeat(times.to_numpy(), n_stations),
+        'Long': np.tile(lon, n_time),
+        'Lat': np.tile(lat, n_time),
+        'Tp': np.round(rng.uniform(2, 14, n_rows), 2),
+        'Depth': np.tile(np.round(rng.uniform(5, 3000, n_stations), 1), n_time),
+    })
+    tab41 = pd.DataFrame({
+        'Hs': np.round(rng.gamma(2.0, 0.5, n_rows), 3),
+        'Tr': np.round(rng.uniform(2, 12, n_rows), 2),
+        'Dir': np.round(rng.uniform(0, 360, n_rows), 1),
+        'Spr': np.round(rng.uniform(10, 40, n_rows), 1),
+    })
+    _write_tab(tab01_path, tab01, ['', 'deg', 'deg', 's', 'm'])
+    _write_tab(tab41_path, tab41, ['m', 's', 'deg', 'deg'])
+    return n_rows
+
+
+def _write_tab(path, frame, units):
+    with open(path, 'w', newline='') as f:
+        f.write(','.join(frame.columns) + '\n')
+        f.write(','.join(units) + '\n')
+        frame.to_csv(f, header=False, index=False)
@@ -0,0 +1,8 @@
+from django.db import models
+
+
+class RealField(models.FloatField):
+    """FloatField stored as a 4-byte PostgreSQL real instead of double precision."""
+
+    def db_type(self, connection):
+        return 'real'
@@ -0,0 +1,28 @@
+# Creates the etl_state key/value table the ETLs keep their bookkeeping in
+# (station grid hashes, archive high-water marks, cycle and station versions).
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EtlStateModel',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='key')),
+                ('value', models.TextField(verbose_name='value')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated_at')),
+            ],
+            options={
+                'verbose_name': 'etl state',
+                'verbose_name_plural': 'etl states',
+                'db_table': 'etl_state',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+# Create your models here.
+
+class EtlStateModel(models.Model):
+    # کلید/مقدارهایی که ETLها بین اجراها نگه می‌دارند (hash شبکه‌ی ایستگاه‌ها، watermark آرشیو، نسخه‌ی سیکل، ...)
+    key = models.CharField(max_length=255, primary_key=True, verbose_name=_("key"))
+    value = models.TextField(verbose_name=_("value"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated_at"))
+
+    class Meta:
+        db_table = 'etl_state'
+        verbose_name = _("etl state")
+        verbose_name_plural = _("etl states")
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
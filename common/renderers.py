@@ -0,0 +1,64 @@
+import json
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from common.utils.arrow_export import ARROW_MEDIA_TYPE, PARQUET_MEDIA_TYPE
+from common.utils.json_stream import NDJSON_MEDIA_TYPE
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """JSON renderer selected with ?format=columnar; the view builds the columnar payload."""
+    format = 'columnar'
+
+
+class _StreamedFormatRenderer(BaseRenderer):
+    """
+    Selected with ?format=arrow / parquet / ndjson. The view streams the body
+    itself; only error payloads reach render() and are returned as JSON.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return json.dumps(data, default=str).encode()
+
+
+class ArrowStreamRenderer(_StreamedFormatRenderer):
+    media_type = ARROW_MEDIA_TYPE
+    format = 'arrow'
+
+
+class ParquetRenderer(_StreamedFormatRenderer):
+    media_type = PARQUET_MEDIA_TYPE
+    format = 'parquet'
+
+
+class NDJSONRenderer(_StreamedFormatRenderer):
+    media_type = NDJSON_MEDIA_TYPE
+    format = 'ndjson'
+
+
+STATION_RENDERER_CLASSES = list(api_settings.DEFAULT_RENDERER_CLASSES) + [ArrowStreamRenderer, ParquetRenderer]
+BBOX_RENDERER_CLASSES = STATION_RENDERER_CLASSES + [ColumnarJSONRenderer]
+ARCHIVE_BBOX_RENDERER_CLASSES = BBOX_RENDERER_CLASSES + [NDJSONRenderer]
+
+
+def _accepted_format(request):
+    return getattr(request.accepted_renderer, 'format', None)
+
+
+def is_columnar(request):
+    return _accepted_format(request) == ColumnarJSONRenderer.format
+
+
+def binary_export_format(request):
+    """'arrow' or 'parquet' when one of the binary formats was requested, else None."""
+    output_format = _accepted_format(request)
+    return output_format if output_format in (ArrowStreamRenderer.format, ParquetRenderer.format) else None
+
+
+def json_stream_format(request):
+    """'json' or 'ndjson' when the response can be streamed as plain JSON, else None (e.g. browsable API)."""
+    output_format = _accepted_format(request)
+    return output_format if output_format in (JSONRenderer.format, NDJSONRenderer.format) else None
@@ -0,0 +1,53 @@
+from rest_framework import serializers
+from common.utils.batch_query import MAX_BATCH_POINTS
+from common.utils.station_resolver import get_station_resolver
+
+
+class BatchPointSerializer(serializers.Serializer):
+    name = serializers.CharField(required=False)
+    lat = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    lon = serializers.FloatField(required=False, min_value=-180, max_value=360)
+
+    def validate(self, attrs):
+        if not attrs.get('name') and ('lat' not in attrs or 'lon' not in attrs):
+            raise serializers.ValidationError("Please provide 'name' or 'lat' and 'lon'")
+        return attrs
+
+
+class BatchForecastRequestSerializer(serializers.Serializer):
+    points = BatchPointSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_POINTS)
+    startdate = serializers.DateTimeField()
+    enddate = serializers.DateTimeField()
+
+
+class StationLookupSerializer(serializers.ModelSerializer):
+    """
+    Base of the forecast/archive row serializers: station_name, latitude and
+    longitude come from the in-process station lookup (station_resolver)
+    by station_id, so the rows are read without a join and no geometry is
+    built per row. A station added after the lookup was loaded is read
+    through the relation.
+    """
+    station_name = serializers.SerializerMethodField()
+    latitude = serializers.SerializerMethodField()
+    longitude = serializers.SerializerMethodField()
+
+    def _station(self, obj):
+        if getattr(self, '_row', None) is not obj:
+            if not hasattr(self, '_stations'):
+                station_model = self.Meta.model._meta.get_field('station').related_model
+                self._stations = get_station_resolver(station_model)
+            info = self._stations.station_info(obj.station_id)
+            if info is None:
+                info = obj.station.name, obj.station.location.y, obj.station.location.x
+            self._row, self._info = obj, info
+        return self._info
+
+    def get_station_name(self, obj):
+        return self._station(obj)[0]
+
+    def get_latitude(self, obj):
+        return self._station(obj)[1]
+
+    def get_longitude(self, obj):
+        return self._station(obj)[2]
@@ -0,0 +1,427 @@
+import io
+import struct
+from unittest import mock
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from common.utils.binary_copy import encode_binary_copy, shortest_float64, PGCOPY_HEADER, PGCOPY_TRAILER, POSTGRES_EPOCH
+from common.utils.station_registry import coordinate_keys, station_grid_hash, factorize_coordinates, station_time_order
+from common.utils.staging import retarget_index_definition
+from common.utils.partitions import partition_start, partition_name
+from common.utils.station_resolver import StationResolver, _unit_vectors, lookup_stations
+from common.utils.response_cache import response_cache_key
+from common.utils.json_stream import iter_row_batches, should_stream
+from common.renderers import ColumnarJSONRenderer
+
+# Create your tests here.
+
+WIRE_FORMATS = {
+    'bigint': '>q',
+    'integer': '>i',
+    'real': '>f',
+    'double precision': '>d',
+    'timestamp': '>q',
+}
+
+
+def decode_binary_copy(payload, db_types):
+    """Rows of a binary COPY payload as tuples (None for NULL, lists for 1-D arrays)."""
+    data = payload.getvalue()
+    assert data.startswith(PGCOPY_HEADER) and data.endswith(PGCOPY_TRAILER)
+    stream = io.BytesIO(data[len(PGCOPY_HEADER):-len(PGCOPY_TRAILER)])
+    rows = []
+    while stream.tell() < len(data) - len(PGCOPY_HEADER) - len(PGCOPY_TRAILER):
+        (n_fields,) = struct.unpack('>h', stream.read(2))
+        assert n_fields == len(db_types)
+        row = []
+        for db_type in db_types:
+            (length,) = struct.unpack('>i', stream.read(4))
+            if length == -1:
+                row.append(None)
+                continue
+            value = stream.read(length)
+            if db_type.endswith('[]'):
+                ndim, _, _, size, _ = struct.unpack('>5i', value[:20])
+                assert ndim == 1
+                items, offset = [], 20
+                fmt = WIRE_FORMATS[db_type[:-2]]
+                for _ in range(size):
+                    (item_length,) = struct.unpack('>i', value[offset:offset + 4])
+                    items.append(struct.unpack(fmt, value[offset + 4:offset + 4 + item_length])[0])
+                    offset += 4 + item_length
+                row.append(items)
+            else:
+                row.append(struct.unpack(WIRE_FORMATS[db_type], value)[0])
+        rows.append(tuple(row))
+    return rows
+
+
+class BinaryCopyTests(SimpleTestCase):
+
+    def test_float32_values_match_the_csv_path(self):
+        frame = pd.DataFrame({
+            'id': np.arange(5, dtype=np.int64),
+            'ws10': np.array([273.15, 0.1, 1013.25, np.nan, -3.3], dtype=np.float32),
+        })
+        rows = decode_binary_copy(
+            encode_binary_copy([(frame['id'].to_numpy(), 'bigint'), (frame['ws10'].to_numpy(), 'double precision')]),
+            ['bigint', 'double precision'],
+        )
+        # همان چیزی که CopyMapping از CSV می‌خواند: متن هر مقدار، فیلد خالی برای NaN
+        csv_rows = [line.split(',') for line in frame.to_csv(index=False, header=False).splitlines()]
+        expected = {int(i): (float(value) if value else None) for i, value in csv_rows}
+        self.assertEqual(dict(rows), expected)
+        self.assertEqual(dict(rows)[0], 273.15)
+
+    def test_random_float32_values_match_their_text(self):
+        # بدون تبدیل به متن؛ ولی همان double که از متن CSV خوانده می‌شود
+        rng = np.random.default_rng(0)
+        values = np.concatenate([
+            rng.normal(290, 15, 5000),
+            np.round(rng.uniform(0, 360, 5000), 2),
+            rng.standard_normal(5000) * 10.0 ** rng.integers(-40, 38, 5000),
+        ]).astype(np.float32)
+        rows = decode_binary_copy(encode_binary_copy([(values, 'double precision')]), ['double precision'])
+        self.assertEqual([row[0] for row in rows], [float(text) for text in values.astype(str)])
+
+    def test_shortest_float64_gives_the_values_of_the_source_text(self):
+        # مثل Hmax = Hs * 1.8 در ETL موج، وقتی Hs با float64 از متن خوانده می‌شد
+        texts = ['1.2', '0.35', '12.875', '3', '0.0', 'nan']
+        widened = shortest_float64(np.array(texts, dtype=np.float32))
+        np.testing.assert_array_equal(widened * 1.8, np.array(texts, dtype=np.float64) * 1.8)
+
+    def test_nan_and_nat_are_null(self):
+        times = np.array(['2025-08-10T12:00', 'NaT', '2025-08-10T13:00'], dtype='datetime64[us]')
+        values = np.array([1.5, 2.5, np.nan])
+        rows = decode_binary_copy(
+            encode_binary_copy([(np.arange(3), 'bigint'), (times, 'timestamp'), (values, 'double precision')]),
+            ['bigint', 'timestamp', 'double precision'],
+        )
+        by_id = {row[0]: row[1:] for row in rows}
+        microseconds = int((times[0] - POSTGRES_EPOCH) / np.timedelta64(1, 'us'))
+        self.assertEqual(by_id[0], (microseconds, 1.5))
+        self.assertEqual(by_id[1], (None, 2.5))
+        self.assertEqual(by_id[2], (microseconds + 3_600_000_000, None))
+
+    def test_rows_without_nulls_keep_their_order(self):
+        ids = np.array([7, 3, 9], dtype=np.int64)
+        rows = decode_binary_copy(encode_binary_copy([(ids, 'bigint')]), ['bigint'])
+        self.assertEqual([row[0] for row in rows], [7, 3, 9])
+
+    def test_array_columns(self):
+        series = np.array([[1.25, np.nan, 3.0], [4.0, 5.5, 6.0]], dtype=np.float32)
+        rows = decode_binary_copy(
+            encode_binary_copy([(np.array([1, 2]), 'bigint'), (series, 'real[]')]),
+            ['bigint', 'real[]'],
+        )
+        self.assertEqual(rows[0][0], 1)
+        self.assertEqual(rows[0][1][0], 1.25)
+        # NaN داخل آرایه NULL نیست
+        self.assertTrue(np.isnan(rows[0][1][1]))
+        self.assertEqual(rows[1], (2, [4.0, 5.5, 6.0]))
+
+    def test_empty_payload(self):
+        payload = encode_binary_copy([(np.array([], dtype=np.int64), 'bigint')])
+        self.assertEqual(payload.getvalue(), PGCOPY_HEADER + PGCOPY_TRAILER)
+
+
+class CoordinateKeyTests(SimpleTestCase):
+
+    def test_keys_match_after_rounding(self):
+        keys = coordinate_keys([25.123451, 25.1234549], [55.5, 55.500004])
+        self.assertEqual(keys[0], keys[1])
+
+    def test_keys_are_distinct_per_coordinate(self):
+        lat = np.array([-90.0, -12.5, 0.0, 0.0, 36.25, 90.0])
+        lon = np.array([-180.0, 359.99999, 0.0, 0.00001, -0.00001, 180.0])
+        keys = coordinate_keys(lat, lon)
+        self.assertEqual(np.unique(keys).size, lat.size)
+        # lat و lon جابه‌جا کلید دیگری می‌دهند
+        self.assertNotEqual(coordinate_keys([10.0], [20.0])[0], coordinate_keys([20.0], [10.0])[0])
+
+    def test_keys_order_lat_major(self):
+        keys = coordinate_keys([1.0, 1.0, 2.0], [5.0, 6.0, -170.0])
+        self.assertTrue((np.diff(keys) > 0).all())
+
+    def test_grid_hash_depends_on_ids_and_coordinates(self):
+        keys = coordinate_keys([1.0, 2.0], [3.0, 4.0])
+        base = station_grid_hash([1, 2], keys)
+        self.assertEqual(base, station_grid_hash(np.array([1, 2], dtype=np.int32), keys))
+        self.assertNotEqual(base, station_grid_hash([2, 1], keys))
+        self.assertNotEqual(base, station_grid_hash([1, 2], coordinate_keys([1.0, 2.0], [3.0, 4.5])))
+
+
+class RetargetIndexDefinitionTests(SimpleTestCase):
+
+    def test_plain_index(self):
+        definition = 'CREATE INDEX windforecas_forecas_8b60a5_idx ON public.windforecastapp_windforecastmodel USING btree (forecast_time, station_id)'
+        self.assertEqual(
+            retarget_index_definition(definition, 'tmp_idx', 'windforecastapp_windforecastmodel_staging'),
+            'CREATE INDEX "tmp_idx" ON "windforecastapp_windforecastmodel_staging" USING btree (forecast_time, station_id)',
+        )
+
+    def test_unique_index_on_only_with_include(self):
+        definition = (
+            'CREATE UNIQUE INDEX unique_wind_forecast_station_time ON ONLY public.windforecastapp_windforecastmodel '
+            'USING btree (station_id, forecast_time) INCLUDE (id, ws10)'
+        )
+        self.assertEqual(
+            retarget_index_definition(definition, 'u_stg', 'staging'),
+            'CREATE UNIQUE INDEX "u_stg" ON "staging" USING btree (station_id, forecast_time) INCLUDE (id, ws10)',
+        )
+
+    def test_gist_and_brin_keep_their_method(self):
+        gist = 'CREATE INDEX location_gist_idx ON public.windforecastapp_windstationmodel USING gist (location)'
+        self.assertTrue(retarget_index_definition(gist, 'g', 't').endswith('USING gist (location)'))
+        brin = 'CREATE INDEX windarchive_time_brin ON ONLY public.windforecastapp_windarchivemodel USING brin (forecast_time) WITH (autosummarize=on)'
+        self.assertEqual(
+            retarget_index_definition(brin, 'b', 'p202508'),
+            'CREATE INDEX "b" ON "p202508" USING brin (forecast_time) WITH (autosummarize=on)',
+        )
+
+
+class PartitionNamingTests(SimpleTestCase):
+
+    def test_partition_start_is_the_month(self):
+        self.assertEqual(partition_start('2025-08-31 23:00'), pd.Timestamp('2025-08-01'))
+        self.assertEqual(partition_start('2025-12-01 00:00'), pd.Timestamp('2025-12-01'))
+
+    def test_partition_start_converts_to_utc(self):
+        # ساعت ۰۱:۳۰ تهران در روز اول ماه هنوز ماه قبل است (UTC)
+        self.assertEqual(partition_start(pd.Timestamp('2025-09-01 01:30', tz='Asia/Tehran')), pd.Timestamp('2025-08-01'))
+
+    def test_multi_month_partitions(self):
+        self.assertEqual(partition_start('2025-05-15', months=3), pd.Timestamp('2025-04-01'))
+        self.assertEqual(partition_start('2025-12-31', months=6), pd.Timestamp('2025-07-01'))
+
+    def test_partition_name(self):
+        self.assertEqual(
+            partition_name('windforecastapp_windarchivemodel', pd.Timestamp('2025-08-01')),
+            'windforecastapp_windarchivemodel_p202508',
+        )
+
+
+def brute_force_nearest(ids, lat, lon, point_lat, point_lon):
+    """Reference: great-circle (haversine) nearest station."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (point_lat, point_lon, np.asarray(lat), np.asarray(lon)))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return int(np.asarray(ids)[np.argmin(a)])
+
+
+class StationResolverTests(SimpleTestCase):
+
+    def setUp(self):
+        # شبکه‌ی منظم lat-major، مثل ایستگاه‌های باد
+        grid_lat, grid_lon = np.meshgrid(np.arange(24.0, 30.01, 0.25), np.arange(50.0, 58.01, 0.25), indexing='ij')
+        self.lat = grid_lat.ravel()
+        self.lon = grid_lon.ravel()
+        self.ids = np.arange(1, self.lat.size + 1)
+        rng = np.random.default_rng(0)
+        self.points = np.column_stack((rng.uniform(24.2, 29.8, 200), rng.uniform(50.2, 57.8, 200)))
+
+    def test_regular_grid_uses_the_grid(self):
+        self.assertEqual(StationResolver(self.ids, self.lat, self.lon).mode, 'grid')
+
+    def test_irregular_stations_use_the_kdtree(self):
+        keep = np.ones(self.ids.size, dtype=bool)
+        keep[::7] = False
+        resolver = StationResolver(self.ids[keep], self.lat[keep], self.lon[keep])
+        self.assertEqual(resolver.mode, 'kdtree')
+        for point_lat, point_lon in self.points[:50]:
+            self.assertEqual(
+                resolver.nearest(point_lat, point_lon),
+                brute_force_nearest(self.ids[keep], self.lat[keep], self.lon[keep], point_lat, point_lon),
+            )
+
+    def test_grid_and_kdtree_agree(self):
+        grid = StationResolver(self.ids, self.lat, self.lon)
+        # همان ایستگاه‌ها به ترتیب دیگر و با شناسه‌ی غیرپیوسته، ولی باز هم شبکه‌ی منظم
+        order = np.random.default_rng(1).permutation(self.ids.size)
+        shuffled = StationResolver(self.ids[order] * 10, self.lat[order], self.lon[order])
+        tree = StationResolver(self.ids, self.lat, self.lon)
+        # همان ایستگاه‌ها با KD-tree به جای شبکه
+        tree.grid, tree.tree = None, cKDTree(_unit_vectors(self.lat, self.lon))
+        from_grid = grid.nearest_many(self.points[:, 0], self.points[:, 1])
+        np.testing.assert_array_equal(from_grid, tree.nearest_many(self.points[:, 0], self.points[:, 1]))
+        np.testing.assert_array_equal(from_grid * 10, shuffled.nearest_many(self.points[:, 0], self.points[:, 1]))
+        self.assertEqual([grid.nearest(a, b) for a, b in self.points], from_grid.tolist())
+
+    def test_points_outside_the_grid_clip_to_the_edge(self):
+        resolver = StationResolver(self.ids, self.lat, self.lon)
+        self.assertEqual(resolver.nearest(10.0, 40.0), 1)
+        self.assertEqual(resolver.nearest(40.0, 70.0), int(self.ids[-1]))
+
+    def test_0_360_longitudes(self):
+        lat, lon = np.meshgrid([0.0, 1.0], np.arange(0.0, 360.0, 90.0), indexing='ij')
+        resolver = StationResolver(np.arange(1, 9), lat.ravel(), lon.ravel())
+        self.assertEqual(resolver.mode, 'grid')
+        # ‎-90 همان 270 است
+        self.assertEqual(resolver.nearest(0.2, -90.0), 4)
+
+    def test_empty_table(self):
+        resolver = StationResolver([], [], [])
+        self.assertEqual(resolver.mode, 'empty')
+        self.assertIsNone(resolver.nearest(25.0, 55.0))
+
+
+class StationLookupTests(SimpleTestCase):
+
+    def test_station_info_with_consecutive_ids(self):
+        resolver = StationResolver([5, 6, 7], [25.0, 25.5, 26.0], [55.0, 55.0, 55.0], ['a', 'b', 'c'])
+        self.assertEqual(resolver.station_info(6), ('b', 25.5, 55.0))
+        self.assertIsInstance(resolver.station_info(6)[1], float)
+        self.assertIsNone(resolver.station_info(4))
+        self.assertIsNone(resolver.station_info(8))
+
+    def test_station_info_with_gaps(self):
+        resolver = StationResolver([9, 2, 40], [1.0, 2.0, 3.0], [4.0, 5.0, 6.0], ['x', 'y', 'z'])
+        self.assertEqual(resolver.station_info(2), ('y', 2.0, 5.0))
+        self.assertEqual(resolver.station_info(40), ('z', 3.0, 6.0))
+        self.assertIsNone(resolver.station_info(3))
+        self.assertIsNone(resolver.station_info(41))
+
+    def test_station_id_by_name(self):
+        resolver = StationResolver([9, 2], [1.0, 2.0], [4.0, 5.0], ['x', 'y'])
+        self.assertEqual(resolver.station_id_by_name('y'), 2)
+        self.assertIsNone(resolver.station_id_by_name('missing'))
+
+    def test_positions_match_station_info(self):
+        for ids in ([5, 6, 7], [9, 2, 40]):
+            resolver = StationResolver(ids, [1.0, 2.0, 3.0], [4.0, 5.0, 6.0], ['x', 'y', 'z'])
+            queried = [ids[2], 1, ids[0], ids[0], 100]
+            positions = resolver.positions(queried)
+            self.assertEqual(
+                [resolver.names[p] if p >= 0 else None for p in positions],
+                [None if resolver.station_info(i) is None else resolver.station_info(i)[0] for i in queried],
+            )
+
+    def test_positions_without_stations(self):
+        np.testing.assert_array_equal(StationResolver([], [], []).positions([1, 2]), [-1, -1])
+
+    def test_lookup_stations_of_a_batch(self):
+        resolver = StationResolver([1, 2, 3], [25.0, 25.5, 26.0], [55.0, 55.5, 56.0], ['a', 'b', 'c'])
+        with mock.patch('common.utils.station_resolver.get_station_resolver', return_value=resolver):
+            names, lat, lon = lookup_stations(object, [3, 1, 3])
+        self.assertEqual(names.tolist(), ['c', 'a', 'c'])
+        self.assertEqual(lat.tolist(), [26.0, 25.0, 26.0])
+        self.assertEqual(lon.tolist(), [56.0, 55.0, 56.0])
+
+    def test_json_stream_rows_use_the_lookup(self):
+        resolver = StationResolver([1, 2], [25.0, 25.5], [55.0, 55.5], ['a', 'b'])
+        time = pd.Timestamp('2025-08-10 12:00', tz='UTC').to_pydatetime()
+        queryset = mock.MagicMock()
+        queryset.values_list.return_value.iterator.return_value = iter([(7, 2, time, 1.5), (8, 1, time, float('nan'))])
+        with mock.patch('common.utils.station_resolver.get_station_resolver', return_value=resolver):
+            batches = list(iter_row_batches(queryset, ['ws10']))
+
+        queryset.values_list.assert_called_once_with('id', 'station_id', 'forecast_time', 'ws10')
+        self.assertEqual(batches, [[
+            {'id': 7, 'station_name': 'b', 'latitude': 25.5, 'longitude': 55.5,
+             'forecast_time': '2025-08-10T12:00:00Z', 'ws10': 1.5},
+            {'id': 8, 'station_name': 'a', 'latitude': 25.0, 'longitude': 55.0,
+             'forecast_time': '2025-08-10T12:00:00Z', 'ws10': None},
+        ]])
+
+
+class ShouldStreamTests(SimpleTestCase):
+
+    def queryset(self, rows_after_limit):
+        queryset = mock.MagicMock()
+        queryset.__getitem__.return_value.exists.return_value = rows_after_limit
+        return queryset
+
+    def test_ndjson_is_always_streamed(self):
+        queryset = self.queryset(False)
+        self.assertTrue(should_stream(queryset, 'ndjson'))
+        queryset.__getitem__.assert_not_called()
+
+    def test_json_is_streamed_only_past_the_limit(self):
+        small, large = self.queryset(False), self.queryset(True)
+        self.assertFalse(should_stream(small, 'json', min_rows=10))
+        self.assertTrue(should_stream(large, 'json', min_rows=10))
+        large.__getitem__.assert_called_once_with(slice(10, 11))
+
+    def test_other_formats_are_not_streamed(self):
+        self.assertFalse(should_stream(self.queryset(True), None))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ResponseCacheKeyTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        # نسخه‌ی سیکل در کش است، پس کلید بدون مراجعه به etl_state ساخته می‌شود
+        cache.set('cycle_version:wind', '1', None)
+
+    def key(self, query, path='/api/wind/forecast/', renderer=None):
+        request = Request(APIRequestFactory().get(f'{path}?{query}'))
+        request.accepted_renderer = renderer or JSONRenderer()
+        return response_cache_key('wind', request)
+
+    def test_parameter_order_is_ignored(self):
+        self.assertEqual(self.key('lat=25&lon=55'), self.key('lon=55&lat=25'))
+
+    def test_numbers_are_normalized(self):
+        self.assertEqual(self.key('lat=25&lon=55'), self.key('lat=25.000&lon=%2055.0'))
+        self.assertNotEqual(self.key('lat=25&lon=55'), self.key('lat=25.0001&lon=55'))
+
+    def test_text_values_are_kept(self):
+        self.assertNotEqual(self.key('name=station_1'), self.key('name=Station_1'))
+
+    def test_path_and_format_are_part_of_the_key(self):
+        self.assertNotEqual(self.key('lat=25', path='/api/wind/archive/'), self.key('lat=25'))
+        self.assertNotEqual(self.key('lat=25', renderer=ColumnarJSONRenderer()), self.key('lat=25'))
+
+    def test_new_cycle_changes_the_key(self):
+        before = self.key('lat=25&lon=55')
+        cache.set('cycle_version:wind', '2', None)
+        self.assertNotEqual(before, self.key('lat=25&lon=55'))
+
+
+class StationOrderTests(SimpleTestCase):
+
+    def time_major_rows(self, n_stations=4, n_times=3):
+        # چیدمان فایل‌های tab: هر گام زمانی همه‌ی ایستگاه‌ها را به یک ترتیب دارد
+        lat = np.tile(np.linspace(20.0, 21.5, n_stations), n_times)
+        lon = np.tile(np.linspace(50.0, 53.0, n_stations)[::-1], n_times)
+        times = np.repeat(np.arange(n_times).astype('datetime64[h]'), n_stations)
+        return lat, lon, times
+
+    def test_factorize_matches_pandas_on_tuples(self):
+        rng = np.random.default_rng(2)
+        lat = rng.choice([20.0, 20.5, 21.0], 50)
+        lon = rng.choice([50.0, 50.5], 50)
+        codes, first_rows = factorize_coordinates(lat, lon)
+        expected, _ = pd.factorize(pd.Series(list(zip(lat, lon))))
+        np.testing.assert_array_equal(codes, expected)
+        for code, row in enumerate(first_rows):
+            self.assertEqual(np.flatnonzero(codes == code)[0], row)
+
+    def test_already_ordered_rows(self):
+        codes = np.array([0, 0, 1, 1, 2])
+        times = np.array([1, 2, 1, 2, 1]).astype('datetime64[h]')
+        self.assertIsNone(station_time_order(codes, times))
+        self.assertIsNone(station_time_order(codes[:1], times[:1]))
+
+    def test_time_major_blocks_are_transposed(self):
+        lat, lon, times = self.time_major_rows()
+        codes, _ = factorize_coordinates(lat, lon)
+        order = station_time_order(codes, times)
+        np.testing.assert_array_equal(order, np.lexsort((times, codes)))
+        np.testing.assert_array_equal(codes[order], np.repeat(np.arange(4), 3))
+
+    def test_other_layouts_are_sorted(self):
+        lat, lon, times = self.time_major_rows()
+        shuffle = np.random.default_rng(3).permutation(lat.size)
+        codes, _ = factorize_coordinates(lat[shuffle], lon[shuffle])
+        order = station_time_order(codes, times[shuffle])
+        ordered_codes, ordered_times = codes[order], times[shuffle][order]
+        self.assertTrue((np.diff(ordered_codes) >= 0).all())
+        same_station = np.diff(ordered_codes) == 0
+        self.assertTrue((np.diff(ordered_times)[same_station] > np.timedelta64(0, 'h')).all())
@@ -0,0 +1,129 @@
+"""
+Idempotent append of the archive hours of a cycle.
+
+Each archive table keeps a high-water mark of its newest archived
+forecast_time in etl_state. A load only stages rows newer than the mark
+(a rerun of the same cycle stages nothing), and the staged rows are moved
+into the archive with INSERT ... ON CONFLICT (station_id, forecast_time)
+DO NOTHING, so the archive never holds the same station/time twice. The
+mark advances in the same transaction as the insert.
+
+Rows are inserted in (forecast_time, station) order: appended pages then
+cover narrow, increasing time ranges, which keeps the BRIN index on
+forecast_time selective.
+"""
+import logging
+import pandas as pd
+from django.db import connection, transaction
+from common.utils.etl_state import get_etl_state, set_etl_state
+from common.utils.staging import insert_from_staging
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CONFLICT_COLUMNS = ('station_id', 'forecast_time')
+ARCHIVE_INSERT_ORDER = ('forecast_time', 'station_id')
+
+
+def _watermark_key(model):
+    return f'archive_watermark:{model._meta.db_table}'
+
+
+def _naive_utc(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts
+
+
+def get_archive_watermark(model):
+    """Newest archived forecast_time (UTC, naive) of `model`, or None for an empty archive."""
+    value = get_etl_state(_watermark_key(model))
+    if value:
+        return pd.Timestamp(value)
+
+    # اولین اجرا بعد از ارتقا یا بعد از پاک شدن آرشیو: از خود جدول خوانده می‌شود
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT max("forecast_time") FROM "{model._meta.db_table}";')
+        latest = cursor.fetchone()[0]
+    if latest is None:
+        return None
+    latest = _naive_utc(latest)
+    set_etl_state(_watermark_key(model), latest.isoformat())
+    return latest
+
+
+def reset_archive_watermark(model):
+    """Forget the mark (e.g. after the archive was deleted); the next load reads it from the table."""
+    set_etl_state(_watermark_key(model), '')
+
+
+def rows_after_watermark(df, watermark, time_column='forecast_time'):
+    if watermark is None:
+        return df
+    return df[df[time_column] > watermark]
+
+
+def create_archive_staging_table(model, field_names):
+    """
+    Temporary table with the `field_names` columns of the archive, dropped
+    at commit. Must be created inside a transaction.
+    """
+    staging = f"{model._meta.db_table}_append"
+    columns = ', '.join(f'"{model._meta.get_field(name).column}"' for name in field_names)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS pg_temp."{staging}";')
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE "{staging}" ON COMMIT DROP AS
+            SELECT {columns} FROM "{model._meta.db_table}" WITH NO DATA;
+        """)
+    return staging
+
+
+def archive_window(end_time, watermark):
+    """WHERE clause and params selecting the staged rows after `watermark` up to `end_time` (naive UTC)."""
+    where, params = 'WHERE "forecast_time" <= %s', [_naive_utc(end_time).tz_localize('UTC').to_pydatetime()]
+    if watermark is not None:
+        where += ' AND "forecast_time" > %s'
+        params.append(watermark.tz_localize('UTC').to_pydatetime())
+    return where, params
+
+
+def publish_archive_staging(model, staging, field_names, where='', params=None):
+    """
+    Move the staged rows (matching `where`) into the archive in time order,
+    skipping station/times already archived, and advance the mark to the newest
+    staged time. Returns the number of rows inserted.
+    """
+    inserted = insert_from_staging(
+        model, staging, field_names, where, params,
+        on_conflict=ARCHIVE_CONFLICT_COLUMNS, order_by=ARCHIVE_INSERT_ORDER,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT max("forecast_time") FROM "{staging}" {where};', params)
+        latest = cursor.fetchone()[0]
+    if latest is not None:
+        watermark = get_archive_watermark(model)
+        latest = _naive_utc(latest)
+        if watermark is None or latest > watermark:
+            set_etl_state(_watermark_key(model), latest.isoformat())
+    return inserted
+
+
+def append_archive(model, df, field_names, copy_rows, time_column='forecast_time'):
+    """
+    Append the rows of `df` newer than the archive mark. `copy_rows(frame,
+    table_name)` COPYs a frame into a table with the archive's columns.
+    Returns the number of rows inserted.
+    """
+    watermark = get_archive_watermark(model)
+    new_rows = rows_after_watermark(df, watermark, time_column)
+    if not len(new_rows):
+        logger.info(f"{model._meta.db_table}: nothing newer than {watermark}, archive unchanged")
+        return 0
+
+    with transaction.atomic():
+        staging = create_archive_staging_table(model, field_names)
+        copy_rows(new_rows, staging)
+        inserted = publish_archive_staging(model, staging, field_names)
+    logger.info(f"{model._meta.db_table}: {inserted} of {len(new_rows)} staged rows archived (mark was {watermark})")
+    return inserted
@@ -0,0 +1,82 @@
+"""
+Set-based forecast lookup for many points in one request.
+
+All points are resolved to stations together (names with one IN query,
+coordinates with the in-process station resolver), and the forecasts of
+all resolved stations are read with a single station_id = ANY(...) scan,
+then grouped back per input point.
+"""
+from collections import defaultdict
+from common.utils.station_resolver import get_station_resolver
+
+MAX_BATCH_POINTS = 1000
+
+
+def resolve_batch_stations(station_model, points):
+    """Station id for each point ({'name'} or {'lat', 'lon'}); None when a name is unknown."""
+    names = [point['name'] for point in points if point.get('name')]
+    by_name = dict(station_model.objects.filter(name__in=names).values_list('name', 'id')) if names else {}
+
+    station_ids = [by_name.get(point['name']) if point.get('name') else None for point in points]
+    coordinate_points = [i for i, point in enumerate(points) if not point.get('name')]
+    if coordinate_points:
+        nearest = get_station_resolver(station_model).nearest_many(
+            [points[i]['lat'] for i in coordinate_points],
+            [points[i]['lon'] for i in coordinate_points],
+        )
+        if nearest is not None:
+            for i, station_id in zip(coordinate_points, nearest.tolist()):
+                station_ids[i] = station_id
+    return station_ids
+
+
+def station_metadata(station_model, station_ids):
+    """{station id: metadata} from the in-process station lookup (no query for loaded stations)."""
+    stations = get_station_resolver(station_model)
+    metadata = {}
+    missing = []
+    for station_id in station_ids:
+        info = stations.station_info(station_id)
+        if info is None:
+            missing.append(station_id)
+            continue
+        name, latitude, longitude = info
+        metadata[station_id] = {'id': station_id, 'name': name, 'latitude': latitude, 'longitude': longitude}
+    if missing:
+        for station_id, name, location in station_model.objects.filter(id__in=missing).values_list('id', 'name', 'location'):
+            metadata[station_id] = {'id': station_id, 'name': name, 'latitude': location.y, 'longitude': location.x}
+    return metadata
+
+
+def _iso(value):
+    text = value.isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+def forecasts_by_station(model, station_ids, fields, start_date, end_date):
+    """
+    {station id: [{'forecast_time', fields...}]} read in one query
+    (PostgreSQL plans the IN list as station_id = ANY(ARRAY[...])).
+    """
+    rows = (
+        model.objects
+        .filter(station_id__in=list(station_ids), forecast_time__range=(start_date, end_date))
+        .order_by('station_id', 'forecast_time')
+        .values_list('station_id', 'forecast_time', *fields)
+    )
+    grouped = defaultdict(list)
+    for station_id, forecast_time, *values in rows:
+        grouped[station_id].append({'forecast_time': _iso(forecast_time), **dict(zip(fields, values))})
+    return grouped
+
+
+def batch_forecast_response(station_model, points, station_ids, grouped):
+    """One entry per input point, in input order."""
+    metadata = station_metadata(station_model, {station_id for station_id in station_ids if station_id is not None})
+    results = []
+    for point, station_id in zip(points, station_ids):
+        entry = {'input': point, 'station': metadata.get(station_id), 'forecasts': grouped.get(station_id, [])}
+        if station_id is None:
+            entry['error'] = 'Station not found by name'
+        results.append(entry)
+    return results
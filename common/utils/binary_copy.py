@@ -0,0 +1,196 @@
+"""
+PostgreSQL binary COPY writer.
+
+Builds the COPY ... FROM STDIN WITH (FORMAT binary) payload straight from
+NumPy arrays, so forecast/archive chunks are loaded without formatting
+timestamps and floats as text and parsing them again on the server.
+
+Format reference: https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+"""
+import io
+import struct
+import numpy as np
+from django.db import connection
+
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
+
+# binary timestamps are microseconds since 2000-01-01 00:00:00 UTC
+POSTGRES_EPOCH = np.datetime64('2000-01-01T00:00:00', 'us')
+
+# db_type() of the model field -> big-endian wire dtype
+BINARY_TYPES = {
+    'smallint': '>i2',
+    'integer': '>i4',
+    'bigint': '>i8',
+    'real': '>f4',
+    'double precision': '>f8',
+    'timestamp with time zone': '>i8',
+    'timestamp': '>i8',
+}
+
+# element type oids of the one-dimensional arrays (e.g. real[]) we write
+ARRAY_ELEMENT_OIDS = {
+    'real': 700,
+    'double precision': 701,
+}
+
+
+def shortest_float64(values):
+    """
+    float32 `values` as the double precision numbers their shortest decimal
+    repr parses to (273.15, not 273.149993896...), i.e. what the CSV path
+    stores, without formatting them as text.
+
+    Each value is rounded to 6, 7, 8 and then 9 significant digits until the
+    rounded value maps back to the same float32 (a float32 is within half a
+    6-digit step of any shorter repr, so starting at 6 loses nothing). The
+    rounded integer divided by an exact power of ten (<= 1e22) is the same
+    double as the parsed decimal; the rare values outside that range go
+    through the decimal text instead.
+    """
+    wide = values.astype(np.float64)
+    result = wide.copy()
+    candidates = np.isfinite(wide) & (wide != 0)
+    exponent = np.zeros(wide.shape)
+    np.floor(np.log10(np.abs(wide, where=candidates, out=np.ones(wide.shape))), out=exponent)
+    exact = candidates & (exponent >= -14) & (exponent <= 22)
+    pending = np.flatnonzero(exact)
+    exponent = exponent[pending]
+    for digits in range(6, 10):
+        x = wide[pending]
+        power = digits - 1 - exponent
+        scale = 10.0 ** np.abs(power)
+        rounded = np.where(power >= 0, np.round(x * scale) / scale, np.round(x / scale) * scale)
+        done = rounded.astype(np.float32) == values[pending]
+        result[pending[done]] = rounded[done]
+        pending, exponent = pending[~done], exponent[~done]
+        if not pending.size:
+            break
+    rest = np.flatnonzero(candidates & ~exact)
+    if rest.size:
+        result[rest] = values[rest].astype(str).astype(np.float64)
+    return result
+
+
+def _exact_float(values, wire_dtype):
+    """float32 values bound for a double precision column, as the CSV path writes them."""
+    if values.dtype.kind == 'f' and values.dtype.itemsize < 8 and np.dtype(wire_dtype).itemsize == 8:
+        return shortest_float64(values)
+    return values
+
+
+def _array_to_wire(values, db_type):
+    """
+    2-D `values` -> one fixed-size 1-D array per row. NaN elements stay NaN
+    (valid in real[]/double precision[]), so no row is NULL.
+    """
+    element_type = db_type[:-2]
+    element_dtype = np.dtype(BINARY_TYPES[element_type])
+    values = np.asarray(values)
+    n_rows, n_items = values.shape
+    wire = np.empty(n_rows, dtype=[
+        ('ndim', '>i4'), ('has_null', '>i4'), ('element_oid', '>i4'),
+        ('size', '>i4'), ('lower_bound', '>i4'),
+        ('items', [('length', '>i4'), ('value', element_dtype)], (n_items,)),
+    ])
+    wire['ndim'] = 1
+    wire['has_null'] = 0
+    wire['element_oid'] = ARRAY_ELEMENT_OIDS[element_type]
+    wire['size'] = n_items
+    wire['lower_bound'] = 1
+    wire['items']['length'] = element_dtype.itemsize
+    wire['items']['value'] = _exact_float(values, element_dtype)
+    return wire, np.zeros(n_rows, dtype=bool)
+
+
+def _to_wire(values, db_type):
+    """Return (wire values, null mask) for one column."""
+    if db_type.endswith('[]'):
+        return _array_to_wire(values, db_type)
+    values = np.asarray(values)
+    if db_type.startswith('timestamp'):
+        if values.dtype.kind != 'M':
+            values = values.astype('datetime64[us]')
+        nulls = np.isnat(values)
+        wire = (values.astype('datetime64[us]') - POSTGRES_EPOCH).astype(np.int64)
+    elif values.dtype.kind == 'f':
+        nulls = np.isnan(values)
+        wire = _exact_float(values, BINARY_TYPES[db_type])
+    else:
+        nulls = np.zeros(values.shape, dtype=bool)
+        wire = values
+    return wire.astype(BINARY_TYPES[db_type], copy=False), nulls
+
+
+def encode_binary_copy(columns):
+    """
+    Encode `columns` (list of (values, db_type)) as one binary COPY payload.
+    Array columns (db_type 'real[]' etc.) take 2-D values, one row per row.
+
+    NaN / NaT are written as NULL, like the empty fields of the CSV path.
+    Rows without NULLs are packed with a single structured array; the
+    (rare) rows that contain one are encoded one by one.
+    """
+    encoded = [_to_wire(values, db_type) for values, db_type in columns]
+    n_fields = len(encoded)
+    n_rows = len(encoded[0][0]) if encoded else 0
+
+    null_rows = np.zeros(n_rows, dtype=bool)
+    for _, nulls in encoded:
+        null_rows |= nulls
+
+    row_dtype = [('n_fields', '>i2')]
+    for i, (wire, _) in enumerate(encoded):
+        row_dtype += [(f'len{i}', '>i4'), (f'val{i}', wire.dtype)]
+
+    clean = ~null_rows
+    rows = np.empty(int(clean.sum()), dtype=row_dtype)
+    rows['n_fields'] = n_fields
+    for i, (wire, _) in enumerate(encoded):
+        rows[f'len{i}'] = wire.dtype.itemsize
+        rows[f'val{i}'] = wire[clean]
+
+    buffer = io.BytesIO()
+    buffer.write(PGCOPY_HEADER)
+    buffer.write(rows.tobytes())
+    for r in np.flatnonzero(null_rows):
+        buffer.write(struct.pack('>h', n_fields))
+        for wire, nulls in encoded:
+            if nulls[r]:
+                buffer.write(struct.pack('>i', -1))
+            else:
+                buffer.write(struct.pack('>i', wire.dtype.itemsize))
+                buffer.write(wire[r:r + 1].tobytes())
+    buffer.write(PGCOPY_TRAILER)
+    buffer.seek(0)
+    return buffer
+
+
+def copy_arrays_binary(table_name, columns):
+    """
+    COPY `columns` ({db column: (values, db_type)}) into `table_name`
+    using the binary format.
+    """
+    payload = encode_binary_copy(list(columns.values()))
+    column_list = ', '.join(f'"{name}"' for name in columns)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY "{table_name}" ({column_list}) FROM STDIN WITH (FORMAT binary)', payload)
+    payload.close()
+
+
+def copy_frame_binary(model, df, mapping, table_name=None):
+    """
+    Binary counterpart of CopyMapping(model, csv, mapping).save() for a
+    DataFrame: `mapping` is {model field: DataFrame column}. Column types
+    are taken from the model fields, so the rows land exactly as they do
+    through the CSV path. `table_name` overrides the model table.
+    """
+    columns = {}
+    for field_name, df_column in mapping.items():
+        field = model._meta.get_field(field_name)
+        values = df[df_column]
+        if getattr(values.dtype, 'tz', None) is not None:
+            values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+        columns[field.column] = (values.to_numpy(), field.db_type(connection))
+    copy_arrays_binary(table_name or model._meta.db_table, columns)
@@ -0,0 +1,63 @@
+"""
+Columnar (station x time) layout of a bbox query.
+
+Instead of one serialized object per (station, time) row, the response
+carries the station metadata once, the sorted forecast times once, and one
+dense [station][time] array per variable. Missing cells are null.
+"""
+import numpy as np
+import pandas as pd
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def _dense_list(values):
+    """2-D float array -> nested lists, NaN -> None."""
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    values = values.astype(object)
+    values[missing] = None
+    return values.tolist()
+
+
+def columnar_bbox(stations, queryset, fields):
+    """
+    Build the columnar response for `queryset` (rows of a forecast/archive
+    model) restricted to `stations` (a station queryset).
+    Only stations that have at least one row are listed.
+    """
+    rows = list(queryset.order_by().values_list('station_id', 'forecast_time', *fields))
+    result = {
+        'stations': {'id': [], 'name': [], 'latitude': [], 'longitude': []},
+        'times': [],
+        'variables': {field: [] for field in fields},
+    }
+    if not rows:
+        return result
+
+    columns = list(zip(*rows))
+    row_station = np.asarray(columns[0], dtype=np.int64)
+    row_time = pd.to_datetime(pd.Series(columns[1]), utc=True).to_numpy(dtype='datetime64[ns]')
+
+    station_ids, station_index = np.unique(row_station, return_inverse=True)
+    times, time_index = np.unique(row_time, return_inverse=True)
+
+    metadata = {
+        station_id: (name, location)
+        for station_id, name, location in stations.filter(id__in=station_ids.tolist()).values_list('id', 'name', 'location')
+    }
+    for station_id in station_ids.tolist():
+        name, location = metadata.get(station_id, (None, None))
+        result['stations']['id'].append(station_id)
+        result['stations']['name'].append(name)
+        result['stations']['latitude'].append(location.y if location else None)
+        result['stations']['longitude'].append(location.x if location else None)
+
+    result['times'] = pd.DatetimeIndex(times).strftime(TIME_FORMAT).tolist()
+
+    for offset, field in enumerate(fields, start=2):
+        values = np.full((station_ids.size, times.size), np.nan)
+        values[station_index, time_index] = np.asarray(columns[offset], dtype=np.float64)
+        result['variables'][field] = _dense_list(values)
+    return result
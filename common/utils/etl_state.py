@@ -0,0 +1,28 @@
+"""
+Small key/value table for bookkeeping the ETLs keep between runs
+(station grid hashes, archive high-water marks, ...).
+
+The table belongs to common.models.EtlStateModel and is created by its
+migration; reads stay plain SQL because the API path (cycle versions,
+station versions) goes through get_etl_state().
+"""
+from django.db import connection
+from common.models import EtlStateModel
+
+ETL_STATE_TABLE = EtlStateModel._meta.db_table
+
+
+def get_etl_state(key, default=None):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT value FROM "{ETL_STATE_TABLE}" WHERE key = %s;', [key])
+        row = cursor.fetchone()
+    return row[0] if row else default
+
+
+def set_etl_state(key, value):
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO "{ETL_STATE_TABLE}" (key, value, updated_at)
+            VALUES (%s, %s, now())
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at;
+        """, [key, str(value)])
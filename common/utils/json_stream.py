@@ -0,0 +1,102 @@
+"""
+Incremental JSON / NDJSON output of large forecast and archive querysets.
+
+Rows are read through a server-side cursor in STREAM_BATCH_ROWS batches and
+encoded batch by batch into a StreamingHttpResponse, so worker memory does
+not grow with the size of the result. Each row has the same keys as the
+serializer output ([id,] station_name, latitude, longitude, forecast_time and
+the variables); like the serializers, the station columns come from the
+station lookup by station_id instead of a join.
+
+NDJSON is always streamed; plain JSON only past STREAM_MIN_ROWS rows
+(should_stream), so smaller results stay ordinary Responses that the
+cycle response cache can store.
+"""
+import json
+from itertools import islice
+from django.http import StreamingHttpResponse
+from common.utils.station_resolver import lookup_stations
+
+STREAM_BATCH_ROWS = 5000
+
+# JSON (not NDJSON) results up to this many rows are rendered as a normal
+# Response instead, so cycle_cached can store them
+STREAM_MIN_ROWS = 50000
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def _iso(value):
+    # مثل DateTimeField در DRF: UTC با پسوند Z
+    text = value.isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+def _number(value):
+    # NaN در JSON معتبر نیست
+    return None if value is None or value != value else value
+
+
+def iter_row_batches(queryset, fields, include_id=True, batch_rows=STREAM_BATCH_ROWS):
+    """Lists of row dicts read from `queryset` through a server-side cursor."""
+    prefix = ['id'] if include_id else []
+    keys = [*prefix, 'station_name', 'latitude', 'longitude', 'forecast_time', *fields]
+    station_index = len(prefix)
+    station_model = queryset.model._meta.get_field('station').related_model
+    rows = (
+        queryset
+        .values_list(*prefix, 'station_id', 'forecast_time', *fields)
+        .iterator(chunk_size=batch_rows)
+    )
+    while True:
+        batch = list(islice(rows, batch_rows))
+        if not batch:
+            return
+        names, lat, lon = lookup_stations(station_model, [row[station_index] for row in batch])
+        yield [
+            dict(zip(keys, (
+                *row[:station_index], name, _number(latitude), _number(longitude),
+                _iso(row[station_index + 1]), *map(_number, row[station_index + 2:]),
+            )))
+            for row, name, latitude, longitude in zip(batch, names.tolist(), lat.tolist(), lon.tolist())
+        ]
+
+
+def _json_array(batches):
+    yield '['
+    first = True
+    for batch in batches:
+        body = ','.join(_encoder.encode(row) for row in batch)
+        yield body if first else ',' + body
+        first = False
+    yield ']'
+
+
+def _ndjson(batches):
+    for batch in batches:
+        yield ''.join(_encoder.encode(row) + '\n' for row in batch)
+
+
+def should_stream(queryset, stream_format, min_rows=STREAM_MIN_ROWS):
+    """
+    True if `queryset` is to be streamed in `stream_format` (see
+    renderers.json_stream_format): NDJSON always, JSON only when it has
+    more than `min_rows` rows.
+    """
+    if stream_format == 'ndjson':
+        return True
+    # OFFSET min_rows LIMIT 1: بدون count روی کل نتیجه
+    return stream_format == 'json' and queryset[min_rows:min_rows + 1].exists()
+
+
+def json_streaming_response(queryset, fields, ndjson=False, include_id=True):
+    """
+    StreamingHttpResponse with `queryset` as a JSON array or as NDJSON (one
+    row per line). `include_id` follows the serializer of the endpoint.
+    """
+    batches = iter_row_batches(queryset, fields, include_id)
+    if ndjson:
+        return StreamingHttpResponse(_ndjson(batches), content_type=NDJSON_MEDIA_TYPE)
+    return StreamingHttpResponse(_json_array(batches), content_type='application/json')
@@ -0,0 +1,63 @@
+"""
+Post-load maintenance of the forecast tables.
+
+A freshly COPYed table has no visibility map yet, so even a covering
+index has to visit the heap for every row it returns. VACUUM sets the
+all-visible bits (and ANALYZE refreshes the planner statistics), after
+which point queries on (station, forecast_time) become index-only scans.
+
+The physical (station, forecast_time) order that the station CLUSTER used
+to approximate is kept on the forecast tables instead, and only rewritten
+when it may have been lost: etl_state records the station_version for
+which each table was last known to be in that order. sync_stations() and
+the delete commands bump station_version when the station set changes,
+and a load that writes the live table in time order (the in-place
+'truncate' mode of the time-block loads) clears the entry. The rewrite
+goes through a staging table and a swap (staging.rewrite_in_order), so
+readers are never blocked for longer than the rename.
+"""
+import time
+import logging
+from django.db import connection
+from common.utils.etl_state import get_etl_state, set_etl_state
+from common.utils.staging import rewrite_in_order, STATION_TIME_ORDER
+from common.utils.station_resolver import station_version_key
+
+logger = logging.getLogger(__name__)
+
+
+def vacuum_table(table_name, analyze=True):
+    """VACUUM (and ANALYZE) `table_name`; must run outside a transaction block."""
+    if connection.in_atomic_block:
+        raise RuntimeError(f"VACUUM of {table_name} cannot run inside a transaction")
+    start = time.time()
+    options = '(ANALYZE)' if analyze else ''
+    with connection.cursor() as cursor:
+        cursor.execute(f'VACUUM {options} "{table_name}";')
+    logger.info(f"Vacuumed {table_name} in {time.time() - start:.1f} s")
+
+
+def _ordered_key(model):
+    return f'station_ordered:{model._meta.db_table}'
+
+
+def mark_unordered(model):
+    """Record that `model`'s table was written out of (station, time) order."""
+    set_etl_state(_ordered_key(model), '')
+
+
+def reorganize_forecast(model, station_model):
+    """
+    Rewrite `model`'s table in (station_id, forecast_time) order if the
+    station set of `station_model` changed since it was last put in that
+    order, or a load wrote it out of order. Returns True when it ran.
+    """
+    table = model._meta.db_table
+    version = get_etl_state(station_version_key(station_model), '')
+    if get_etl_state(_ordered_key(model)) == version:
+        logger.info(f"{table}: station set unchanged and rows in station order, skipping reorganization")
+        return False
+
+    rewrite_in_order(model, STATION_TIME_ORDER)
+    set_etl_state(_ordered_key(model), version)
+    return True
@@ -0,0 +1,31 @@
+"""
+Process pool for the parallel ETL mode (--workers N).
+
+Each worker is a fresh (spawned) Python process with Django set up and its
+own database connection, so the workers COPY into the staging table over
+independent connections. Tasks must be module-level functions; they are
+imported in the worker after django.setup().
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from django.db import connections
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def run_parallel(func, tasks, workers):
+    """Run func(*task) for every task on `workers` processes; results in task order."""
+    # اتصال‌های باز پروسه‌ی اصلی نباید به workerها برسند
+    connections.close_all()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker) as pool:
+        futures = [pool.submit(func, *task) for task in tasks]
+        try:
+            return [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
@@ -0,0 +1,135 @@
+"""
+Native range partitioning of the archive tables on forecast_time.
+
+The archive tables are partitioned by month (ARCHIVE_PARTITION_MONTHS).
+The ETLs call ensure_partitions() for the time span of each archive load
+before COPY, queries filtered on forecast_time only scan the matching
+partitions, and manage_archive_partitions() detaches or repacks old ones.
+The conversion of the existing archive tables is done by their migrations.
+"""
+import re
+import logging
+import pandas as pd
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PARTITION_MONTHS = 1
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def _naive_utc(ts):
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts
+
+
+def partition_start(ts, months=ARCHIVE_PARTITION_MONTHS):
+    """Start (UTC, naive) of the partition containing `ts`."""
+    ts = _naive_utc(ts)
+    index = (ts.year * 12 + ts.month - 1) // months * months
+    return pd.Timestamp(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def partition_name(table_name, start):
+    return f"{table_name}_p{start:%Y%m}"
+
+
+def _bound(ts):
+    return f"{ts:%Y-%m-%d %H:%M:%S}+00"
+
+
+def ensure_partitions(table_name, start_time, end_time, months=ARCHIVE_PARTITION_MONTHS):
+    """
+    Create the partitions needed to hold rows in [start_time, end_time] that
+    do not exist yet. Returns the names of the partitions created.
+    """
+    created = []
+    start = partition_start(start_time, months)
+    last = partition_start(end_time, months)
+    with connection.cursor() as cursor:
+        while start <= last:
+            end = start + pd.DateOffset(months=months)
+            name = partition_name(table_name, start)
+            cursor.execute("SELECT to_regclass(%s);", [f'"{name}"'])
+            if cursor.fetchone()[0] is None:
+                cursor.execute(f"""
+                    CREATE TABLE "{name}" PARTITION OF "{table_name}"
+                    FOR VALUES FROM ('{_bound(start)}') TO ('{_bound(end)}');
+                """)
+                logger.info(f"Created partition {name}")
+                created.append(name)
+            start = end
+    return created
+
+
+def list_partitions(table_name):
+    """[(partition name, start, end)] of the attached partitions, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass;
+        """, [f'"{table_name}"'])
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound or '')
+        if match:
+            start, end = (_naive_utc(value) for value in match.groups())
+            partitions.append((name, start, end))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def detach_partition(table_name, partition):
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{table_name}" DETACH PARTITION "{partition}";')
+    logger.info(f"Detached {partition} from {table_name}")
+
+
+def repack_partition(partition):
+    """
+    Rewrite a partition that no longer receives rows with fillfactor 100 and
+    no dead tuples (nothing is compressed beyond what TOAST already does).
+    Runs VACUUM FULL, so it must not be inside a transaction.
+    Returns False if the partition was already repacked.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reloptions FROM pg_class WHERE oid = %s::regclass;", [f'"{partition}"'])
+        options = cursor.fetchone()[0] or []
+        if 'fillfactor=100' in options:
+            return False
+        cursor.execute(f'ALTER TABLE "{partition}" SET (fillfactor = 100);')
+        cursor.execute(f'VACUUM (FULL, ANALYZE) "{partition}";')
+    logger.info(f"Repacked {partition}")
+    return True
+
+
+def manage_archive_partitions(table_name, create_ahead=1, detach_older_than=None, repack_older_than=None,
+                              months=ARCHIVE_PARTITION_MONTHS):
+    """
+    Partition housekeeping for one archive table:
+      - create partitions for the current month and `create_ahead` months after it
+      - repack partitions ending more than `repack_older_than` months ago
+      - detach partitions ending more than `detach_older_than` months ago
+        (the detached tables are kept, only removed from the archive)
+    Returns {'created': [...], 'repacked': [...], 'detached': [...]}.
+    """
+    now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+    result = {'created': [], 'repacked': [], 'detached': []}
+
+    result['created'] = ensure_partitions(
+        table_name, now, now + pd.DateOffset(months=create_ahead * months), months
+    )
+
+    for name, _, end in list_partitions(table_name):
+        if detach_older_than is not None and end <= now - pd.DateOffset(months=detach_older_than):
+            detach_partition(table_name, name)
+            result['detached'].append(name)
+        elif repack_older_than is not None and end <= now - pd.DateOffset(months=repack_older_than):
+            if repack_partition(name):
+                result['repacked'].append(name)
+    return result
@@ -0,0 +1,117 @@
+"""
+Response cache for the station and bbox views, keyed on the forecast cycle.
+
+The forecast/archive tables only change when an ETL runs, so a rendered
+response is valid until the next load. Each app ('wind', 'wave') has a cycle
+version that the ETL bumps after a successful load. The version is part of
+every cache key, so a new cycle makes all older entries unreachable without
+deleting them.
+
+The version is kept in the cache (checked on every request without a query)
+and in etl_state, which restores it if the cache entry was evicted. Hit and
+miss counters are exposed by ResponseCacheStatsView. They are approximate:
+cache.incr() is a read-modify-write on FileBasedCache (and LocMemCache is
+per process), so concurrent requests can lose increments. Use them as a
+hit ratio, not as exact request counts.
+"""
+import time
+import hashlib
+from functools import wraps
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.response import Response
+from common.utils.etl_state import get_etl_state, set_etl_state
+
+RESPONSE_CACHE_TIMEOUT = 13 * 60 * 60  # یک سیکل ۱۲ ساعته + حاشیه
+
+
+def _version_key(app):
+    return f'cycle_version:{app}'
+
+
+def _counter_key(app, name):
+    return f'response_cache:{app}:{name}'
+
+
+def get_cycle_version(app):
+    version = cache.get(_version_key(app))
+    if version is None:
+        version = get_etl_state(_version_key(app), '0')
+        cache.set(_version_key(app), version, None)
+    return version
+
+
+def bump_cycle_version(app):
+    """Start a new cache cycle for `app`; called by the ETL after a successful load."""
+    version = repr(time.time())
+    set_etl_state(_version_key(app), version)
+    cache.set(_version_key(app), version, None)
+    return version
+
+
+def _normalize(value):
+    value = value.strip()
+    try:
+        return repr(float(value))
+    except ValueError:
+        return value
+
+
+def response_cache_key(app, request):
+    params = sorted(
+        (name, [_normalize(value) for value in values])
+        for name, values in request.query_params.lists()
+    )
+    output_format = getattr(request.accepted_renderer, 'format', '')
+    raw = f'{request.path}|{output_format}|{params}'
+    return f'response:{app}:{get_cycle_version(app)}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def _count(app, name):
+    # تقریبی: روی FileBasedCache افزایش‌های هم‌زمان ممکن است گم شوند
+    key = _counter_key(app, name)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def cache_stats(app):
+    return {
+        'cycle_version': get_cycle_version(app),
+        'hits': cache.get(_counter_key(app, 'hits'), 0),
+        'misses': cache.get(_counter_key(app, 'misses'), 0),
+    }
+
+
+def cycle_cached(app):
+    """
+    Cache the rendered 200 responses of an APIView `get` for the current
+    cycle of `app`. Streamed responses (Arrow, Parquet, JSON streaming) and
+    the browsable API are passed through uncached.
+    """
+    def decorator(get):
+        @wraps(get)
+        def wrapper(self, request, *args, **kwargs):
+            if getattr(request.accepted_renderer, 'format', None) == 'api':
+                return get(self, request, *args, **kwargs)
+
+            key = response_cache_key(app, request)
+            cached = cache.get(key)
+            if cached is not None:
+                _count(app, 'hits')
+                content_type, content = cached
+                return HttpResponse(content, content_type=content_type)
+
+            _count(app, 'misses')
+            response = get(self, request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(
+                        key, (rendered['Content-Type'], rendered.content), RESPONSE_CACHE_TIMEOUT
+                    )
+                )
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,288 @@
+"""
+Staging-table load for the forecast tables.
+
+A new cycle is copied into an unlogged `<table>_staging` without indexes,
+the indexes/constraints of the live table are rebuilt on it after the load,
+and it replaces the live table with a catalog rename. Readers keep querying
+the previous cycle until the swap commits; they only wait for the rename
+itself, not for the load.
+
+Only the load itself is unlogged: the staging table is made LOGGED before
+its indexes are built and it is swapped in, so the live table survives a
+crash and is replicated like any other.
+
+In the 'bulk' load mode the indexes are built with a larger
+maintenance_work_mem and parallel maintenance workers, set for the
+loading session only. Uniqueness is checked once, by the build of the
+unique index or by validate_unique_rows() for tables without one, instead
+of row by row during the COPY.
+
+Loads that arrive in time order (time blocks, parallel workers) can have
+the staging table rewritten in (station, time) order before its indexes
+are built, which gives the live table the physical order of a CLUSTER
+without ever locking it. rewrite_in_order() does the same for a live table
+that was loaded in place.
+"""
+import io
+import re
+import time
+import logging
+from django.conf import settings
+from django.db import connection, transaction, IntegrityError
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+SWAP_LOCK_TIMEOUT = '5s'
+SWAP_LOCK_RETRIES = 5
+
+STATION_TIME_ORDER = ('station_id', 'forecast_time')
+STAGING_LOAD_MODES = ('swap', 'bulk')
+
+_INDEXDEF_RE = re.compile(r'^CREATE (UNIQUE )?INDEX (\S+) ON (ONLY )?(\S+) USING ')
+
+
+def staging_table_name(model):
+    return f"{model._meta.db_table}_staging"
+
+
+def _staging_object_name(name):
+    return f"{name[:55]}_stg"
+
+
+def create_staging_table(model):
+    """Create an empty, unlogged, index-free copy of `model`'s table."""
+    live = model._meta.db_table
+    staging = staging_table_name(model)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS "{staging}";')
+        cursor.execute(f"""
+            CREATE UNLOGGED TABLE "{staging}"
+            (LIKE "{live}" INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS INCLUDING STORAGE);
+        """)
+    logger.info(f"Created staging table {staging}")
+    return staging
+
+
+def copy_frame_csv(model, df, mapping, table_name):
+    """CSV COPY of a DataFrame into a table CopyMapping cannot target (e.g. a staging table)."""
+    chunk = df[list(mapping.values())].copy()
+    for column in chunk.columns:
+        if chunk[column].dtype.kind == 'M':
+            chunk[column] = chunk[column].dt.strftime('%Y-%m-%d %H:%M:%S')
+    columns = ', '.join(f'"{model._meta.get_field(name).column}"' for name in mapping)
+    csv_buffer = io.StringIO()
+    chunk.to_csv(csv_buffer, index=False, header=False)
+    csv_buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY "{table_name}" ({columns}) FROM STDIN WITH (FORMAT csv)', csv_buffer)
+    csv_buffer.close()
+
+
+def insert_from_staging(model, staging, field_names, where='', params=None, on_conflict=None, order_by=None):
+    """
+    INSERT the `field_names` columns of the rows of `staging` matching
+    `where` into `model`'s table (e.g. the archive hours of a staged forecast).
+    With `on_conflict` (the columns of a unique constraint), rows that
+    already exist are skipped; with `order_by` (columns) the rows are
+    written in that order. Returns the number of rows inserted.
+    """
+    columns = ', '.join(f'"{model._meta.get_field(name).column}"' for name in field_names)
+    order = ''
+    if order_by:
+        order = 'ORDER BY {}'.format(', '.join(f'"{column}"' for column in order_by))
+    conflict = ''
+    if on_conflict:
+        conflict = 'ON CONFLICT ({}) DO NOTHING'.format(', '.join(f'"{column}"' for column in on_conflict))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO "{model._meta.db_table}" ({columns}) SELECT {columns} FROM "{staging}" {where} {order} {conflict};',
+            params,
+        )
+        return cursor.rowcount
+
+
+def live_table_definitions(table_name):
+    """
+    Index and constraint definitions of a table:
+    a list of (name, kind, definition) where kind is 'index', 'p', 'u' or 'f'.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT ic.relname, pg_get_indexdef(i.indexrelid), c.contype
+            FROM pg_index i
+            JOIN pg_class ic ON ic.oid = i.indexrelid
+            LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+            WHERE i.indrelid = %s::regclass
+            ORDER BY c.contype NULLS LAST, ic.relname;
+        """, [f'"{table_name}"'])
+        indexes = [(name, contype or 'index', indexdef) for name, indexdef, contype in cursor.fetchall()]
+        cursor.execute("""
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f';
+        """, [f'"{table_name}"'])
+        foreign_keys = [(name, 'f', definition) for name, definition in cursor.fetchall()]
+    return indexes + foreign_keys
+
+
+def retarget_index_definition(definition, index_name, table_name):
+    """Rewrite a pg_get_indexdef() statement to create `index_name` on `table_name`."""
+    return _INDEXDEF_RE.sub(
+        lambda m: f'CREATE {m.group(1) or ""}INDEX "{index_name}" ON "{table_name}" USING ', definition
+    )
+
+
+def build_staging_indexes(model, staging):
+    """
+    Recreate the live table's indexes, primary/unique keys and foreign keys
+    on `staging` under temporary names. Returns [(temporary name, original
+    name, is_constraint)] for the swap.
+    """
+    renames = []
+    with connection.cursor() as cursor:
+        for name, kind, definition in live_table_definitions(model._meta.db_table):
+            temp_name = _staging_object_name(name)
+            if kind == 'f':
+                cursor.execute(f'ALTER TABLE "{staging}" ADD CONSTRAINT "{temp_name}" {definition};')
+                renames.append((temp_name, name, True))
+                continue
+
+            start = time.time()
+            cursor.execute(retarget_index_definition(definition, temp_name, staging))
+            if kind in ('p', 'u'):
+                constraint = 'PRIMARY KEY' if kind == 'p' else 'UNIQUE'
+                cursor.execute(f'ALTER TABLE "{staging}" ADD CONSTRAINT "{temp_name}" {constraint} USING INDEX "{temp_name}";')
+            renames.append((temp_name, name, kind in ('p', 'u')))
+            logger.info(f"Built {name} on {staging} in {time.time() - start:.1f} s")
+    return renames
+
+
+def swap_staging_table(model, staging, renames):
+    """
+    Replace the live table with `staging` and give its indexes/constraints
+    the original names. The ACCESS EXCLUSIVE lock on the live table is only
+    held from here to the commit of the surrounding transaction.
+    """
+    live = model._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        for attempt in range(1, SWAP_LOCK_RETRIES + 1):
+            try:
+                with transaction.atomic():
+                    cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}';")
+                    cursor.execute(f'LOCK TABLE "{live}" IN ACCESS EXCLUSIVE MODE;')
+                break
+            except OperationalError:
+                if attempt == SWAP_LOCK_RETRIES:
+                    raise
+                logger.warning(f"Waiting for readers of {live} before swap (attempt {attempt})")
+
+        # identity sequence جدول staging از ۱ شروع شده، مثل TRUNCATE ... RESTART IDENTITY
+        cursor.execute(f'DROP TABLE "{live}";')
+        cursor.execute(f'ALTER TABLE "{staging}" RENAME TO "{live}";')
+        for temp_name, name, is_constraint in renames:
+            if is_constraint:
+                cursor.execute(f'ALTER TABLE "{live}" RENAME CONSTRAINT "{temp_name}" TO "{name}";')
+            else:
+                cursor.execute(f'ALTER INDEX "{temp_name}" RENAME TO "{name}";')
+
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id');", [f'"{live}"'])
+        sequence = cursor.fetchone()[0]
+        if sequence:
+            cursor.execute(f'ALTER SEQUENCE {sequence} RENAME TO "{live}_id_seq";')
+    logger.info(f"Swapped {staging} in as {live}")
+
+
+def _insert_sorted(cursor, source, target, order_by):
+    """Copy every row of `source` into `target` sorted by `order_by`, ids included."""
+    order = ', '.join(f'"{column}"' for column in order_by)
+    cursor.execute(f'INSERT INTO "{target}" SELECT * FROM "{source}" ORDER BY {order};')
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id');", [f'"{target}"'])
+    sequence = cursor.fetchone()[0]
+    if sequence:
+        # ردیف‌ها با id قبلی کپی شده‌اند؛ sequence جدول جدید باید جلو برود
+        cursor.execute(f'SELECT setval(%s, GREATEST((SELECT max(id) FROM "{target}"), 1));', [sequence])
+    return order
+
+
+def reorder_staging_table(staging, order_by):
+    """
+    Rewrite the (still index-free) `staging` table with its rows sorted by
+    the `order_by` columns, keeping its name, ids and identity sequence position.
+    """
+    start = time.time()
+    sorted_table = f"{staging[:55]}_sorted"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS "{sorted_table}";')
+        cursor.execute(f"""
+            CREATE UNLOGGED TABLE "{sorted_table}"
+            (LIKE "{staging}" INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS INCLUDING STORAGE);
+        """)
+        order = _insert_sorted(cursor, staging, sorted_table, order_by)
+        cursor.execute(f'DROP TABLE "{staging}";')
+        cursor.execute(f'ALTER TABLE "{sorted_table}" RENAME TO "{staging}";')
+    logger.info(f"Reordered {staging} by ({order}) in {time.time() - start:.1f} s")
+
+
+def tune_index_builds(cursor):
+    """Session settings of the bulk index builds, until the end of the current transaction."""
+    work_mem = getattr(settings, 'ETL_MAINTENANCE_WORK_MEM', '1GB')
+    workers = int(getattr(settings, 'ETL_PARALLEL_INDEX_WORKERS', 4))
+    cursor.execute("SELECT set_config('maintenance_work_mem', %s, true);", [work_mem])
+    cursor.execute("SELECT set_config('max_parallel_maintenance_workers', %s, true);", [str(workers)])
+    logger.info(f"Index builds with maintenance_work_mem={work_mem}, {workers} parallel workers")
+
+
+def validate_unique_rows(staging, columns):
+    """Raise IntegrityError if two rows of `staging` share the same `columns`."""
+    start = time.time()
+    key = ', '.join(f'"{column}"' for column in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {key} FROM "{staging}" GROUP BY {key} HAVING count(*) > 1 LIMIT 1;')
+        duplicate = cursor.fetchone()
+    if duplicate:
+        raise IntegrityError(f"{staging}: duplicate ({key}) = {duplicate}")
+    logger.info(f"Checked ({key}) is unique in {staging} in {time.time() - start:.1f} s")
+
+
+def publish_staging_table(model, staging, order_by=None, bulk=False, unique_columns=None):
+    """
+    Make `staging` durable, index it, analyze it and swap it in. With
+    `order_by` its rows are first rewritten in that order; with
+    `unique_columns` the rows are checked to be unique on them first; with
+    `bulk` the indexes are built with tune_index_builds().
+    """
+    if order_by:
+        reorder_staging_table(staging, order_by)
+    # قبل از ساخت ایندکس‌ها تا SET LOGGED آن‌ها را دوباره نسازد
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{staging}" SET LOGGED;')
+    with transaction.atomic():
+        if unique_columns:
+            validate_unique_rows(staging, unique_columns)
+        if bulk:
+            with connection.cursor() as cursor:
+                tune_index_builds(cursor)
+        renames = build_staging_indexes(model, staging)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE "{staging}";')
+    swap_staging_table(model, staging, renames)
+
+
+def rewrite_in_order(model, order_by):
+    """
+    Rewrite `model`'s live table in `order_by` order without locking it for
+    the rewrite: its rows are copied sorted into a staging table, which is
+    then indexed and swapped in like a new load.
+    """
+    start = time.time()
+    staging = create_staging_table(model)
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            order = _insert_sorted(cursor, model._meta.db_table, staging, order_by)
+        publish_staging_table(model, staging)
+    except Exception:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS "{staging}";')
+        raise
+    logger.info(f"Rewrote {model._meta.db_table} by ({order}) in {time.time() - start:.1f} s")
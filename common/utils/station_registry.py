@@ -0,0 +1,195 @@
+"""
+Station registration shared by the wind and wave ETLs.
+
+Coordinates are compared as rounded integer keys in NumPy instead of
+building one GEOS Point per station, new stations are inserted with a
+single COPY, and an unchanged grid is recognised from a hash stored in
+the etl_state table without reading the station table at all.
+"""
+import io
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from common.utils.etl_state import get_etl_state, set_etl_state
+
+logger = logging.getLogger(__name__)
+
+COORD_DECIMALS = 5
+_COORD_SCALE = 10 ** COORD_DECIMALS
+_LON_BITS = 27  # (lon + 180) * 1e5 < 2**27 for lon in [-180, 360]
+
+
+def coordinate_keys(lat, lon):
+    """One int64 per (lat, lon), rounded to COORD_DECIMALS decimals."""
+    lat_i = np.rint(np.asarray(lat, dtype=np.float64) * _COORD_SCALE).astype(np.int64) + 90 * _COORD_SCALE
+    lon_i = np.rint(np.asarray(lon, dtype=np.float64) * _COORD_SCALE).astype(np.int64) + 180 * _COORD_SCALE
+    return (lat_i << _LON_BITS) | lon_i
+
+
+def factorize_coordinates(lat, lon):
+    """
+    Station codes per row (0-based, numbered in order of first appearance,
+    as pd.factorize(list(zip(lat, lon)))) computed on the coordinate keys,
+    without a Python tuple per row. Returns (codes, first row of each station).
+    """
+    codes, uniques = pd.factorize(coordinate_keys(lat, lon))
+    first_rows = np.empty(uniques.size, dtype=np.int64)
+    # با نوشتن از آخر به اول، اولین ردیف هر ایستگاه باقی می‌ماند
+    first_rows[codes[::-1]] = np.arange(codes.size - 1, -1, -1)
+    return codes, first_rows
+
+
+def station_time_order(codes, times):
+    """
+    Row permutation putting rows in (station, time) order, or None when they
+    already are. Time-major blocks (every station once per time step, in
+    the same order), the layout of the tab files, are transposed by index
+    arithmetic; only other layouts fall back to a sort.
+    """
+    codes = np.asarray(codes)
+    times = np.asarray(times)
+    n_rows = codes.size
+    if n_rows < 2:
+        return None
+
+    step = np.diff(codes)
+    if (step >= 0).all() and ((step > 0) | (times[1:] >= times[:-1])).all():
+        return None
+
+    n_stations = int(codes.max()) + 1
+    if n_rows % n_stations == 0:
+        n_times = n_rows // n_stations
+        blocks = codes.reshape(n_times, n_stations)
+        block_times = times.reshape(n_times, n_stations)
+        if (blocks == np.arange(n_stations)).all() and (block_times[1:] >= block_times[:-1]).all():
+            return np.arange(n_rows).reshape(n_times, n_stations).T.ravel()
+
+    logger.info("Rows are not in time-major blocks, sorting by (station, time)")
+    return np.lexsort((times, codes))
+
+
+def station_grid_hash(station_ids, keys):
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(station_ids, dtype='<i8').tobytes())
+    digest.update(np.ascontiguousarray(keys, dtype='<i8').tobytes())
+    return digest.hexdigest()
+
+
+def load_station_coords(model):
+    """(ids, lat, lon) of every station in the table, as NumPy arrays."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT id, ST_Y(location::geometry), ST_X(location::geometry)
+            FROM "{model._meta.db_table}";
+        """)
+        rows = cursor.fetchall()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    ids, lat, lon = zip(*rows)
+    return np.array(ids, dtype=np.int64), np.array(lat, dtype=np.float64), np.array(lon, dtype=np.float64)
+
+
+def load_stations(model):
+    """(ids, lat, lon, names) of every station in the table, ordered by id, as NumPy arrays."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT id, ST_Y(location::geometry), ST_X(location::geometry), name
+            FROM "{model._meta.db_table}"
+            ORDER BY id;
+        """)
+        rows = cursor.fetchall()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), np.empty(0, dtype=object)
+    ids, lat, lon, names = zip(*rows)
+    return (
+        np.array(ids, dtype=np.int64), np.array(lat, dtype=np.float64),
+        np.array(lon, dtype=np.float64), np.array(names, dtype=object),
+    )
+
+
+def _station_count(model):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM "{model._meta.db_table}";')
+        return cursor.fetchone()[0]
+
+
+def copy_new_stations(model, station_ids, lat, lon, name_prefix):
+    """
+    Insert stations with one COPY into a temp table and a single
+    INSERT ... ON CONFLICT DO NOTHING (same effect as
+    bulk_create(ignore_conflicts=True)). Returns the number inserted.
+    """
+    table = model._meta.db_table
+    ids = pd.Series(np.asarray(station_ids, dtype=np.int64))
+    rows = pd.DataFrame({
+        'id': ids,
+        'location': 'SRID=4326;POINT(' + pd.Series(lon).astype(str) + ' ' + pd.Series(lat).astype(str) + ')',
+        'name': name_prefix + ids.astype(str),
+    })
+    buffer = io.StringIO()
+    rows.to_csv(buffer, sep='\t', header=False, index=False)
+    buffer.seek(0)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE TEMP TABLE tmp_new_stations (
+                    id bigint, location text, name varchar(255)
+                ) ON COMMIT DROP;
+            """)
+            cursor.copy_expert('COPY tmp_new_stations (id, location, name) FROM STDIN', buffer)
+            cursor.execute(f"""
+                INSERT INTO "{table}" (id, location, name, created_at, updated_at)
+                SELECT id, location::geography, name, now(), now() FROM tmp_new_stations
+                ON CONFLICT DO NOTHING;
+            """)
+            inserted = cursor.rowcount
+            # شناسه‌ها صریح درج شده‌اند، sequence باید جلو برود
+            cursor.execute(f"""
+                SELECT setval(pg_get_serial_sequence('"{table}"', 'id'),
+                              GREATEST((SELECT max(id) FROM "{table}"), 1));
+            """)
+    buffer.close()
+    return inserted
+
+
+def sync_stations(model, station_ids, lat, lon, name_prefix):
+    """
+    Make sure every (station_id, lat, lon) of the current grid exists in
+    `model`'s table. Returns the number of stations inserted (0 when the
+    grid was already registered).
+    """
+    table = model._meta.db_table
+    station_ids = np.asarray(station_ids, dtype=np.int64)
+    keys = coordinate_keys(lat, lon)
+    grid_hash = station_grid_hash(station_ids, keys)
+    state_key = f'station_grid:{table}'
+
+    stored = get_etl_state(state_key)
+    if stored and stored == f'{grid_hash}:{_station_count(model)}':
+        logger.info(f"Station grid unchanged ({len(station_ids)} stations), skipping registration.")
+        return 0
+
+    _, existing_lat, existing_lon = load_station_coords(model)
+    new_mask = ~np.isin(keys, coordinate_keys(existing_lat, existing_lon))
+    n_new = int(new_mask.sum())
+
+    inserted = 0
+    if n_new:
+        logger.info(f"Inserting {n_new} new stations into {table}...")
+        inserted = copy_new_stations(
+            model, station_ids[new_mask], np.asarray(lat)[new_mask], np.asarray(lon)[new_mask], name_prefix
+        )
+        if inserted < n_new:
+            logger.warning(f"{n_new - inserted} new stations conflicted with existing ids/names and were skipped.")
+    else:
+        logger.info("No new stations to insert.")
+
+    set_etl_state(state_key, f'{grid_hash}:{_station_count(model)}')
+    if inserted:
+        # station_resolver از همین ماژول import می‌کند
+        from common.utils.station_resolver import bump_station_version
+        bump_station_version(model)
+    return inserted
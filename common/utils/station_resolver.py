@@ -0,0 +1,211 @@
+"""
+In-process nearest-station lookup for the station views.
+
+The station table is loaded once per process into NumPy arrays. For a
+regular lat/lon grid (the wind stations come straight from the NetCDF
+axes) the nearest cell is found with index arithmetic; any other station
+set (e.g. the wave stations) uses a KD-tree on unit-sphere vectors, whose
+chord distance orders points like the great-circle distance does.
+
+The same arrays (plus the names) are the station lookup of the response
+path: station_info() maps a station id to (name, lat, lon) as plain
+Python values, so the serializers neither join the station table nor
+build a GEOS point per row; lookup_stations() does the same for a whole
+batch of rows of the streaming exports.
+
+The resolver is rebuilt when the `station_version:<table>` entry in
+etl_state changes, which the ETLs and the delete commands bump whenever
+stations are added or removed. The entry is re-read at most every
+RESOLVER_RECHECK_SECONDS.
+"""
+import time
+import threading
+import numpy as np
+from scipy.spatial import cKDTree
+from common.utils.etl_state import get_etl_state, set_etl_state
+from common.utils.station_registry import load_stations
+
+RESOLVER_RECHECK_SECONDS = 30
+
+_resolvers = {}
+_lock = threading.Lock()
+
+
+def _unit_vectors(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def _regular_axis(values):
+    """(first, step, size) if `values` are evenly spaced, else None."""
+    if values.size < 2:
+        return None
+    steps = np.diff(values)
+    step = steps.mean()
+    if step <= 0 or not np.allclose(steps, step, rtol=1e-6, atol=1e-6):
+        return None
+    return values[0], step, values.size
+
+
+class StationResolver:
+
+    def __init__(self, ids, lat, lon, names=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.names = np.full(self.ids.size, None, dtype=object) if names is None else np.asarray(names, dtype=object)
+        self.grid = None
+        self.tree = None
+        if self.ids.size:
+            self.grid = self._build_grid()
+            if self.grid is None:
+                self.tree = cKDTree(_unit_vectors(self.lat, self.lon))
+
+        # id -> ردیف: با شناسه‌های پشت سر هم (شماره‌گذاری ETL) فقط یک تفریق
+        self._first_id = None
+        self._order = None
+        if self.ids.size and (np.diff(self.ids) == 1).all():
+            self._first_id = int(self.ids[0])
+        else:
+            self._order = np.argsort(self.ids)
+        self._by_name = None
+
+    @property
+    def mode(self):
+        return 'grid' if self.grid is not None else 'kdtree' if self.tree is not None else 'empty'
+
+    def _build_grid(self):
+        lat_axis = _regular_axis(np.unique(self.lat))
+        lon_axis = _regular_axis(np.unique(self.lon))
+        if lat_axis is None or lon_axis is None or lat_axis[2] * lon_axis[2] != self.ids.size:
+            return None
+
+        lat_index = np.rint((self.lat - lat_axis[0]) / lat_axis[1]).astype(np.int64)
+        lon_index = np.rint((self.lon - lon_axis[0]) / lon_axis[1]).astype(np.int64)
+        table = np.full((lat_axis[2], lon_axis[2]), -1, dtype=np.int64)
+        table[lat_index, lon_index] = self.ids
+        if (table < 0).any():
+            # چند ایستگاه روی یک خانه افتاده‌اند، پس شبکه منظم نیست
+            return None
+        return lat_axis, lon_axis, table, lon_axis[0] + lon_axis[1] * (lon_axis[2] - 1) > 180
+
+    def _position(self, station_id):
+        if self._first_id is not None:
+            position = station_id - self._first_id
+            return position if 0 <= position < self.ids.size else None
+        index = int(np.searchsorted(self.ids, station_id, sorter=self._order))
+        if index < self.ids.size and self.ids[self._order[index]] == station_id:
+            return int(self._order[index])
+        return None
+
+    def station_info(self, station_id):
+        """(name, lat, lon) of a station as plain Python values, or None if it is not loaded."""
+        position = self._position(station_id)
+        if position is None:
+            return None
+        return self.names[position], float(self.lat[position]), float(self.lon[position])
+
+    def positions(self, station_ids):
+        """Row of each of `station_ids` in the loaded arrays, -1 for stations that are not loaded."""
+        station_ids = np.asarray(station_ids, dtype=np.int64)
+        if not self.ids.size:
+            return np.full(station_ids.shape, -1, dtype=np.int64)
+        if self._first_id is not None:
+            positions = station_ids - self._first_id
+            found = (positions >= 0) & (positions < self.ids.size)
+        else:
+            index = np.minimum(np.searchsorted(self.ids, station_ids, sorter=self._order), self.ids.size - 1)
+            positions = self._order[index]
+            found = self.ids[positions] == station_ids
+        return np.where(found, positions, -1)
+
+    def station_id_by_name(self, name):
+        if self._by_name is None:
+            self._by_name = dict(zip(self.names.tolist(), self.ids.tolist()))
+        return self._by_name.get(name)
+
+    def nearest_many(self, lat, lon):
+        """Station id of the nearest station for each (lat, lon); None for an empty table."""
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        if self.grid is not None:
+            lat_axis, lon_axis, table, lon_360 = self.grid
+            if lon_360:
+                lon = np.mod(lon, 360)
+            i = np.clip(np.rint((lat - lat_axis[0]) / lat_axis[1]), 0, lat_axis[2] - 1).astype(np.int64)
+            j = np.clip(np.rint((lon - lon_axis[0]) / lon_axis[1]), 0, lon_axis[2] - 1).astype(np.int64)
+            return table[i, j]
+        if self.tree is not None:
+            _, index = self.tree.query(_unit_vectors(lat, lon))
+            return self.ids[index]
+        return None
+
+    def nearest(self, lat, lon):
+        if self.grid is not None:
+            # بدون numpy برای یک نقطه: چند میکروثانیه
+            lat_axis, lon_axis, table, lon_360 = self.grid
+            if lon_360:
+                lon = lon % 360
+            i = min(max(round((lat - lat_axis[0]) / lat_axis[1]), 0), lat_axis[2] - 1)
+            j = min(max(round((lon - lon_axis[0]) / lon_axis[1]), 0), lon_axis[2] - 1)
+            return int(table[i, j])
+        ids = self.nearest_many(lat, lon)
+        return None if ids is None else int(ids[0])
+
+
+def station_version_key(model):
+    return f'station_version:{model._meta.db_table}'
+
+
+def bump_station_version(model):
+    """Mark the station set of `model` as changed for every process."""
+    set_etl_state(station_version_key(model), repr(time.time()))
+    _resolvers.pop(model._meta.db_table, None)
+
+
+def get_station_resolver(model):
+    table = model._meta.db_table
+    now = time.monotonic()
+    entry = _resolvers.get(table)
+    if entry and now - entry['checked_at'] < RESOLVER_RECHECK_SECONDS:
+        return entry['resolver']
+
+    with _lock:
+        entry = _resolvers.get(table)
+        version = get_etl_state(station_version_key(model), '')
+        if entry is None or entry['version'] != version:
+            entry = {'version': version, 'resolver': StationResolver(*load_stations(model))}
+        entry['checked_at'] = now
+        _resolvers[table] = entry
+    return entry['resolver']
+
+
+def lookup_stations(station_model, station_ids):
+    """
+    (names, lat, lon) arrays for `station_ids` from the station lookup of
+    `station_model`; stations added after it was loaded are read from the
+    table, and unknown ids get None / NaN.
+    """
+    station_ids = np.asarray(station_ids, dtype=np.int64)
+    resolver = get_station_resolver(station_model)
+    positions = resolver.positions(station_ids)
+    found = positions >= 0
+    names = np.full(station_ids.size, None, dtype=object)
+    lat = np.full(station_ids.size, np.nan)
+    lon = np.full(station_ids.size, np.nan)
+    names[found] = resolver.names[positions[found]]
+    lat[found] = resolver.lat[positions[found]]
+    lon[found] = resolver.lon[positions[found]]
+
+    missing = np.flatnonzero(~found)
+    if missing.size:
+        stations = {
+            station.pk: station
+            for station in station_model.objects.filter(pk__in=np.unique(station_ids[missing]).tolist())
+        }
+        for i in missing:
+            station = stations.get(int(station_ids[i]))
+            if station is not None:
+                names[i], lat[i], lon[i] = station.name, station.location.y, station.location.x
+    return names, lat, lon
@@ -0,0 +1,13 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from common.utils.response_cache import cache_stats
+
+
+class ResponseCacheStatsView(APIView):
+    '''
+    API: hit/miss counters and cycle version of the response cache of one app.
+    '''
+    cache_app = None
+
+    def get(self, request):
+        return Response(cache_stats(self.cache_app))
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     #gis
     'django.contrib.gis',
     #rest_framework
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
     #drf_yasg
     'drf_yasg',
     #apps
+    'common.apps.CommonConfig',
     'waveforecastapp.apps.WaveforecastappConfig',
     'windforecastapp.apps.WindforecastappConfig',
 ]
@@ -108,6 +110,26 @@ DATABASES = {
 }
 
 
+# کش پاسخ‌های API بین همه workerها مشترک است و با هر اجرای ETL نسخه‌ی جدید می‌گیرد
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    }
+}
+
+# جدولی که WindForecastView از آن می‌خواند: 'rows' (WindForecastModel) یا 'series' (WindForecastSeriesModel)
+# با 'series'، etl_wind باید با --storage series یا both اجرا شود
+WIND_FORECAST_STORAGE = 'rows'
+
+# ساخت ایندکس‌های جدول staging در load_mode='bulk' (فقط برای همان session)
+ETL_MAINTENANCE_WORK_MEM = '1GB'
+ETL_PARALLEL_INDEX_WORKERS = 4
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -1,6 +1,9 @@
 from django.core.management.base import BaseCommand
 # from windforecastapp.utils.move_data_to_db import move_to_db
 from waveforecastapp.models import WaveStationModel, WaveForecastModel, WaveArchiveModel
+from common.utils.station_resolver import bump_station_version
+from common.utils.response_cache import bump_cycle_version
+from common.utils.archive_load import reset_archive_watermark
 
 
 class Command(BaseCommand):
@@ -13,6 +16,9 @@ class Command(BaseCommand):
             WaveArchiveModel.objects.all().delete()
             WaveForecastModel.objects.all().delete()
             WaveStationModel.objects.all().delete()
+            bump_station_version(WaveStationModel)
+            bump_cycle_version('wave')
+            reset_archive_watermark(WaveArchiveModel)
             self.stdout.write(
                 self.style.SUCCESS('delete wave location successfully')
             )
@@ -4,22 +4,56 @@ from waveforecastapp.utils.ETL_wave_utils import etl_csv_to_db
 import time
 
 
+TAB01_PATH = 'D:\\project\\TotalDB\\TOTALDB_CYCLES\\wave\\gfs.2025081112\\tab01.csv'
+TAB41_PATH = 'D:\\project\\TotalDB\\TOTALDB_CYCLES\\wave\\gfs.2025081112\\tab41.csv'
+
+
+def load_mode(options):
+    if options['bulk']:
+        return 'bulk'
+    return 'swap' if options['swap'] else 'truncate'
+
+
 class Command(BaseCommand):
     help = 'transfer data from nc file to database'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--tab01', type=str, default=TAB01_PATH, help='Path to tab01.csv')
+        parser.add_argument('--tab41', type=str, default=TAB41_PATH, help='Path to tab41.csv')
+        parser.add_argument(
+            '--copy-format', choices=['csv', 'binary'], default='csv',
+            help='COPY through CopyMapping CSV text (default) or PostgreSQL binary format'
+        )
+        parser.add_argument(
+            '--swap', action='store_true',
+            help='Load the forecast into a staging table and swap it in instead of TRUNCATE + reload'
+        )
+        parser.add_argument(
+            '--bulk', action='store_true',
+            help='As --swap, checking uniqueness once and building the staging indexes afterwards with '
+                 'parallel workers and a larger maintenance_work_mem '
+                 '(ETL_MAINTENANCE_WORK_MEM / ETL_PARALLEL_INDEX_WORKERS)'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Load the forecast rows with this many processes into a staging table (implies --swap)'
+        )
+
     def handle(self, *args, **options):
         # file_path = 'G:\\MOBIN\\TOTALDB_CYCLES\\wave\\gfs.2025071800'
         # file_path_01 = 'G:\\MOBIN\\TOTALDB_CYCLES\\wave\\gfs.2025072112\\tab01.csv'
         # file_path_41 = 'G:\\MOBIN\\TOTALDB_CYCLES\\wave\\gfs.2025072112\\tab41.csv'
 
-        tab01_path = 'D:\\project\\TotalDB\\TOTALDB_CYCLES\\wave\\gfs.2025081112\\tab01.csv'
-        tab41_path = 'D:\\project\\TotalDB\\TOTALDB_CYCLES\\wave\\gfs.2025081112\\tab41.csv'
-
-
         try:
             start = time.time()
             # move_wave_to_db(file_path_01, file_path_41)
-            etl_csv_to_db(tab01_path, tab41_path)
+            etl_csv_to_db(
+                options['tab01'],
+                options['tab41'],
+                copy_format=options['copy_format'],
+                load_mode=load_mode(options),
+                workers=options['workers'],
+            )
             self.stdout.write(
                 self.style.SUCCESS(f"execution time: {time.time() - start:.2f} s")
             )
@@ -27,6 +61,3 @@ class Command(BaseCommand):
             self.stderr.write(
             self.style.ERROR(f'{e}')
             )
-            
-        
-
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from waveforecastapp.models import WaveArchiveModel
+from common.utils.partitions import manage_archive_partitions, list_partitions
+import time
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming wave archive partitions and detach or repack old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--create-ahead', type=int, default=1, help='Partitions to create after the current one')
+        parser.add_argument('--detach-older-than', type=int, default=None, help='Detach partitions that ended more than N months ago')
+        parser.add_argument('--repack-older-than', type=int, default=None, help='VACUUM FULL (fillfactor 100) partitions that ended more than N months ago')
+        parser.add_argument('--list', action='store_true', help='Only list the attached partitions')
+
+    def handle(self, *args, **options):
+        table_name = WaveArchiveModel._meta.db_table
+        try:
+            start = time.time()
+            if options['list']:
+                for name, first, end in list_partitions(table_name):
+                    self.stdout.write(f"{name}: {first} -> {end}")
+                return
+
+            result = manage_archive_partitions(
+                table_name,
+                create_ahead=options['create_ahead'],
+                detach_older_than=options['detach_older_than'],
+                repack_older_than=options['repack_older_than'],
+            )
+            for action, names in result.items():
+                for name in names:
+                    self.stdout.write(f"{action}: {name}")
+            self.stdout.write(
+                self.style.SUCCESS(f"wave archive partitions updated, execution time: {time.time() - start:.2f} s")
+            )
+        except Exception as e:
+            self.stderr.write(
+            self.style.ERROR(f'{e}')
+            )
@@ -0,0 +1,28 @@
+# Removes duplicate archive rows left by reruns and makes (station, forecast_time) unique.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waveforecastapp', '0004_partition_wavearchivemodel'),
+    ]
+
+    operations = [
+        # از هر (station, forecast_time) تکراری فقط قدیمی‌ترین ردیف نگه داشته می‌شود
+        migrations.RunSQL(
+            '''
+            DELETE FROM "waveforecastapp_wavearchivemodel" a
+            USING "waveforecastapp_wavearchivemodel" b
+            WHERE a.station_id = b.station_id
+              AND a.forecast_time = b.forecast_time
+              AND a.id > b.id;
+            ''',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='wavearchivemodel',
+            constraint=models.UniqueConstraint(fields=('station', 'forecast_time'), name='unique_wave_archive_station_time'),
+        ),
+    ]
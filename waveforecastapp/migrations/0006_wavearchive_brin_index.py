@@ -0,0 +1,43 @@
+# Replaces the archive B-tree indexes with a BRIN index on forecast_time; the
+# (station, forecast_time) unique constraint is the only B-tree left.
+
+import django.db.models.deletion
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waveforecastapp', '0005_unique_wavearchive_station_time'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='wavearchivemodel',
+            name='waveforecas_forecas_eb1378_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='wavearchivemodel',
+            name='waveforecas_station_952b11_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='wavearchivemodel',
+            name='waveforecas_forecas_195a78_idx',
+        ),
+        # ایندکس station_id توسط ایندکس یکتای (station, forecast_time) پوشش داده می‌شود
+        migrations.AlterField(
+            model_name='wavearchivemodel',
+            name='station',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='waveforecastapp.wavestationmodel', verbose_name='station'),
+        ),
+        # ایندکسی که ETL قبلاً خودش می‌ساخت
+        migrations.RunSQL(
+            'DROP INDEX IF EXISTS "wavearchive_forecast_time_idx";',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='wavearchivemodel',
+            index=django.contrib.postgres.indexes.BrinIndex(autosummarize=True, fields=['forecast_time'], name='wavearchive_time_brin'),
+        ),
+    ]
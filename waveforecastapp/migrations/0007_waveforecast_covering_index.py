@@ -0,0 +1,33 @@
+# Adds a (station, forecast_time) INCLUDE (...) covering index to the forecast
+# table, so station + time range queries are answered by index-only scans, and
+# drops the single-column indexes it makes redundant.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waveforecastapp', '0006_wavearchive_brin_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='waveforecastmodel',
+            name='waveforecas_station_d54fde_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='waveforecastmodel',
+            name='waveforecas_forecas_ce5196_idx',
+        ),
+        migrations.AlterField(
+            model_name='waveforecastmodel',
+            name='station',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='waveforecastapp.wavestationmodel', verbose_name='station'),
+        ),
+        migrations.AddIndex(
+            model_name='waveforecastmodel',
+            index=models.Index(fields=['station', 'forecast_time'], include=('id', 'tp', 'hs', 'hmax', 'tz', 'wave_direction'), name='waveforecast_station_cover'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Drops the forecast_time index that the ETL used to create outside the migrations;
+# the forecast table's indexes are the ones declared on the model.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waveforecastapp', '0007_waveforecast_covering_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'DROP INDEX IF EXISTS "waveforecast_forecast_time_idx";',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.indexes import BrinIndex
 from postgres_copy import CopyManager
 from django.utils.translation import gettext_lazy as _
 
@@ -38,7 +39,7 @@ class WaveStationModel(models.Model):
         return f"{self.name} - {self.latitude} - {self.longitude}"
 
 class WaveForecastModel(models.Model):
-    station = models.ForeignKey(WaveStationModel, on_delete=models.CASCADE, related_name="forecast", verbose_name=_("station"))
+    station = models.ForeignKey(WaveStationModel, on_delete=models.CASCADE, related_name="forecast", verbose_name=_("station"), db_index=False)
     forecast_time = models.DateTimeField(verbose_name=_("forecast_time"))
     tp = models.FloatField(verbose_name=_("Tp"), help_text='from tab01') #
     hs = models.FloatField(verbose_name=_("Hs"), help_text='from tab41/ Unit(m)') #  
@@ -52,10 +53,14 @@ class WaveForecastModel(models.Model):
 
     class Meta:
         
+        # ایندکس covering: کوئری ایستگاه + بازه‌ی زمانی بدون مراجعه به heap جواب داده می‌شود
         indexes = [
             models.Index(fields=["forecast_time", "station"]),
-            models.Index(fields=["station"]),
-            models.Index(fields=["forecast_time"]),
+            models.Index(
+                fields=["station", "forecast_time"],
+                include=["id", "tp", "hs", "hmax", "tz", "wave_direction"],
+                name="waveforecast_station_cover",
+            ),
         ]
         
 
@@ -63,7 +68,7 @@ class WaveForecastModel(models.Model):
 
 
 class WaveArchiveModel(models.Model):
-    station = models.ForeignKey(WaveStationModel, on_delete=models.CASCADE, related_name="archive", verbose_name=_("station"))
+    station = models.ForeignKey(WaveStationModel, on_delete=models.CASCADE, related_name="archive", verbose_name=_("station"), db_index=False)
     forecast_time = models.DateTimeField(verbose_name=_("forecast_time"))
     tp = models.FloatField(verbose_name=_("Tp"), help_text='from tab01') #
     hs = models.FloatField(verbose_name=_("Hs"), help_text='from tab41/ Unit(m)') #  
@@ -76,9 +81,13 @@ class WaveArchiveModel(models.Model):
 
     class Meta:
         # unique_together = ("station", "forecast_time")
+        # شامل کلید partition است؛ ETL با ON CONFLICT DO NOTHING روی آن append می‌کند
+        constraints = [
+            models.UniqueConstraint(fields=["station", "forecast_time"], name="unique_wave_archive_station_time")
+        ]
+        # ایندکس یکتای بالا همان B-tree روی (station, forecast_time) است؛
+        # برای بازه‌های زمانی BRIN کافی است چون ردیف‌ها به ترتیب زمان append می‌شوند
         indexes = [
-            models.Index(fields=["forecast_time", "station"]),
-            models.Index(fields=["station"]),
-            models.Index(fields=["forecast_time"]),
+            BrinIndex(fields=["forecast_time"], name="wavearchive_time_brin", autosummarize=True),
         ]
     objects = CopyManager() 
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
+from common.serializers import StationLookupSerializer
 from .models import WaveStationModel, WaveForecastModel, WaveArchiveModel
 
 
@@ -8,10 +9,8 @@ class WaveArchiveDataSerializer(serializers.ModelSerializer):
         model = WaveStationModel
         exclude = ['station']
 
-class WaveForecastSerializer(serializers.ModelSerializer):
-    station_name = serializers.CharField(source='station.name', read_only=True)# چون در این فیلد ما کلید خارجی داریم و فیلد با نام station هست پس میگیم از station فقط name رو نمایش بده
-    latitude = serializers.SerializerMethodField()
-    longitude = serializers.SerializerMethodField()
+class WaveForecastSerializer(StationLookupSerializer):
+    # station_name/latitude/longitude از lookup ایستگاه‌ها، بدون join
 
     class Meta:
         model = WaveForecastModel
@@ -22,17 +21,9 @@ class WaveForecastSerializer(serializers.ModelSerializer):
             'forecast_time', 
             'tp','hs','hmax','tz','wave_direction'
         ]
-        
-    def get_latitude(self, obj):
-        return obj.station.location.y
-
-    def get_longitude(self, obj):
-        return obj.station.location.x
 
-class WaveArchiveSerializer(serializers.ModelSerializer):
-    station_name = serializers.CharField(source='station.name', read_only=True)# چون در این فیلد ما کلید خارجی داریم و فیلد با نام station هست پس میگیم از station فقط name رو نمایش بده
-    latitude = serializers.SerializerMethodField()
-    longitude = serializers.SerializerMethodField()
+class WaveArchiveSerializer(StationLookupSerializer):
+    # station_name/latitude/longitude از lookup ایستگاه‌ها، بدون join
 
     class Meta:
         model = WaveArchiveModel
@@ -43,12 +34,6 @@ class WaveArchiveSerializer(serializers.ModelSerializer):
             'forecast_time', 
             'tp','hs','hmax','tz','wave_direction'
         ]
-        
-    def get_latitude(self, obj):
-        return obj.station.location.y
-
-    def get_longitude(self, obj):
-        return obj.station.location.x
 
 
 
@@ -15,9 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.urls import path
+from common.views import ResponseCacheStatsView
 from .views import(
     WaveForecastView,
     WaveForecastBoundingBoxView,
+    WaveForecastBatchView,
     WaveArchiveView,
     WaveArchiveBoundingBoxView
 )
@@ -25,6 +27,8 @@ from .views import(
 urlpatterns = [
     path('waveforecast/station/', WaveForecastView.as_view(), name='waveforecast'),
     path('waveforecast/bbox/', WaveForecastBoundingBoxView.as_view(), name='waveforecastbbox'),
+    path('waveforecast/batch/', WaveForecastBatchView.as_view(), name='waveforecastbatch'),
     path('wavearchive/station/', WaveArchiveView.as_view(), name='wavearchive'),
     path('wavearchive/bbox/', WaveArchiveBoundingBoxView.as_view(), name='wavearchivebbox'),
+    path('cache/stats/', ResponseCacheStatsView.as_view(cache_app='wave'), name='wavecachestats'),
 ]
@@ -8,10 +8,20 @@ from io import StringIO
 import io
 import gc
 from datetime import timedelta
-from django.contrib.gis.geos import Point
 from django.db import transaction, connection
 from waveforecastapp.models import WaveStationModel, WaveForecastModel, WaveArchiveModel
 from postgres_copy import CopyMapping
+from common.utils.binary_copy import copy_frame_binary, shortest_float64
+from common.utils.station_registry import sync_stations, factorize_coordinates, station_time_order
+from waveforecastapp.utils.wave_csv import read_wave_tabs
+from common.utils.staging import (
+    create_staging_table, copy_frame_csv, publish_staging_table, STATION_TIME_ORDER, STAGING_LOAD_MODES
+)
+from common.utils.parallel_load import run_parallel
+from common.utils.partitions import ensure_partitions
+from common.utils.maintenance import vacuum_table, reorganize_forecast
+from common.utils.archive_load import get_archive_watermark, archive_window, publish_archive_staging, append_archive
+from common.utils.response_cache import bump_cycle_version
 
 # ---------- Logging ----------
 logging.basicConfig(
@@ -24,9 +34,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-STATION_BATCH = 10000
 CHUNK_SIZE = 500000
 
+FORECAST_MAPPING = {
+    'station_id': 'station_id',
+    'forecast_time': 'Time',
+    'tp': 'Tp',
+    'hs': 'Hs',
+    'hmax': 'Hmax',
+    'tz': 'Tr',
+    'wave_direction': 'Dir'
+}
+
 def ensure_index_exists(table_name, index_name, index_type, column_name):
     with connection.cursor() as cursor:
         cursor.execute(f"""
@@ -38,96 +57,148 @@ def ensure_index_exists(table_name, index_name, index_type, column_name):
             END$$;
         """)
 
-def cluster_table_on_index(table_name, index_name):
-    with connection.cursor() as cursor:
-        cursor.execute(f"CLUSTER {table_name} USING {index_name};")
+def copy_dataframe_chunks(model, df, mapping, copy_format='csv', label='forecast', table_name=None):
+    for start in range(0, len(df), CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, len(df))
+        if copy_format == 'binary':
+            copy_frame_binary(model, df.iloc[start:end], mapping, table_name)
+        elif table_name and table_name != model._meta.db_table:
+            copy_frame_csv(model, df.iloc[start:end], mapping, table_name)
+        else:
+            chunk = df.iloc[start:end].copy()
+            chunk['Time'] = chunk['Time'].dt.strftime('%Y-%m-%d %H:%M:%S')
+            csv_buffer = io.StringIO()
+            chunk.to_csv(csv_buffer, index=False)
+            csv_buffer.seek(0)
+            cm = CopyMapping(model, csv_buffer, mapping)
+            cm.save()
+            csv_buffer.close()
+            del chunk, csv_buffer
+            gc.collect()
+        logger.info("Inserted %s chunk %d-%d", label, start, end)
+
+def copy_rows_worker(chunk, staging_table, copy_format):
+    """Worker of etl_forecast_parallel: COPY one slice of the forecast rows into the staging table."""
+    copy_dataframe_chunks(WaveForecastModel, chunk, FORECAST_MAPPING, copy_format, label='forecast', table_name=staging_table)
+    return len(chunk)
+
+
+def publish_forecast_staging(staging_table, load_mode):
+    # WaveForecastModel ایندکس یکتا ندارد؛ در حالت bulk یکتایی (station, time) یک بار بررسی می‌شود
+    bulk = load_mode == 'bulk'
+    publish_staging_table(
+        WaveForecastModel, staging_table, bulk=bulk, unique_columns=STATION_TIME_ORDER if bulk else None
+    )
+
+
+def etl_forecast_parallel(data_df, workers, copy_format='csv', load_mode='swap'):
+    """
+    COPY the forecast rows with `workers` processes (one station range each,
+    data_df is sorted by station) into an unlogged staging table, then copy
+    the archive hours newer than the archive mark from it and swap it in
+    ('bulk': with a uniqueness check and tuned parallel index builds), in
+    one transaction.
+    """
+    first_time = data_df['Time'].min()
+    twelve_hours_later = first_time + timedelta(hours=11)
+    ensure_partitions(WaveArchiveModel._meta.db_table, first_time, twelve_hours_later)
+
+    bounds = np.linspace(0, len(data_df), workers * 2 + 1).astype(int)
+    staging_table = None
+    try:
+        # جدول staging باید commit شده باشد تا workerها آن را ببینند
+        staging_table = create_staging_table(WaveForecastModel)
+        tasks = [
+            (data_df.iloc[start:end], staging_table, copy_format)
+            for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+        ]
+        logger.info("Inserting WaveForecastModel data with %d workers into %s...", workers, staging_table)
+        logger.info("Forecast rows: %d", sum(run_parallel(copy_rows_worker, tasks, workers)))
 
-def etl_csv_to_db(tab01_path, tab41_path):
+        with transaction.atomic():
+            where, params = archive_window(twelve_hours_later, get_archive_watermark(WaveArchiveModel))
+            archive_rows = publish_archive_staging(
+                WaveArchiveModel, staging_table, list(FORECAST_MAPPING), where, params
+            )
+            logger.info("Archive rows appended (first 12h): %d", archive_rows)
+            publish_forecast_staging(staging_table, load_mode)
+    except Exception:
+        if staging_table:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS "{staging_table}";')
+        raise
+
+    bump_cycle_version('wave')
+
+
+def etl_csv_to_db(tab01_path, tab41_path, copy_format='csv', load_mode='truncate', workers=1):
     logger.info("Starting Wave ETL...")
 
     # --- خواندن CSVها ---
-    df_tab01 = pd.read_csv(tab01_path, skiprows=[1])
-    df_tab01 = df_tab01[["Time","Long","Lat","Tp"]]
-    df_tab01["Time"] = pd.to_datetime(df_tab01["Time"], format="%Y/%m/%d %H:%M:%S")
-
-    df_tab41 = pd.read_csv(tab41_path, skiprows=[1])
-    df_tab41 = df_tab41[["Hs","Tr","Dir"]]
-    df_tab41["Hs"] = pd.to_numeric(df_tab41["Hs"], errors='coerce')
-    df_tab41["Tr"] = pd.to_numeric(df_tab41["Tr"], errors='coerce')
-    df_tab41["Dir"] = pd.to_numeric(df_tab41["Dir"], errors='coerce')
-    df_tab41["Hmax"] = df_tab41["Hs"] * 1.8
+    # فقط ستون‌های لازم، با نوع مشخص؛ هر دو فایل همزمان خوانده می‌شوند
+    df_tab01, df_tab41 = read_wave_tabs(tab01_path, tab41_path)
+    # مثل قبل در float64: Hs با همان مقدار متن فایل (نه float32 گسترش یافته) ضرب می‌شود
+    df_tab41["Hmax"] = shortest_float64(df_tab41["Hs"].to_numpy()) * 1.8
 
     # --- ادغام فایل‌ها ---
     df_merged = pd.concat([df_tab01, df_tab41], axis=1)
-    df_merged['station_id'] = pd.factorize(list(zip(df_merged['Lat'], df_merged['Long'])))[0] + 1
-    df_merged = df_merged.sort_values(by=['station_id', 'Time']).reset_index(drop=True)
+    del df_tab01, df_tab41
+
+    # station_id از کلید عددی lat/lon؛ بدون tuple برای هر ردیف
+    lat = df_merged['Lat'].to_numpy()
+    lon = df_merged['Long'].to_numpy()
+    codes, first_rows = factorize_coordinates(lat, lon)
 
     # --- ساخت جدول ایستگاه‌ها ---
-    stations_df = df_merged[['station_id', 'Lat', 'Long']].drop_duplicates().sort_values(by='station_id').reset_index(drop=True)
-    existing_coords = set(WaveStationModel.objects.values_list('location', flat=True))
-    new_stations = []
-
-    for _, row in stations_df.iterrows():
-        point = Point(row['Long'], row['Lat'], srid=4326)
-        if point not in existing_coords:
-            new_stations.append(
-                WaveStationModel(
-                    id=int(row['station_id']),
-                    location=point,
-                    name=f"wave_station_{int(row['station_id'])}"
-                )
-            )
+    sync_stations(
+        WaveStationModel,
+        np.arange(1, first_rows.size + 1),
+        lat[first_rows],
+        lon[first_rows],
+        name_prefix='wave_station_',
+    )
+
+    # --- آماده‌سازی داده‌ها: ترتیب (station, time) بدون sort سراسری ---
+    df_merged['station_id'] = codes + 1
+    data_df = df_merged.drop(columns=['Lat', 'Long'])
+    order = station_time_order(codes, data_df['Time'].to_numpy())
+    if order is not None:
+        data_df = data_df.take(order)
+    data_df = data_df.reset_index(drop=True)
+    del df_merged, lat, lon, codes
+
+    mapping_forecast = FORECAST_MAPPING
+
+    if workers > 1:
+        etl_forecast_parallel(data_df, workers, copy_format, load_mode='bulk' if load_mode == 'bulk' else 'swap')
+        manage_indexes()
+        logger.info("Wave ETL completed successfully.")
+        return
 
-    if new_stations:
-        logger.info("Inserting %d new wave stations...", len(new_stations))
+    # --- پاک کردن جدول‌ها و درج داده‌ها ---
+    if load_mode in STAGING_LOAD_MODES:
+        # forecast جدید در جدول staging بارگذاری و بعد با rename جایگزین می‌شود
+        # bulk: ایندکس‌ها بعد از COPY به صورت موازی و با maintenance_work_mem بیشتر ساخته می‌شوند
         with transaction.atomic():
-            for i in range(0, len(new_stations), STATION_BATCH):
-                batch = new_stations[i:i+STATION_BATCH]
-                WaveStationModel.objects.bulk_create(batch, ignore_conflicts=True, batch_size=STATION_BATCH)
-                logger.info("Inserted station batch %d-%d", i, i+len(batch))
-        del new_stations
-        gc.collect()
+            staging_table = create_staging_table(WaveForecastModel)
+            logger.info("Inserting WaveForecastModel data into %s...", staging_table)
+            copy_dataframe_chunks(
+                WaveForecastModel, data_df, mapping_forecast, copy_format, label='forecast', table_name=staging_table
+            )
+            publish_forecast_staging(staging_table, load_mode)
     else:
-        logger.info("No new wave stations to insert.")
+        logger.info("Truncating WaveForecastModel table...")
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE TABLE "{WaveForecastModel._meta.db_table}" RESTART IDENTITY CASCADE;')
+        logger.info("WaveForecastModel truncated successfully.")
 
-    # --- آماده‌سازی داده‌ها ---
-    data_df = df_merged.drop(columns=['Lat', 'Long']).sort_values(by=['station_id', 'Time']).reset_index(drop=True)
 
-    mapping_forecast = {
-        'station_id': 'station_id',
-        'forecast_time': 'Time',
-        'tp': 'Tp',
-        'hs': 'Hs',
-        'hmax': 'Hmax',
-        'tz': 'Tr',
-        'wave_direction': 'Dir'
-    }
+        # logger.info("Clearing WaveForecastModel table...")
+        # with transaction.atomic():
+        #     WaveForecastModel.objects.all().delete()
 
-    # --- پاک کردن جدول‌ها و درج داده‌ها ---
-    logger.info("Truncating WaveForecastModel table...")
-    with connection.cursor() as cursor:
-        cursor.execute(f'TRUNCATE TABLE "{WaveForecastModel._meta.db_table}" RESTART IDENTITY CASCADE;')
-    logger.info("WaveForecastModel truncated successfully.")
-
-
-    # logger.info("Clearing WaveForecastModel table...")
-    # with transaction.atomic():
-    #     WaveForecastModel.objects.all().delete()
-
-    logger.info("Inserting WaveForecastModel data in chunks...")
-    for start in range(0, len(data_df), CHUNK_SIZE):
-        end = min(start + CHUNK_SIZE, len(data_df))
-        chunk = data_df.iloc[start:end].copy()
-        chunk['Time'] = chunk['Time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-        csv_buffer = io.StringIO()
-        chunk.to_csv(csv_buffer, index=False)
-        csv_buffer.seek(0)
-        cm = CopyMapping(WaveForecastModel, csv_buffer, mapping_forecast)
-        cm.save()
-        csv_buffer.close()
-        del chunk, csv_buffer
-        gc.collect()
-        logger.info("Inserted forecast chunk %d-%d", start, end)
+        logger.info("Inserting WaveForecastModel data in chunks...")
+        copy_dataframe_chunks(WaveForecastModel, data_df, mapping_forecast, copy_format, label='forecast')
 
     # --- آرشیو: ۱۲ ساعت اول ---
     first_time = data_df['Time'].min()
@@ -139,30 +210,36 @@ def etl_csv_to_db(tab01_path, tab41_path):
     # with transaction.atomic():
     #     WaveArchiveModel.objects.all().delete()
 
-    logger.info("Inserting WaveArchiveModel data (first 12h)...")
-    for start in range(0, len(archive_df), CHUNK_SIZE):
-        end = min(start + CHUNK_SIZE, len(archive_df))
-        chunk = archive_df.iloc[start:end].copy()
-        chunk['Time'] = chunk['Time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-        csv_buffer = io.StringIO()
-        chunk.to_csv(csv_buffer, index=False)
-        csv_buffer.seek(0)
-        cm = CopyMapping(WaveArchiveModel, csv_buffer, mapping_archive)
-        cm.save()
-        csv_buffer.close()
-        del chunk, csv_buffer
-        gc.collect()
-        logger.info("Inserted archive chunk %d-%d", start, end)
-
-    # --- ایندکس‌ها و Clustering ---
+    # فقط زمان‌های بعد از آخرین زمان آرشیو شده؛ اجرای دوباره‌ی یک سیکل چیزی اضافه نمی‌کند
+    logger.info("Appending WaveArchiveModel data (first 12h)...")
+    ensure_partitions(WaveArchiveModel._meta.db_table, first_time, twelve_hours_later)
+    archive_rows = append_archive(
+        WaveArchiveModel, archive_df, list(mapping_archive),
+        lambda frame, table: copy_dataframe_chunks(
+            WaveArchiveModel, frame, mapping_archive, copy_format, label='archive', table_name=table
+        ),
+        time_column='Time',
+    )
+    logger.info("Archive rows appended: %d", archive_rows)
+
+    # پاسخ‌های کش شده‌ی سیکل قبلی دیگر استفاده نمی‌شوند
+    bump_cycle_version('wave')
+
+    manage_indexes()
+
+    logger.info("Wave ETL completed successfully.")
+
+
+def manage_indexes():
+    # --- ایندکس‌ها، مرتب‌سازی و Vacuum (به جای CLUSTER جدول ایستگاه‌ها) ---
     try:
         ensure_index_exists(WaveStationModel._meta.db_table, 'wave_location_gist_idx', 'GIST', 'location')
-        ensure_index_exists(WaveForecastModel._meta.db_table, 'waveforecast_forecast_time_idx', 'BTREE', 'forecast_time')
-        ensure_index_exists(WaveArchiveModel._meta.db_table, 'wavearchive_forecast_time_idx', 'BTREE', 'forecast_time')
 
-        cluster_table_on_index(WaveStationModel._meta.db_table, 'wave_location_gist_idx')
-        logger.info("Indexes and clustering applied successfully.")
-    except Exception as e:
-        logger.exception("Error managing indexes or clustering: %s", e)
+        # فقط وقتی مجموعه‌ی ایستگاه‌ها عوض شده باشد
+        reorganize_forecast(WaveForecastModel, WaveStationModel)
 
-    logger.info("Wave ETL completed successfully.")
\ No newline at end of file
+        # visibility map برای index-only scan روی ایندکس covering
+        vacuum_table(WaveForecastModel._meta.db_table)
+        logger.info("Indexes, reorganization and vacuum applied successfully.")
+    except Exception as e:
+        logger.exception("Error managing indexes, reorganization or vacuum: %s", e)
\ No newline at end of file
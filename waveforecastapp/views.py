@@ -4,7 +4,6 @@ from .serializers import WaveForecastSerializer, WaveArchiveSerializer
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
-from django.core.cache import cache
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.utils.dateparse import parse_datetime
@@ -12,6 +11,19 @@ from django.utils.timezone import make_aware
 from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.geos import Point
 from django.contrib.gis.geos import Polygon
+from common.utils.station_resolver import get_station_resolver
+from common.utils.columnar import columnar_bbox
+from common.utils.arrow_export import arrow_available, arrow_streaming_response
+from common.utils.json_stream import json_streaming_response, should_stream
+from common.utils.response_cache import cycle_cached
+from common.utils.batch_query import resolve_batch_stations, forecasts_by_station, batch_forecast_response
+from common.serializers import BatchForecastRequestSerializer
+from common.renderers import (
+    ARCHIVE_BBOX_RENDERER_CLASSES, BBOX_RENDERER_CLASSES, STATION_RENDERER_CLASSES,
+    is_columnar, binary_export_format, json_stream_format,
+)
+
+WAVE_VARIABLES = ['tp', 'hs', 'hmax', 'tz', 'wave_direction']
 
 
 # Create your views here.
@@ -19,6 +31,8 @@ class WaveForecastView(APIView):
     '''
     API: get wave forecast based on station name or location (lat/lon) and forecast_time.
     '''
+    renderer_classes = STATION_RENDERER_CLASSES
+
     @swagger_auto_schema(
         manual_parameters=[
             openapi.Parameter('name', openapi.IN_QUERY, description="Station Name (e.g. Station_0)", type=openapi.TYPE_STRING, required=False),
@@ -26,8 +40,10 @@ class WaveForecastView(APIView):
             openapi.Parameter('lon', openapi.IN_QUERY, description="Longitude (e.g. 54.78)", type=openapi.TYPE_NUMBER, required=False),
             openapi.Parameter('startdate', openapi.IN_QUERY, description="Start datetime (YYYY-MM-DDTHH:MM:SS)", type=openapi.TYPE_STRING, required=True),
             openapi.Parameter('enddate', openapi.IN_QUERY, description="End datetime (YYYY-MM-DDTHH:MM:SS)", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('format', openapi.IN_QUERY, description="'arrow' (Arrow IPC stream) or 'parquet'", type=openapi.TYPE_STRING, required=False),
     ])
 
+    @cycle_cached('wave')
     def get(self, request):
         name = request.query_params.get('name')
         lat = request.query_params.get('lat')
@@ -38,19 +54,17 @@ class WaveForecastView(APIView):
         station = None
 
         if name:
-            try:
-                station = WaveStationModel.objects.get(name=name)
-            except WaveStationModel.DoesNotExist:
-                return Response({"error": "Station not found by name"}, status=status.HTTP_404_NOT_FOUND)
+            # نام از lookup ایستگاه‌ها؛ ایستگاهی که هنوز در lookup نیست از جدول خوانده می‌شود
+            station = get_station_resolver(WaveStationModel).station_id_by_name(name)
+            if station is None:
+                try:
+                    station = WaveStationModel.objects.get(name=name).pk
+                except WaveStationModel.DoesNotExist:
+                    return Response({"error": "Station not found by name"}, status=status.HTTP_404_NOT_FOUND)
 
         elif lat and lon:
             try:
-                point = Point(float(lon), float(lat), srid=4326)   
-                station = (
-                    WaveStationModel.objects.annotate(distance=Distance('location', point))
-                    .order_by('distance')
-                    .first()
-                ) 
+                station = get_station_resolver(WaveStationModel).nearest(float(lat), float(lon))
             except Exception:
                 return Response({"error": "Invalid coordinates"}, status=status.HTTP_400_BAD_REQUEST)
         else:
@@ -66,6 +80,12 @@ class WaveForecastView(APIView):
             except Exception as e:
                 return Response({"error": f"{e}"}, status=status.HTTP_400_BAD_REQUEST)
 
+        output_format = binary_export_format(request)
+        if output_format:
+            if not arrow_available():
+                return Response({"error": "Arrow/Parquet output requires pyarrow on the server."}, status=501)
+            return arrow_streaming_response(forecasts, WAVE_VARIABLES, output_format)
+
         serializer = WaveForecastSerializer(forecasts, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -79,6 +99,8 @@ class WaveForecastBoundingBoxView(APIView):
       - start_date, end_date (ISO format)
     محدودیت: حداکثر اندازه محدوده = ۰.۵ درجه
     """
+    renderer_classes = BBOX_RENDERER_CLASSES
+
     @swagger_auto_schema(
         manual_parameters=[
             openapi.Parameter('min_lat', openapi.IN_QUERY, description="Minimum Latitude (e.g. 24.56)", type=openapi.TYPE_NUMBER, required=False),
@@ -87,12 +109,14 @@ class WaveForecastBoundingBoxView(APIView):
             openapi.Parameter('max_lon', openapi.IN_QUERY, description="Maximum Longitude (e.g. 71.78)", type=openapi.TYPE_NUMBER, required=False),
             openapi.Parameter('start_date', openapi.IN_QUERY, description="Start datetime (YYYY-MM-DDTHH:MM:SS)", type=openapi.TYPE_STRING, required=True),
             openapi.Parameter('end_date', openapi.IN_QUERY, description="End datetime (YYYY-MM-DDTHH:MM:SS)", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('format', openapi.IN_QUERY, description="'columnar': station metadata once and [station][time] arrays per variable; 'arrow' (Arrow IPC stream) or 'parquet'", type=openapi.TYPE_STRING, required=False),
     ],
     responses={
             400 : 'The size of the Boundin box should not be more than 0.5 degrees.'
         }
     )
 
+    @cycle_cached('wave')
     def get(self, request):
         try:
             min_lat = float(request.query_params.get('min_lat'))
@@ -126,15 +150,51 @@ class WaveForecastBoundingBoxView(APIView):
         forecasts = WaveForecastModel.objects.filter(
             station__in=stations,
             forecast_time__range=(start_date, end_date)
-        ).select_related('station').order_by('station_id', 'forecast_time')
+        ).order_by('station_id', 'forecast_time')
         # print('forecasts',forecasts)
 
         if not forecasts.exists():
             return Response({"error": "No forecast data found in time and location range."}, status=404)
 
+        output_format = binary_export_format(request)
+        if output_format:
+            if not arrow_available():
+                return Response({"error": "Arrow/Parquet output requires pyarrow on the server."}, status=501)
+            return arrow_streaming_response(forecasts, WAVE_VARIABLES, output_format)
+
+        if is_columnar(request):
+            return Response(columnar_bbox(stations, forecasts, WAVE_VARIABLES), status=200)
+
         serializer = WaveForecastSerializer(forecasts, many=True)
         return Response(serializer.data, status=200)
 
+
+class WaveForecastBatchView(APIView):
+    """
+    API: پیش‌بینی موج برای چند نقطه در یک درخواست
+    POST body:
+      - points: [{"lat": .., "lon": ..} یا {"name": ..}, ...] (حداکثر MAX_BATCH_POINTS)
+      - startdate, enddate
+    پاسخ به ترتیب نقاط ورودی: input, station, forecasts
+    """
+    @swagger_auto_schema(request_body=BatchForecastRequestSerializer)
+
+    def post(self, request):
+        serializer = BatchForecastRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        points = serializer.validated_data['points']
+        start_date = serializer.validated_data['startdate']
+        end_date = serializer.validated_data['enddate']
+
+        # همه‌ی ایستگاه‌ها با هم پیدا و همه‌ی پیش‌بینی‌ها با یک کوئری خوانده می‌شوند
+        station_ids = resolve_batch_stations(WaveStationModel, points)
+        unique_ids = {station_id for station_id in station_ids if station_id is not None}
+        grouped = forecasts_by_station(WaveForecastModel, unique_ids, WAVE_VARIABLES, start_date, end_date)
+
+        return Response(batch_forecast_response(WaveStationModel, points, station_ids, grouped), status=status.HTTP_200_OK)
+
 #------------------------------
 # Wave Archive API
 #------------------------------
@@ -143,6 +203,8 @@ class WaveArchiveView(APIView):
     '''
     API: get wave Archive based on station name or location (lat/lon) and forecast_time.
     '''
+    renderer_classes = STATION_RENDERER_CLASSES
+
     @swagger_auto_schema(
         manual_parameters=[
             openapi.Parameter('name', openapi.IN_QUERY, description="Station Name (e.g. Station_0)", type=openapi.TYPE_STRING, required=False),
@@ -150,8 +212,10 @@ class WaveArchiveView(APIView):
             openapi.Parameter('lon', openapi.IN_QUERY, description="Longitude (e.g. 54.78)", type=openapi.TYPE_NUMBER, required=False),
             openapi.Parameter('startdate', openapi.IN_QUERY, description="Start datetime (YYYY-MM-DDTHH:MM:SS)", type=openapi.TYPE_STRING, required=True),
             openapi.Parameter('enddate', openapi.IN_QUERY, description="End datetime (YYYY-MM-DDTHH:MM:SS)", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('format', openapi.IN_QUERY, description="'arrow' (Arrow IPC stream) or 'parquet'", type=openapi.TYPE_STRING, required=False),
     ])
 
+    @cycle_cached('wave')
     def get(self, request):
         name = request.query_params.get('name')
         lat = request.query_params.get('lat')
@@ -162,19 +226,17 @@ class WaveArchiveView(APIView):
         station = None
 
         if name:
-            try:
-                station = WaveStationModel.objects.get(name=name)
-            except WaveStationModel.DoesNotExist:
-                return Response({"error": "Station not found by name"}, status=status.HTTP_404_NOT_FOUND)
+            # نام از lookup ایستگاه‌ها؛ ایستگاهی که هنوز در lookup نیست از جدول خوانده می‌شود
+            station = get_station_resolver(WaveStationModel).station_id_by_name(name)
+            if station is None:
+                try:
+                    station = WaveStationModel.objects.get(name=name).pk
+                except WaveStationModel.DoesNotExist:
+                    return Response({"error": "Station not found by name"}, status=status.HTTP_404_NOT_FOUND)
 
         elif lat and lon:
             try:
-                point = Point(float(lon), float(lat), srid=4326)   
-                station = (
-                    WaveStationModel.objects.annotate(distance=Distance('location', point))
-                    .order_by('distance')
-                    .first()
-                ) 
+                station = get_station_resolver(WaveStationModel).nearest(float(lat), float(lon))
             except Exception:
                 return Response({"error": "Invalid coordinates"}, status=status.HTTP_400_BAD_REQUEST)
         else:
@@ -190,6 +252,12 @@ class WaveArchiveView(APIView):
             except Exception as e:
                 return Response({"error": f"{e}"}, status=status.HTTP_400_BAD_REQUEST)
 
+        output_format = binary_export_format(request)
+        if output_format:
+            if not arrow_available():
+                return Response({"error": "Arrow/Parquet output requires pyarrow on the server."}, status=501)
+            return arrow_streaming_response(forecasts, WAVE_VARIABLES, output_format)
+
         serializer = WaveArchiveSerializer(forecasts, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -202,7 +270,10 @@ class WaveArchiveBoundingBoxView(APIView):
       - min_lon, max_lon
       - start_date, end_date (ISO format)
     محدودیت: حداکثر اندازه محدوده = ۰.۵ درجه
+    کش: JSON تا STREAM_MIN_ROWS ردیف کش می‌شود؛ NDJSON، Arrow/Parquet و JSON بزرگ‌تر stream می‌شوند و کش نمی‌شوند
     """
+    renderer_classes = ARCHIVE_BBOX_RENDERER_CLASSES
+
     @swagger_auto_schema(
         manual_parameters=[
             openapi.Parameter('min_lat', openapi.IN_QUERY, description="Minimum Latitude (e.g. 24.56)", type=openapi.TYPE_NUMBER, required=False),
@@ -211,12 +282,14 @@ class WaveArchiveBoundingBoxView(APIView):
             openapi.Parameter('max_lon', openapi.IN_QUERY, description="Maximum Longitude (e.g. 71.78)", type=openapi.TYPE_NUMBER, required=False),
             openapi.Parameter('start_date', openapi.IN_QUERY, description="Start datetime (YYYY-MM-DDTHH:MM:SS)", type=openapi.TYPE_STRING, required=True),
             openapi.Parameter('end_date', openapi.IN_QUERY, description="End datetime (YYYY-MM-DDTHH:MM:SS)", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('format', openapi.IN_QUERY, description="'columnar': station metadata once and [station][time] arrays per variable; 'arrow' (Arrow IPC stream) or 'parquet'; 'ndjson' (one row per line, streamed)", type=openapi.TYPE_STRING, required=False),
     ],
     responses={
             400 : 'The size of the Boundin box should not be more than 0.5 degrees.'
         }
     )
 
+    @cycle_cached('wave')
     def get(self, request):
         try:
             min_lat = float(request.query_params.get('min_lat'))
@@ -237,10 +310,10 @@ class WaveArchiveBoundingBoxView(APIView):
     
         stations = WaveStationModel.objects.filter(location__within=bbox)
 
-        print(f"start: {start_date}, end: {end_date}")
-        print(f"min lat: {min_lat}, max lat: {max_lat}, min lon: {min_lon}, max lon: {max_lon}")
-        print(f"min: {WaveArchiveModel.objects.order_by('forecast_time').first().forecast_time}")
-        print(f"max: {WaveArchiveModel.objects.order_by('-forecast_time').first().forecast_time}")
+        # print(f"start: {start_date}, end: {end_date}")
+        # print(f"min lat: {min_lat}, max lat: {max_lat}, min lon: {min_lon}, max lon: {max_lon}")
+        # print(f"min: {WaveArchiveModel.objects.order_by('forecast_time').first().forecast_time}")
+        # print(f"max: {WaveArchiveModel.objects.order_by('-forecast_time').first().forecast_time}")
 
         if not stations.exists():
             return Response({"error": "No stations found in bounding box."}, status=404)
@@ -250,11 +323,25 @@ class WaveArchiveBoundingBoxView(APIView):
         forecasts = WaveArchiveModel.objects.filter(
             station__in=stations,
             forecast_time__range=(start_date, end_date)
-        ).select_related('station').order_by('station_id', 'forecast_time')
+        ).order_by('station_id', 'forecast_time')
         # print('forecasts',forecasts)
 
         if not forecasts.exists():
             return Response({"error": "No forecast data found in time and location range."}, status=404)
 
+        output_format = binary_export_format(request)
+        if output_format:
+            if not arrow_available():
+                return Response({"error": "Arrow/Parquet output requires pyarrow on the server."}, status=501)
+            return arrow_streaming_response(forecasts, WAVE_VARIABLES, output_format)
+
+        if is_columnar(request):
+            return Response(columnar_bbox(stations, forecasts, WAVE_VARIABLES), status=200)
+
+        # NDJSON و JSON‌های بزرگ با cursor سمت سرور و به صورت تکه‌ای ارسال می‌شوند (و کش نمی‌شوند)
+        stream_format = json_stream_format(request)
+        if should_stream(forecasts, stream_format):
+            return json_streaming_response(forecasts, WAVE_VARIABLES, ndjson=stream_format == 'ndjson', include_id=False)
+
         serializer = WaveArchiveSerializer(forecasts, many=True)
         return Response(serializer.data, status=200)
\ No newline at end of file
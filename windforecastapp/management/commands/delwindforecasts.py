@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from windforecastapp.models import WindForecastModel
+from common.utils.response_cache import bump_cycle_version
 import time
 
 
@@ -11,6 +12,7 @@ class Command(BaseCommand):
         try:
             start = time.time()
             WindForecastModel.objects.all().delete()
+            bump_cycle_version('wind')
             self.stdout.write(
                 self.style.SUCCESS(f"delete wind forecast data successfully and execution time: {time.time() - start:.2f} s")
             )
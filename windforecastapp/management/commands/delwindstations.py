@@ -1,5 +1,8 @@
 from django.core.management.base import BaseCommand
-from windforecastapp.models import WindStationModel
+from windforecastapp.models import WindStationModel, WindArchiveModel
+from common.utils.station_resolver import bump_station_version
+from common.utils.response_cache import bump_cycle_version
+from common.utils.archive_load import reset_archive_watermark
 import time
 
 
@@ -11,6 +14,9 @@ class Command(BaseCommand):
         try:
             start = time.time()
             WindStationModel.objects.all().delete()
+            bump_station_version(WindStationModel)
+            bump_cycle_version('wind')
+            reset_archive_watermark(WindArchiveModel)
             self.stdout.write(
                 self.style.SUCCESS(f"delete wind stations successfully and execution time: {time.time() - start:.2f} s")
             )
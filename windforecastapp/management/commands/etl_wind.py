@@ -1,6 +1,7 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 # from windforecastapp.utils.move_wind_data_to_db import move_to_db
-from windforecastapp.utils.ETL_wind_utils import etl_netcdf_to_db
+from windforecastapp.utils.ETL_wind_utils import etl_netcdf_to_db, etl_wrf_files_to_db
+from windforecastapp.utils.prepare_wind import WRF_FILE_PATTERN
 import time
 
 
@@ -9,20 +10,73 @@ import time
 
 # تنظیمات
 CHUNK_SIZE = 500000  # تعداد ردیف forecast در هر batch (قابل تنظیم)
-STATION_BATCH = 5000  # batch برای bulk_create ایستگاه‌ها
+NC_PATH = 'D:\\project\\TotalDB\\TOTALDB_CYCLES\\wind\\gfs.2025081012\\merged_nc_file.nc'
+
+def load_mode(options):
+    if options['bulk']:
+        return 'bulk'
+    return 'swap' if options['swap'] else 'truncate'
+
 
 class Command(BaseCommand):
     help = "Load wind data from netCDF into DB using CopyMapping (chunked, memory-safe)."
 
-    # def add_arguments(self, parser):
-    #     parser.add_argument('nc_path', type=str, help='Path to merged_nc_file.nc')
-    #     parser.add_argument('--chunk_size', type=int, default=CHUNK_SIZE)
+    def add_arguments(self, parser):
+        parser.add_argument('--nc-path', type=str, default=NC_PATH, help='Path to merged_nc_file.nc')
+        parser.add_argument(
+            '--time-block', type=int, default=None,
+            help='Stream the file this many time steps at a time instead of loading it whole'
+        )
+        parser.add_argument(
+            '--copy-format', choices=['csv', 'binary'], default='csv',
+            help='COPY through CopyMapping CSV text (default) or PostgreSQL binary format'
+        )
+        parser.add_argument(
+            '--swap', action='store_true',
+            help='Load the forecast into a staging table and swap it in instead of TRUNCATE + reload'
+        )
+        parser.add_argument(
+            '--bulk', action='store_true',
+            help='As --swap, checking uniqueness once and building the staging indexes afterwards with '
+                 'parallel workers and a larger maintenance_work_mem '
+                 '(ETL_MAINTENANCE_WORK_MEM / ETL_PARALLEL_INDEX_WORKERS)'
+        )
+        parser.add_argument(
+            '--storage', choices=['rows', 'series', 'both'], default='rows',
+            help='Forecast layout: one row per (station, time), one real[] row per station (series), or both'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Load the forecast rows with this many processes into a staging table (implies --swap)'
+        )
+        parser.add_argument(
+            '--wrf-dir', type=str, default=None,
+            help='Load the raw WRF *.mean.nc files of this folder directly, without merged_nc_file.nc (row layout only)'
+        )
+        parser.add_argument('--pattern', type=str, default=WRF_FILE_PATTERN, help='Glob of the WRF files in --wrf-dir')
 
     def handle(self, *args, **options):
+        if options['workers'] > 1 and options['storage'] == 'series':
+            raise CommandError('--workers > 1 cannot be combined with --storage series (use rows or both)')
         try:
             start = time.time()
-            nc_path = 'D:\\project\\TotalDB\\TOTALDB_CYCLES\\wind\\gfs.2025081012\\merged_nc_file.nc'
-            etl_netcdf_to_db(nc_path)
+            if options['wrf_dir']:
+                etl_wrf_files_to_db(
+                    options['wrf_dir'],
+                    pattern=options['pattern'],
+                    time_block=options['time_block'] or 1,
+                    copy_format=options['copy_format'],
+                    load_mode=load_mode(options),
+                )
+            else:
+                etl_netcdf_to_db(
+                    options['nc_path'],
+                    time_block=options['time_block'],
+                    copy_format=options['copy_format'],
+                    load_mode=load_mode(options),
+                    storage=options['storage'],
+                    workers=options['workers'],
+                )
             self.stdout.write(
                 self.style.SUCCESS(f"execution time: {time.time() - start:.2f} s")
             )
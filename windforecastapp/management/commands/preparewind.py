@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from windforecastapp.utils.prepare_wind import prepare_wind_cycle, WRF_FILE_PATTERN, DEFAULT_COMPLEVEL
+from windforecastapp.utils.ETL_wind_utils import etl_netcdf_to_db
+import time
+
+
+class Command(BaseCommand):
+    help = "Merge the WRF *.mean.nc files of a cycle into one compressed, time-chunked netCDF (replaces merge_nc_files_v01.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input-dir', type=str, required=True, help='Folder with the WRF output files of the cycle')
+        parser.add_argument('--pattern', type=str, default=WRF_FILE_PATTERN, help='Glob of the WRF files in --input-dir')
+        parser.add_argument(
+            '--output', type=str, default=None,
+            help='Path of the merged file (default: merged_nc_file.nc in --input-dir)'
+        )
+        parser.add_argument('--complevel', type=int, default=DEFAULT_COMPLEVEL, help='zlib compression level (1-9)')
+        parser.add_argument(
+            '--load', action='store_true',
+            help='Load the merged file into the database afterwards (time-block streaming ETL)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = time.time()
+            output_path, steps = prepare_wind_cycle(
+                options['input_dir'],
+                output_path=options['output'],
+                pattern=options['pattern'],
+                complevel=options['complevel'],
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"wrote {output_path} ({steps} time steps) in {time.time() - start:.2f} s")
+            )
+            if options['load']:
+                etl_netcdf_to_db(output_path, time_block=1)
+                self.stdout.write(
+                    self.style.SUCCESS(f"execution time: {time.time() - start:.2f} s")
+                )
+        except Exception as e:
+            self.stderr.write(
+            self.style.ERROR(f'exception in prepare wind files:{e}')
+            )
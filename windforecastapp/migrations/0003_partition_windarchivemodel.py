@@ -0,0 +1,96 @@
+# Converts the wind archive into a table range-partitioned by forecast_time.
+
+import re
+import pandas as pd
+from django.db import migrations
+
+# تبدیل جدول در خود migration است تا تغییرات بعدی کد برنامه رفتار آن را عوض نکند
+PARTITION_MONTHS = 1
+_INDEXDEF_RE = re.compile(r'^CREATE (UNIQUE )?INDEX (\S+) ON (ONLY )?(\S+) USING ')
+
+
+def _month_start(ts):
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return pd.Timestamp(year=ts.year, month=ts.month, day=1)
+
+
+def _table_definitions(cursor, table_name):
+    cursor.execute("""
+        SELECT ic.relname, pg_get_indexdef(i.indexrelid), c.contype
+        FROM pg_index i
+        JOIN pg_class ic ON ic.oid = i.indexrelid
+        LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+        WHERE i.indrelid = %s::regclass
+        ORDER BY c.contype NULLS LAST, ic.relname;
+    """, [f'"{table_name}"'])
+    indexes = [(name, contype or 'index', indexdef) for name, indexdef, contype in cursor.fetchall()]
+    cursor.execute("""
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f';
+    """, [f'"{table_name}"'])
+    return indexes + [(name, 'f', definition) for name, definition in cursor.fetchall()]
+
+
+def convert_to_partitioned(cursor, table_name, column):
+    """
+    Rebuild `table_name` as a table partitioned by month on `column`, keeping
+    its rows, id sequence, indexes and foreign keys. The primary key becomes
+    (id, column), since a partitioned primary key must contain the partition key.
+    """
+    old_table = f"{table_name}_unpartitioned"
+    definitions = _table_definitions(cursor, table_name)
+    cursor.execute(f'SELECT min("{column}"), max("{column}"), COALESCE(max(id), 0) FROM "{table_name}";')
+    min_time, max_time, max_id = cursor.fetchone()
+
+    cursor.execute(f'ALTER TABLE "{table_name}" RENAME TO "{old_table}";')
+    cursor.execute(f"""
+        CREATE TABLE "{table_name}"
+        (LIKE "{old_table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)
+        PARTITION BY RANGE ("{column}");
+    """)
+
+    if min_time is not None:
+        start, last = _month_start(min_time), _month_start(max_time)
+        while start <= last:
+            end = start + pd.DateOffset(months=PARTITION_MONTHS)
+            cursor.execute(f"""
+                CREATE TABLE "{table_name}_p{start:%Y%m}" PARTITION OF "{table_name}"
+                FOR VALUES FROM ('{start:%Y-%m-%d %H:%M:%S}+00') TO ('{end:%Y-%m-%d %H:%M:%S}+00');
+            """)
+            start = end
+        cursor.execute(f'INSERT INTO "{table_name}" SELECT * FROM "{old_table}";')
+    cursor.execute(f'DROP TABLE "{old_table}";')
+
+    cursor.execute(f'CREATE SEQUENCE "{table_name}_id_seq" START WITH {max_id + 1} OWNED BY "{table_name}".id;')
+    cursor.execute(f"""ALTER TABLE "{table_name}" ALTER COLUMN id SET DEFAULT nextval('"{table_name}_id_seq"');""")
+
+    for name, kind, definition in definitions:
+        if kind == 'p':
+            cursor.execute(f'ALTER TABLE "{table_name}" ADD CONSTRAINT "{name}" PRIMARY KEY (id, "{column}");')
+        elif kind == 'f':
+            cursor.execute(f'ALTER TABLE "{table_name}" ADD CONSTRAINT "{name}" {definition};')
+        else:
+            cursor.execute(_INDEXDEF_RE.sub(
+                lambda m: f'CREATE {m.group(1) or ""}INDEX "{name}" ON "{table_name}" USING ', definition
+            ))
+
+
+def partition_archive(apps, schema_editor):
+    WindArchiveModel = apps.get_model('windforecastapp', 'WindArchiveModel')
+    with schema_editor.connection.cursor() as cursor:
+        convert_to_partitioned(cursor, WindArchiveModel._meta.db_table, 'forecast_time')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('windforecastapp', '0002_rename_windforecas_locatio_b3c4c5_idx_location_gist_idx_and_more'),
+    ]
+
+    operations = [
+        # جدول partition شده برای Django همان مدل قبلی است؛ فقط ساختار فیزیکی عوض می‌شود
+        migrations.RunPython(partition_archive, migrations.RunPython.noop),
+    ]
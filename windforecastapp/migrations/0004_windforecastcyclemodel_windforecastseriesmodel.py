@@ -0,0 +1,54 @@
+# Adds the wide-row forecast layout: one cycle row holding the time axis and
+# one row per (station, cycle) with each variable as a real[] over that axis.
+
+import common.fields
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('windforecastapp', '0003_partition_windarchivemodel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WindForecastCycleModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cycle_time', models.DateTimeField(help_text='First forecast time of the cycle', unique=True, verbose_name='cycle_time')),
+                ('forecast_times', django.contrib.postgres.fields.ArrayField(base_field=models.DateTimeField(), size=None, verbose_name='forecast_times')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created_at')),
+            ],
+            options={
+                'verbose_name': 'wind forecast cycle',
+                'verbose_name_plural': 'wind forecast cycles',
+            },
+        ),
+        migrations.CreateModel(
+            name='WindForecastSeriesModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('temperature', django.contrib.postgres.fields.ArrayField(base_field=common.fields.RealField(), help_text='Temperature at 2 meters above ground', size=None, verbose_name='temperature')),
+                ('ws10', django.contrib.postgres.fields.ArrayField(base_field=common.fields.RealField(), size=None, verbose_name='ws10')),
+                ('wind_direction', django.contrib.postgres.fields.ArrayField(base_field=common.fields.RealField(), size=None, verbose_name='wind_direction')),
+                ('wg10', django.contrib.postgres.fields.ArrayField(base_field=common.fields.RealField(), size=None, verbose_name='wg10')),
+                ('ws50', django.contrib.postgres.fields.ArrayField(base_field=common.fields.RealField(), size=None, verbose_name='ws50')),
+                ('wg50', django.contrib.postgres.fields.ArrayField(base_field=common.fields.RealField(), size=None, verbose_name='wg50')),
+                ('cycle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='windforecastapp.windforecastcyclemodel', verbose_name='cycle')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecast_series', to='windforecastapp.windstationmodel', verbose_name='wind station')),
+            ],
+            options={
+                'verbose_name': 'wind forecast series',
+                'verbose_name_plural': 'wind forecast series',
+                'constraints': [models.UniqueConstraint(fields=('station', 'cycle'), name='unique_station_cycle_series')],
+            },
+        ),
+        # ردیف ~۳KB است؛ بدون این تنظیم آرایه‌ها به TOAST می‌روند و خواندن یک نقطه چند صفحه می‌شود
+        migrations.RunSQL(
+            'ALTER TABLE "windforecastapp_windforecastseriesmodel" SET (toast_tuple_target = 8160);',
+            'ALTER TABLE "windforecastapp_windforecastseriesmodel" RESET (toast_tuple_target);',
+        ),
+    ]
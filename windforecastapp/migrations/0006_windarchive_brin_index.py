@@ -0,0 +1,43 @@
+# Replaces the archive B-tree indexes with a BRIN index on forecast_time; the
+# (station, forecast_time) unique constraint is the only B-tree left.
+
+import django.db.models.deletion
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('windforecastapp', '0005_unique_windarchive_station_time'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='windarchivemodel',
+            name='windforecas_forecas_de314a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='windarchivemodel',
+            name='windforecas_station_ad63bb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='windarchivemodel',
+            name='windforecas_forecas_ba1aee_idx',
+        ),
+        # ایندکس station_id توسط ایندکس یکتای (station, forecast_time) پوشش داده می‌شود
+        migrations.AlterField(
+            model_name='windarchivemodel',
+            name='station',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='windforecastapp.windstationmodel', verbose_name='wind station'),
+        ),
+        # ایندکسی که ETL قبلاً خودش می‌ساخت
+        migrations.RunSQL(
+            'DROP INDEX IF EXISTS "windarchive_forecast_time_idx";',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='windarchivemodel',
+            index=django.contrib.postgres.indexes.BrinIndex(autosummarize=True, fields=['forecast_time'], name='windarchive_time_brin'),
+        ),
+    ]
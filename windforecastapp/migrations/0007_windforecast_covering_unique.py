@@ -0,0 +1,29 @@
+# Makes the (station, forecast_time) unique index of the forecast table covering,
+# so station + time range queries are answered by index-only scans.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('windforecastapp', '0006_windarchive_brin_index'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='windforecastmodel',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='windforecastmodel',
+            constraint=models.UniqueConstraint(fields=('station', 'forecast_time'), include=('id', 'temperature', 'ws10', 'wind_direction', 'wg10', 'ws50', 'wg50'), name='unique_wind_forecast_station_time'),
+        ),
+        # ایندکس station_id توسط ایندکس یکتای (station, forecast_time) پوشش داده می‌شود
+        migrations.AlterField(
+            model_name='windforecastmodel',
+            name='station',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='windforecastapp.windstationmodel', verbose_name='wind station'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
 from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.indexes import BrinIndex
+from django.contrib.postgres.fields import ArrayField
 from postgres_copy import CopyManager
 from django.utils.translation import gettext_lazy as _
+from common.fields import RealField
 
 # Create your models here.
 
@@ -43,7 +46,7 @@ class WindStationModel(models.Model):
 
 class WindForecastModel(models.Model):
     # اگه مدل stations پاک شه داده های این جدولم پاک میشه
-    station = models.ForeignKey(WindStationModel, on_delete=models.CASCADE, verbose_name=_("wind station"), related_name="forecasts")
+    station = models.ForeignKey(WindStationModel, on_delete=models.CASCADE, verbose_name=_("wind station"), related_name="forecasts", db_index=False)
     forecast_time = models.DateTimeField(verbose_name=_("forecast_time"))
     temperature = models.FloatField(verbose_name=_("temperature"), help_text=_("Temperature at 2 meters above ground"))
     ws10 = models.FloatField(verbose_name=_("ws10"))
@@ -55,7 +58,14 @@ class WindForecastModel(models.Model):
     objects = CopyManager()    
     
     class Meta:
-        unique_together = ("station", "forecast_time")
+        # ایندکس یکتا همه‌ی ستون‌ها را INCLUDE می‌کند تا کوئری ایستگاه + بازه‌ی زمانی index-only باشد
+        constraints = [
+            models.UniqueConstraint(
+                fields=["station", "forecast_time"],
+                include=["id", "temperature", "ws10", "wind_direction", "wg10", "ws50", "wg50"],
+                name="unique_wind_forecast_station_time",
+            )
+        ]
         indexes = [
             models.Index(fields=["forecast_time", "station"]),
         ]
@@ -64,7 +74,7 @@ class WindForecastModel(models.Model):
         return f"{self.station.name} - {self.forecast_time}"
 
 class WindArchiveModel(models.Model):
-    station = models.ForeignKey(WindStationModel, on_delete=models.CASCADE, verbose_name=_("wind station"), related_name='archive')
+    station = models.ForeignKey(WindStationModel, on_delete=models.CASCADE, verbose_name=_("wind station"), related_name='archive', db_index=False)
     forecast_time = models.DateTimeField(verbose_name=_("forecast_time"))
     temperature = models.FloatField(verbose_name=_("temperature"), help_text=_("Temperature at 2 meters above ground"))
     ws10 = models.FloatField(verbose_name=_("ws10"))
@@ -80,9 +90,54 @@ class WindArchiveModel(models.Model):
     class Meta:
         verbose_name = _("wind archive")
         verbose_name_plural = _("wind archives")
+        # شامل کلید partition است؛ ETL با ON CONFLICT DO NOTHING روی آن append می‌کند
+        constraints = [
+            models.UniqueConstraint(fields=["station", "forecast_time"], name="unique_wind_archive_station_time")
+        ]
+        # ایندکس یکتای بالا همان B-tree روی (station, forecast_time) است؛
+        # برای بازه‌های زمانی BRIN کافی است چون ردیف‌ها به ترتیب زمان append می‌شوند
         indexes = [
-            models.Index(fields=["forecast_time", "station"]),
-            models.Index(fields=["station"]),
-            models.Index(fields=["forecast_time"]),
+            BrinIndex(fields=["forecast_time"], name="windarchive_time_brin", autosummarize=True),
         ]
     objects = CopyManager()    
+
+
+class WindForecastCycleModel(models.Model):
+    # محور زمان هر سیکل فقط یک بار ذخیره می‌شود
+    cycle_time = models.DateTimeField(unique=True, verbose_name=_("cycle_time"), help_text=_("First forecast time of the cycle"))
+    forecast_times = ArrayField(models.DateTimeField(), verbose_name=_("forecast_times"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("created_at"))
+
+    class Meta:
+        verbose_name = _("wind forecast cycle")
+        verbose_name_plural = _("wind forecast cycles")
+
+    def __str__(self):
+        return f"{self.cycle_time} ({len(self.forecast_times)} steps)"
+
+
+class WindForecastSeriesModel(models.Model):
+    """
+    Wide-row layout of WindForecastModel: one row per (station, cycle) with
+    each variable as a real[] aligned with cycle.forecast_times.
+    """
+    cycle = models.ForeignKey(WindForecastCycleModel, on_delete=models.CASCADE, verbose_name=_("cycle"), related_name="series")
+    station = models.ForeignKey(WindStationModel, on_delete=models.CASCADE, verbose_name=_("wind station"), related_name="forecast_series")
+    temperature = ArrayField(RealField(), verbose_name=_("temperature"), help_text=_("Temperature at 2 meters above ground"))
+    ws10 = ArrayField(RealField(), verbose_name=_("ws10"))
+    wind_direction = ArrayField(RealField(), verbose_name=_("wind_direction"))
+    wg10 = ArrayField(RealField(), verbose_name=_("wg10"))
+    ws50 = ArrayField(RealField(), verbose_name=_("ws50"))
+    wg50 = ArrayField(RealField(), verbose_name=_("wg50"))
+
+    objects = CopyManager()
+
+    class Meta:
+        verbose_name = _("wind forecast series")
+        verbose_name_plural = _("wind forecast series")
+        constraints = [
+            models.UniqueConstraint(fields=["station", "cycle"], name="unique_station_cycle_series")
+        ]
+
+    def __str__(self):
+        return f"{self.station_id} - {self.cycle_id}"
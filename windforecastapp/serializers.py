@@ -1,12 +1,11 @@
 from rest_framework import serializers
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
+from common.serializers import StationLookupSerializer
 from .models import WindStationModel, WindForecastModel, WindArchiveModel
 
 
-class WindForecastSerializer(serializers.ModelSerializer):
-    station_name = serializers.CharField(source='station.name', read_only=True)# چون در این فیلد ما کلید خارجی داریم و فیلد با نام station هست پس میگیم از station فقط name رو نمایش بده
-    latitude = serializers.SerializerMethodField()
-    longitude = serializers.SerializerMethodField()
+class WindForecastSerializer(StationLookupSerializer):
+    # station_name/latitude/longitude از lookup ایستگاه‌ها، بدون join
 
     class Meta:
         model = WindForecastModel
@@ -20,18 +19,10 @@ class WindForecastSerializer(serializers.ModelSerializer):
             'wg10', 'ws50', 'wg50'
 
         ]
-        
-    def get_latitude(self, obj):
-        return obj.station.location.y
 
-    def get_longitude(self, obj):
-        return obj.station.location.x
 
-
-class WindArchiveSerializer(serializers.ModelSerializer):
-    station_name = serializers.CharField(source='station.name', read_only=True)# چون در این فیلد ما کلید خارجی داریم و فیلد با نام station هست پس میگیم از station فقط name رو نمایش بده
-    latitude = serializers.SerializerMethodField()
-    longitude = serializers.SerializerMethodField()
+class WindArchiveSerializer(StationLookupSerializer):
+    # station_name/latitude/longitude از lookup ایستگاه‌ها، بدون join
     # point = serializers.SerializerMethodField()
 
     class Meta:
@@ -46,13 +37,6 @@ class WindArchiveSerializer(serializers.ModelSerializer):
             'wg10', 'ws50', 'wg50'
         ]
 
-    def get_latitude(self, obj):
-        return obj.station.location.y
-
-    def get_longitude(self, obj):
-        return obj.station.location.x
-        
-
     # def get_point(self, obj):
     #     return {
     #         "lat": obj.station.location.y,
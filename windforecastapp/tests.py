@@ -1,3 +1,114 @@
-from django.test import TestCase
+from unittest import mock
+import numpy as np
+import pandas as pd
+import xarray as xr
+from django.test import SimpleTestCase
+
+from windforecastapp.utils.ETL_wind_utils import (
+    NC_VARIABLES, iter_time_blocks, time_block_to_frame, drop_duplicate_times,
+    grid_to_station_frame, grid_stations, etl_netcdf_to_db, etl_netcdf_to_db_parallel,
+)
 
 # Create your tests here.
+
+
+def wind_dataset(times, lat=(30.0, 30.5), lon=(50.0, 50.5, 51.0)):
+    """Small (time, lat, lon) dataset with every NC variable; values encode their position."""
+    times = pd.to_datetime(list(times)).values
+    shape = (times.size, len(lat), len(lon))
+    base = np.arange(np.prod(shape), dtype=np.float32).reshape(shape)
+    data_vars = {
+        var: (('time', 'lat', 'lon'), base + 1000 * offset)
+        for offset, var in enumerate(NC_VARIABLES)
+    }
+    return xr.Dataset(data_vars, coords={'time': times, 'lat': list(lat), 'lon': list(lon)})
+
+
+class TimeBlockTests(SimpleTestCase):
+
+    def setUp(self):
+        self.ds = wind_dataset(pd.date_range('2025-01-01', periods=5, freq='h'))
+        self.station_ids = np.arange(1, 7)
+
+    def test_blocks_cover_every_time_once(self):
+        blocks = list(iter_time_blocks(self.ds, 2))
+        self.assertEqual([block.sizes['time'] for block in blocks], [2, 2, 1])
+        times = np.concatenate([block['time'].values for block in blocks])
+        np.testing.assert_array_equal(times, self.ds['time'].values)
+
+    def test_block_larger_than_dataset(self):
+        blocks = list(iter_time_blocks(self.ds, 100))
+        self.assertEqual(len(blocks), 1)
+        self.assertEqual(blocks[0].sizes['time'], 5)
+
+    def test_frame_rows_are_time_major(self):
+        block = next(iter_time_blocks(self.ds, 2))
+        frame = time_block_to_frame(block, self.station_ids)
+
+        self.assertEqual(len(frame), 2 * self.station_ids.size)
+        np.testing.assert_array_equal(frame['station_id'], np.tile(self.station_ids, 2))
+        np.testing.assert_array_equal(frame['forecast_time'], np.repeat(block['time'].values, 6))
+
+    def test_frame_matches_to_dataframe(self):
+        block = next(iter_time_blocks(self.ds, 3))
+        frame = time_block_to_frame(block, self.station_ids)
+
+        # to_dataframe() روی (time, lat, lon) همان ترتیب ردیف‌ها را می‌دهد
+        expected = block[list(NC_VARIABLES)].to_dataframe().rename(columns=NC_VARIABLES)
+        for column in NC_VARIABLES.values():
+            np.testing.assert_array_equal(frame[column].values, expected[column].values)
+
+
+class DropDuplicateTimesTests(SimpleTestCase):
+
+    def test_unique_times_are_untouched(self):
+        ds = wind_dataset(pd.date_range('2025-01-01', periods=4, freq='h'))
+        self.assertIs(drop_duplicate_times(ds), ds)
+
+    def test_keeps_first_occurrence_in_original_order(self):
+        # هم‌پوشانی دو فایل merge شده: ساعت ۰۱ و ۰۲ دو بار آمده‌اند
+        times = ['2025-01-01 00:00', '2025-01-01 01:00', '2025-01-01 02:00',
+                 '2025-01-01 01:00', '2025-01-01 02:00', '2025-01-01 03:00']
+        ds = wind_dataset(times)
+        result = drop_duplicate_times(ds)
+
+        np.testing.assert_array_equal(
+            result['time'].values, pd.to_datetime(['2025-01-01 00:00', '2025-01-01 01:00',
+                                                  '2025-01-01 02:00', '2025-01-01 03:00']).values
+        )
+        np.testing.assert_array_equal(result['T2'].values, ds['T2'].isel(time=[0, 1, 2, 5]).values)
+
+
+class StationFrameTests(SimpleTestCase):
+
+    def test_station_major_rows_match_sorted_time_major_rows(self):
+        ds = wind_dataset(pd.date_range('2025-01-01', periods=4, freq='h'))
+        stations = grid_stations(ds['lat'].values, ds['lon'].values)
+        station_ids = stations['station_id'].values
+
+        frame = grid_to_station_frame(ds, station_ids)
+        expected = time_block_to_frame(ds, station_ids).sort_values(
+            ['station_id', 'forecast_time'], kind='stable'
+        ).reset_index(drop=True)
+
+        pd.testing.assert_frame_equal(frame, expected)
+
+    def test_grid_stations_are_lat_major_from_one(self):
+        stations = grid_stations(np.array([30.0, 30.5]), np.array([50.0, 50.5, 51.0]))
+        np.testing.assert_array_equal(stations['station_id'], np.arange(1, 7))
+        np.testing.assert_array_equal(stations['lat'], np.repeat([30.0, 30.5], 3))
+        np.testing.assert_array_equal(stations['lon'], np.tile([50.0, 50.5, 51.0], 2))
+
+
+class ParallelLoadArgumentTests(SimpleTestCase):
+
+    def test_series_storage_is_not_loaded_with_workers(self):
+        with self.assertRaises(ValueError):
+            etl_netcdf_to_db('merged_nc_file.nc', storage='series', workers=4)
+
+    def test_dataset_without_time_steps_loads_nothing(self):
+        ds = wind_dataset([])
+        with mock.patch('windforecastapp.utils.ETL_wind_utils.xr.open_dataset', return_value=ds), \
+                mock.patch('windforecastapp.utils.ETL_wind_utils.insert_new_stations') as insert_new_stations:
+            self.assertIsNone(etl_netcdf_to_db_parallel('merged_nc_file.nc', workers=4))
+        insert_new_stations.assert_not_called()
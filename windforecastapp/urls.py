@@ -15,9 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.urls import path
+from common.views import ResponseCacheStatsView
 from .views import (
     WindForecastView, 
     WindForecastBoundingBoxView,
+    WindForecastBatchView,
     WindArchiveView,
     WindArchiveBoundingBoxView
     )
@@ -25,6 +27,8 @@ from .views import (
 urlpatterns = [
     path('windforecast/station/', WindForecastView.as_view(), name='windforecast'),
     path('windforecast/bbox/', WindForecastBoundingBoxView.as_view(), name='windforecastbbox'),
+    path('windforecast/batch/', WindForecastBatchView.as_view(), name='windforecastbatch'),
     path('windarchive/station/', WindArchiveView.as_view(), name='windarchive'),
     path('windarchive/bbox/', WindArchiveBoundingBoxView.as_view(), name='windarchivebbox'),
+    path('cache/stats/', ResponseCacheStatsView.as_view(cache_app='wind'), name='windcachestats'),
 ]
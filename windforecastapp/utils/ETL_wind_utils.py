@@ -1,12 +1,29 @@
 import gc
+import itertools
 import logging
 import io
+import numpy as np
 import pandas as pd
 import xarray as xr
 from django.db import transaction, connection
 from postgres_copy import CopyMapping
-from django.contrib.gis.geos import Point
-from windforecastapp.models import WindStationModel, WindForecastModel, WindArchiveModel
+from common.utils.binary_copy import copy_frame_binary, copy_arrays_binary
+from common.utils.station_registry import sync_stations
+from common.utils.staging import (
+    create_staging_table, copy_frame_csv, publish_staging_table, STATION_TIME_ORDER, STAGING_LOAD_MODES
+)
+from common.utils.parallel_load import run_parallel
+from common.utils.partitions import ensure_partitions
+from common.utils.maintenance import vacuum_table, mark_unordered, reorganize_forecast
+from windforecastapp.utils.prepare_wind import WRF_FILE_PATTERN, list_wrf_files, iter_wrf_cycle
+from common.utils.archive_load import (
+    get_archive_watermark, rows_after_watermark, archive_window,
+    create_archive_staging_table, publish_archive_staging, append_archive,
+)
+from common.utils.response_cache import bump_cycle_version
+from windforecastapp.models import (
+    WindStationModel, WindForecastModel, WindArchiveModel, WindForecastCycleModel, WindForecastSeriesModel
+)
 
 
 # ----------- logging --------------------
@@ -22,25 +39,78 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------
 
 CHUNK_SIZE = 500000
-STATION_BATCH = 10000
 
-def ensure_index_exists(table_name, index_name, index_type, column_name):
+FORECAST_MAPPING = {
+    'station_id': 'station_id',
+    'forecast_time': 'forecast_time',
+    'temperature': 'temperature',
+    'ws10': 'ws10',
+    'wind_direction': 'wind_direction',
+    'wg10': 'wg10',
+    'ws50': 'ws50',
+    'wg50': 'wg50',
+}
+
+# متغیرهای فایل nc -> ستون‌های WindForecastModel
+NC_VARIABLES = {
+    'T2': 'temperature',
+    'WS10': 'ws10',
+    'wind_direction': 'wind_direction',
+    'WG10': 'wg10',
+    'WS50': 'ws50',
+    'WG50': 'wg50',
+}
+
+
+def copy_dataframe_chunks(model, df, mapping, copy_format='csv', table_name=None):
+    for start in range(0, len(df), CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, len(df))
+        if copy_format == 'binary':
+            copy_frame_binary(model, df.iloc[start:end], mapping, table_name)
+            continue
+        if table_name and table_name != model._meta.db_table:
+            copy_frame_csv(model, df.iloc[start:end], mapping, table_name)
+            continue
+
+        chunk = df.iloc[start:end].copy()
+        if chunk['forecast_time'].dtype.kind in ('M', 'm'):
+            chunk['forecast_time'] = chunk['forecast_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
+
+        csv_buffer = io.StringIO()
+        chunk.to_csv(csv_buffer, index=False)
+        csv_buffer.seek(0)
+        CopyMapping(model, csv_buffer, mapping).save()
+        csv_buffer.close()
+        del chunk, csv_buffer
+        gc.collect()
+
+
+def prepare_forecast_table(load_mode):
+    """
+    'truncate': empty WindForecastModel in place (readers see an empty table
+    until the load commits). 'swap': load into an unlogged staging table that
+    replaces the live one in finish_forecast_table(). 'bulk': as 'swap', with
+    the staging indexes built in parallel with a larger maintenance_work_mem.
+    """
+    if load_mode in STAGING_LOAD_MODES:
+        return create_staging_table(WindForecastModel)
+
     with connection.cursor() as cursor:
-        cursor.execute(f"""
-            DO $$
-            BEGIN
-                IF NOT EXISTS (
-                    SELECT 1 FROM pg_indexes
-                    WHERE tablename = '{table_name}'
-                    AND indexname = '{index_name}'
-                ) THEN
-                    EXECUTE 'CREATE INDEX {index_name} ON "{table_name}" USING {index_type} ({column_name})';
-                END IF;
-            END$$;
-        """)
+        cursor.execute(f'TRUNCATE TABLE "{WindForecastModel._meta.db_table}" RESTART IDENTITY CASCADE;') #CASCADE ینی اگه جدول فارن کی هم داشته باشه خالی میشه
+    logger.info("WindForecastModel truncated successfully.")
+    return WindForecastModel._meta.db_table
+
 
+def finish_forecast_table(load_mode, forecast_table, order_by=None):
+    # با order_by ردیف‌های جدول staging قبل از ساخت ایندکس‌ها مرتب می‌شوند
+    if load_mode in STAGING_LOAD_MODES:
+        publish_staging_table(WindForecastModel, forecast_table, order_by, bulk=load_mode == 'bulk')
+    elif order_by:
+        # truncate: جدول اصلی به ترتیب زمان نوشته شده؛ manage_indexes آن را دوباره مرتب می‌کند
+        mark_unordered(WindForecastModel)
 
-def ensure_btree_index(table_name, index_name, column_name):
+
+def ensure_index_exists(table_name, index_name, index_type, column_name):
     with connection.cursor() as cursor:
         cursor.execute(f"""
             DO $$
@@ -50,18 +120,12 @@ def ensure_btree_index(table_name, index_name, column_name):
                     WHERE tablename = '{table_name}'
                     AND indexname = '{index_name}'
                 ) THEN
-                    EXECUTE 'CREATE INDEX {index_name} ON "{table_name}" ({column_name})';
+                    EXECUTE 'CREATE INDEX {index_name} ON "{table_name}" USING {index_type} ({column_name})';
                 END IF;
             END$$;
         """)
 
 
-def cluster_table_on_index(table_name, index_name):
-    with connection.cursor() as cursor:
-        cursor.execute(f'CLUSTER "{table_name}" USING {index_name};')
-        logger.info(f"Clustered table {table_name} using index {index_name}")
-
-
 def periodic_reindex(index_name, days_threshold=7):
     try:
         with connection.cursor() as cursor:
@@ -80,56 +144,399 @@ def periodic_reindex(index_name, days_threshold=7):
         logger.exception(f"Error in periodic REINDEX for {index_name}: {e}")
 
 
-def etl_netcdf_to_db(nc_path):
-    logger.info(f"Opening dataset: {nc_path}")
-    ds = xr.open_dataset(nc_path)
+def insert_new_stations(stations_df):
+    try:
+        return sync_stations(
+            WindStationModel,
+            stations_df['station_id'].to_numpy(),
+            stations_df['lat'].to_numpy(),
+            stations_df['lon'].to_numpy(),
+            name_prefix='station_',
+        )
+    except Exception as e:
+        logger.exception(f"Error creating/inserting stations: {e}")
+        return 0
+
+
+def manage_indexes():
+    # مدیریت ایندکس‌ها و ریندکس و vacuum (به جای CLUSTER جدول ایستگاه‌ها، forecast فقط در صورت نیاز مرتب می‌شود)
+    station_table = WindStationModel._meta.db_table
+    forecast_table = WindForecastModel._meta.db_table
+
+    try:
+        ensure_index_exists(station_table, 'windstation_location_gist', 'GIST', 'location')
+
+        # فقط وقتی مجموعه‌ی ایستگاه‌ها عوض شده یا load به ترتیب زمان نوشته باشد
+        reorganize_forecast(WindForecastModel, WindStationModel)
+
+        # visibility map برای index-only scan روی ایندکس covering
+        vacuum_table(forecast_table)
+
+        # periodic_reindex('windstation_location_gist', days_threshold=7)
+
+    except Exception as e:
+        logger.exception(f"Error managing indexes, reorganizing, reindexing or vacuuming: {e}")
 
-    logger.info("Converting dataset to DataFrame...")
-    df = ds.to_dataframe().reset_index()
-    df = df.drop_duplicates(subset=['lat', 'lon', 'time'])
-    logger.info(f"DataFrame shape after drop_duplicates: {df.shape}")
 
-    # ساخت station_id بر اساس lat/lon
-    df['station_id'] = pd.factorize(list(zip(df['lat'], df['lon'])))[0] + 1
+def grid_stations(lat, lon):
+    """
+    Station table for a (lat, lon) grid, numbered the same way as the
+    factorize() over the time-major DataFrame: lat-major, starting at 1.
+    """
+    lat_grid, lon_grid = np.meshgrid(lat, lon, indexing='ij')
+    return pd.DataFrame({
+        'station_id': np.arange(1, lat_grid.size + 1),
+        'lat': lat_grid.ravel(),
+        'lon': lon_grid.ravel(),
+    })
 
-    # استخراج ایستگاه‌ها
-    stations_df = df[['station_id', 'lat', 'lon']].drop_duplicates().sort_values('station_id').reset_index(drop=True)
+
+def iter_time_blocks(ds, time_block):
+    for start in range(0, ds.sizes['time'], time_block):
+        yield ds.isel(time=slice(start, start + time_block))
+
+
+def time_block_to_frame(block, station_ids):
+    # ردیف‌ها به ترتیب (time, lat, lon)، بدون to_dataframe روی کل فایل
+    times = block['time'].values
+    frame = {
+        'station_id': np.tile(station_ids, times.size),
+        'forecast_time': np.repeat(times, station_ids.size),
+    }
+    for var, column in NC_VARIABLES.items():
+        frame[column] = block[var].transpose('time', 'lat', 'lon').values.ravel()
+    return pd.DataFrame(frame)
+
+
+def grid_to_station_frame(ds, station_ids):
+    """
+    Rows of the whole dataset in (station, time) order by construction:
+    each variable is transposed to (lat, lon, time), so no to_dataframe(),
+    factorize or sort over the full row count is needed.
+    """
+    times = ds['time'].values
+    frame = {
+        'station_id': np.repeat(station_ids, times.size),
+        'forecast_time': np.tile(times, station_ids.size),
+    }
+    for var, column in NC_VARIABLES.items():
+        frame[column] = ds[var].transpose('lat', 'lon', 'time').values.ravel()
+    return pd.DataFrame(frame)
+
+
+def drop_duplicate_times(ds):
+    # ساعت‌های تکراری (هم‌پوشانی فایل‌های merge شده) فقط یک بار خوانده می‌شوند
+    _, first_index = np.unique(ds['time'].values, return_index=True)
+    if first_index.size != ds.sizes['time']:
+        logger.info(f"Dropping {ds.sizes['time'] - first_index.size} duplicated time steps")
+        ds = ds.isel(time=np.sort(first_index))
+    return ds
+
+
+def copy_forecast_series(ds, station_ids):
+    """
+    Replace the stored cycle of WindForecastSeriesModel with the one in `ds`:
+    one row per station, each variable a real[] over the time axis, copied
+    in binary straight from the (time, lat, lon) arrays, a block of lat rows
+    at a time. `station_ids` are numbered like grid_stations() (lat-major).
+
+    The previous cycle is DELETEd rather than TRUNCATEd: DELETE takes only a
+    ROW EXCLUSIVE lock, so readers keep getting the old cycle until the load
+    transaction commits instead of queueing behind an ACCESS EXCLUSIVE lock.
+    """
+    cycle_table = WindForecastCycleModel._meta.db_table
+    series_table = WindForecastSeriesModel._meta.db_table
+    with connection.cursor() as cursor:
+        # فضای ردیف‌های حذف شده را autovacuum برمی‌گرداند
+        cursor.execute(f'DELETE FROM "{series_table}";')
+        cursor.execute(f'DELETE FROM "{cycle_table}";')
+
+    times = pd.DatetimeIndex(ds['time'].values).tz_localize('UTC')
+    cycle = WindForecastCycleModel.objects.create(cycle_time=times[0], forecast_times=list(times.to_pydatetime()))
+
+    n_time, n_lat, n_lon = ds.sizes['time'], ds.sizes['lat'], ds.sizes['lon']
+    lat_block = max(1, CHUNK_SIZE // (n_time * n_lon))
+    fields = {name: WindForecastSeriesModel._meta.get_field(name) for name in ['cycle', 'station', *NC_VARIABLES.values()]}
+    for start in range(0, n_lat, lat_block):
+        block = ds.isel(lat=slice(start, start + lat_block))
+        ids = station_ids[start * n_lon:(start + block.sizes['lat']) * n_lon]
+        columns = {
+            fields['cycle'].column: (np.full(ids.size, cycle.pk, dtype=np.int64), fields['cycle'].db_type(connection)),
+            fields['station'].column: (ids, fields['station'].db_type(connection)),
+        }
+        for var, name in NC_VARIABLES.items():
+            # (time, lat, lon) -> (station, time)
+            values = block[var].transpose('time', 'lat', 'lon').values.reshape(n_time, ids.size).T
+            columns[fields[name].column] = (values.astype(np.float32), fields[name].db_type(connection))
+        copy_arrays_binary(series_table, columns)
+    logger.info(f"Inserted forecast series: {station_ids.size} stations x {n_time} steps")
+    return cycle
+
+
+def copy_time_blocks(blocks, station_ids, forecast_table, archive_table, archive_end, watermark, copy_format='csv'):
+    """
+    COPY each (time, lat, lon) block into `forecast_table` (skipped when
+    None) and its hours after `watermark` up to `archive_end` into
+    `archive_table`. Returns the number of forecast rows copied.
+    """
+    forecast_rows = 0
+    for block in blocks:
+        block_df = time_block_to_frame(block, station_ids)
+        if forecast_table is not None:
+            copy_dataframe_chunks(WindForecastModel, block_df, FORECAST_MAPPING, copy_format, forecast_table)
+            forecast_rows += len(block_df)
+
+        archive_df = rows_after_watermark(block_df[block_df['forecast_time'] <= archive_end], watermark)
+        if len(archive_df):
+            copy_dataframe_chunks(WindArchiveModel, archive_df, FORECAST_MAPPING, copy_format, archive_table)
+
+        logger.info(f"Inserted time block {pd.Timestamp(block['time'].values[0])} ({len(block_df)} rows)")
+        del block, block_df, archive_df
+    return forecast_rows
+
+
+def etl_netcdf_to_db_streaming(nc_path, time_block=1, copy_format='csv', load_mode='truncate', storage='rows'):
+    """
+    Same load as etl_netcdf_to_db, but the dataset is read and copied
+    `time_block` time steps at a time, so peak memory depends on the block
+    size rather than on the length of the cycle.
+
+    `storage` selects the forecast layout: 'rows' (WindForecastModel),
+    'series' (WindForecastSeriesModel) or 'both'. The archive is always rows,
+    appended after its high-water mark.
+    """
+    logger.info(f"Opening dataset (streaming, time_block={time_block}, copy_format={copy_format}, storage={storage}): {nc_path}")
+    ds = drop_duplicate_times(xr.open_dataset(nc_path))
+
+    stations_df = grid_stations(ds['lat'].values, ds['lon'].values)
+    station_ids = stations_df['station_id'].to_numpy()
     logger.info(f"Unique stations: {len(stations_df)}")
 
+    insert_new_stations(stations_df)
+    del stations_df
+
+    # آرشیو ۱۲ ساعت اول
+    first_time = pd.Timestamp(ds['time'].values.min())
+    twelve_hours_later = first_time + pd.Timedelta(hours=12)
+    # partition‌های آرشیو قبل از تراکنش ساخته می‌شوند تا قفل جدول اصلی طول نکشد
+    ensure_partitions(WindArchiveModel._meta.db_table, first_time, twelve_hours_later)
+
+    write_rows = storage in ('rows', 'both')
+    forecast_rows = 0
+    archive_rows = 0
     try:
-        existing_coords_qs = WindStationModel.objects.values_list('location', flat=True)
-        existing_coords = set(existing_coords_qs)
-        new_station_objs = []
-        for _, row in stations_df.iterrows():
-            p = Point(row['lon'], row['lat'], srid=4326)
-            if p not in existing_coords:
-                new_station_objs.append(WindStationModel(
-                    id=int(row['station_id']),
-                    location=p,
-                    name=f"station_{int(row['station_id'])}"
-                ))
-        if new_station_objs:
-            logger.info(f"Inserting {len(new_station_objs)} new stations...")
-            with transaction.atomic():
-                for i in range(0, len(new_station_objs), STATION_BATCH):
-                    batch = new_station_objs[i:i + STATION_BATCH]
-                    WindStationModel.objects.bulk_create(batch, ignore_conflicts=True, batch_size=STATION_BATCH)
-            del new_station_objs
-            gc.collect()
-        else:
-            logger.info("No new stations to insert.")
+        with transaction.atomic():
+            if storage in ('series', 'both'):
+                copy_forecast_series(ds, station_ids)
+
+            # فقط ساعت‌های جدیدتر از آخرین زمان آرشیو شده؛ اجرای دوباره‌ی یک سیکل چیزی اضافه نمی‌کند
+            watermark = get_archive_watermark(WindArchiveModel)
+            archive_table = create_archive_staging_table(WindArchiveModel, list(FORECAST_MAPPING))
+
+            forecast_table = None
+            if write_rows:
+                forecast_table = prepare_forecast_table(load_mode)
+                blocks = iter_time_blocks(ds, time_block)
+            else:
+                # بدون جدول ردیفی فقط ساعت‌های آرشیو خوانده می‌شوند
+                times = ds['time'].values
+                archive_mask = times <= np.datetime64(twelve_hours_later)
+                if watermark is not None:
+                    archive_mask &= times > np.datetime64(watermark)
+                blocks = iter_time_blocks(ds.isel(time=np.flatnonzero(archive_mask)), time_block)
+
+            forecast_rows = copy_time_blocks(
+                blocks, station_ids, forecast_table, archive_table, twelve_hours_later, watermark, copy_format
+            )
+            archive_rows = publish_archive_staging(WindArchiveModel, archive_table, list(FORECAST_MAPPING))
+
+            if write_rows:
+                # بلوک‌ها به ترتیب زمان نوشته شده‌اند
+                finish_forecast_table(load_mode, forecast_table, STATION_TIME_ORDER)
+
+        # بعد از commit: پاسخ‌های کش شده‌ی سیکل قبلی دیگر استفاده نمی‌شوند
+        bump_cycle_version('wind')
+
     except Exception as e:
-        logger.exception(f"Error creating/inserting stations: {e}")
+        logger.exception(f"Error inserting forecast/archive data: {e}")
+    finally:
+        ds.close()
+
+    logger.info(f"Forecast rows: {forecast_rows}")
+    logger.info(f"Archive rows appended (first 12h): {archive_rows}")
+
+    manage_indexes()
+
+    logger.info("ETL completed successfully.")
+
+
+def etl_wrf_files_to_db(input_dir, pattern=WRF_FILE_PATTERN, time_block=1, copy_format='csv', load_mode='truncate'):
+    """
+    Load a cycle straight from the per-hour WRF output files, without the
+    merged netCDF: each file is read (prepare_wind.iter_wrf_cycle), its
+    derived wind variables computed, and its rows COPYed before the next
+    file is opened. Row layout only; the series layout needs the whole
+    time axis per station.
+    """
+    paths = list_wrf_files(input_dir, pattern)
+    if not paths:
+        raise FileNotFoundError(f"No {pattern} files in {input_dir}")
+    logger.info(f"Loading {len(paths)} WRF files directly (time_block={time_block}, copy_format={copy_format}): {input_dir}")
+
+    # فایل‌ها به ترتیب زمان خوانده می‌شوند؛ اولین فایل شبکه و زمان شروع سیکل را می‌دهد
+    datasets = iter_wrf_cycle(paths)
+    first = next(datasets)
+    stations_df = grid_stations(first['lat'].values, first['lon'].values)
+    station_ids = stations_df['station_id'].to_numpy()
+    logger.info(f"Unique stations: {len(stations_df)}")
+
+    insert_new_stations(stations_df)
+    del stations_df
+
+    first_time = pd.Timestamp(first['time'].values[0])
+    twelve_hours_later = first_time + pd.Timedelta(hours=12)
+    ensure_partitions(WindArchiveModel._meta.db_table, first_time, twelve_hours_later)
+
+    blocks = (
+        block
+        for ds in itertools.chain([first], datasets)
+        for block in iter_time_blocks(ds, time_block)
+    )
+    forecast_rows = 0
+    archive_rows = 0
+    try:
+        with transaction.atomic():
+            watermark = get_archive_watermark(WindArchiveModel)
+            archive_table = create_archive_staging_table(WindArchiveModel, list(FORECAST_MAPPING))
+            forecast_table = prepare_forecast_table(load_mode)
+
+            forecast_rows = copy_time_blocks(
+                blocks, station_ids, forecast_table, archive_table, twelve_hours_later, watermark, copy_format
+            )
+            archive_rows = publish_archive_staging(WindArchiveModel, archive_table, list(FORECAST_MAPPING))
+
+            finish_forecast_table(load_mode, forecast_table, STATION_TIME_ORDER)
+
+        bump_cycle_version('wind')
+
+    except Exception as e:
+        logger.exception(f"Error inserting forecast/archive data: {e}")
+
+    logger.info(f"Forecast rows: {forecast_rows}")
+    logger.info(f"Archive rows appended (first 12h): {archive_rows}")
+
+    manage_indexes()
+
+    logger.info("ETL completed successfully.")
+
+
+def copy_time_steps_worker(nc_path, time_indices, time_block, staging_table, copy_format):
+    """Worker of etl_netcdf_to_db_parallel: COPY the given time steps into the staging table."""
+    ds = drop_duplicate_times(xr.open_dataset(nc_path))
+    try:
+        station_ids = grid_stations(ds['lat'].values, ds['lon'].values)['station_id'].to_numpy()
+        rows = 0
+        for block in iter_time_blocks(ds.isel(time=list(time_indices)), time_block):
+            block_df = time_block_to_frame(block, station_ids)
+            copy_dataframe_chunks(WindForecastModel, block_df, FORECAST_MAPPING, copy_format, staging_table)
+            rows += len(block_df)
+            del block, block_df
+        return rows
+    finally:
+        ds.close()
+
+
+def etl_netcdf_to_db_parallel(nc_path, workers, time_block=1, copy_format='csv', storage='rows', load_mode='swap'):
+    """
+    Row load of the forecast split by time steps over `workers` processes,
+    each with its own connection and COPY stream into an unlogged staging
+    table. The archive hours are then copied from the staging table and the
+    staging table is indexed ('bulk': with tuned parallel index builds) and
+    swapped in, in one transaction.
+    """
+    logger.info(f"Opening dataset (parallel, workers={workers}, time_block={time_block}, copy_format={copy_format}): {nc_path}")
+    ds = drop_duplicate_times(xr.open_dataset(nc_path))
+    if not ds.sizes['time']:
+        logger.warning(f"No time steps in {nc_path}, nothing to load")
+        ds.close()
+        return
+
+    stations_df = grid_stations(ds['lat'].values, ds['lon'].values)
+    station_ids = stations_df['station_id'].to_numpy()
+    insert_new_stations(stations_df)
+    del stations_df
+
+    first_time = pd.Timestamp(ds['time'].values.min())
+    twelve_hours_later = first_time + pd.Timedelta(hours=12)
+    ensure_partitions(WindArchiveModel._meta.db_table, first_time, twelve_hours_later)
+
+    # هر worker چند بلوک زمانی پشت سر هم می‌گیرد؛ تعداد کارها بیشتر از workerهاست تا بار پخش شود
+    steps = np.arange(ds.sizes['time'])
+    parts = [part.tolist() for part in np.array_split(steps, min(steps.size, workers * 4))]
+
+    staging_table = None
+    try:
+        # جدول staging باید commit شده باشد تا workerها آن را ببینند
+        staging_table = create_staging_table(WindForecastModel)
+        tasks = [(nc_path, part, time_block, staging_table, copy_format) for part in parts]
+        forecast_rows = sum(run_parallel(copy_time_steps_worker, tasks, workers))
+        logger.info(f"Forecast rows: {forecast_rows}")
+
+        with transaction.atomic():
+            if storage == 'both':
+                copy_forecast_series(ds, station_ids)
+            where, params = archive_window(twelve_hours_later, get_archive_watermark(WindArchiveModel))
+            archive_rows = publish_archive_staging(
+                WindArchiveModel, staging_table, list(FORECAST_MAPPING), where, params
+            )
+            logger.info(f"Archive rows appended (first 12h): {archive_rows}")
+            # workerها بلوک‌های زمانی را نوشته‌اند؛ جدول به ترتیب (station, time) بازنویسی می‌شود
+            publish_staging_table(WindForecastModel, staging_table, STATION_TIME_ORDER, bulk=load_mode == 'bulk')
+
+        bump_cycle_version('wind')
+
+    except Exception as e:
+        logger.exception(f"Error in parallel forecast/archive load: {e}")
+        if staging_table:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS "{staging_table}";')
+    finally:
+        ds.close()
+
+    manage_indexes()
+
+    logger.info("ETL completed successfully.")
+
+
+def etl_netcdf_to_db(nc_path, time_block=None, copy_format='csv', load_mode='truncate', storage='rows', workers=1):
+    if workers > 1 and storage == 'series':
+        # لایه‌ی series در یک پروسه نوشته می‌شود؛ workers فقط برای ردیف‌هاست
+        raise ValueError("workers > 1 needs storage 'rows' or 'both'; the series layout is loaded by one process")
+    if workers > 1:
+        return etl_netcdf_to_db_parallel(
+            nc_path, workers, time_block=time_block or 1, copy_format=copy_format, storage=storage,
+            load_mode='bulk' if load_mode == 'bulk' else 'swap',
+        )
+    if time_block or storage != 'rows':
+        return etl_netcdf_to_db_streaming(
+            nc_path, time_block=time_block or 1, copy_format=copy_format, load_mode=load_mode, storage=storage
+        )
+
+    logger.info(f"Opening dataset: {nc_path}")
+    ds = drop_duplicate_times(xr.open_dataset(nc_path))
 
-    # DataFrame مربوط به forecast
-    forecast_df = df.drop(columns=['lat', 'lon']).rename(columns={
-        'time': 'forecast_time',
-        'T2': 'temperature',
-        'WS10': 'ws10',
-        'WG10': 'wg10',
-        'WS50': 'ws50',
-        'WG50': 'wg50'
-    }).sort_values(by=['station_id', 'forecast_time']).reset_index(drop=True)
+    # ایستگاه‌ها از محورهای شبکه (lat-major، مثل factorize قبلی)
+    stations_df = grid_stations(ds['lat'].values, ds['lon'].values)
+    station_ids = stations_df['station_id'].to_numpy()
+    logger.info(f"Unique stations: {len(stations_df)}")
+
+    insert_new_stations(stations_df)
+    del stations_df
+
+    # DataFrame مربوط به forecast، از همان ابتدا به ترتیب (station, time)
+    logger.info("Building forecast rows in (station, time) order...")
+    forecast_df = grid_to_station_frame(ds, station_ids)
+    ds.close()
 
     # آرشیو ۱۲ ساعت اول
     first_time = forecast_df['forecast_time'].min()
@@ -139,58 +546,29 @@ def etl_netcdf_to_db(nc_path):
     logger.info(f"Forecast rows: {len(forecast_df)}")
     logger.info(f"Archive rows (first 12h): {len(archive_df)}")
 
-    del df
-    gc.collect()
-
-    mapping = {
-        'station_id': 'station_id',
-        'forecast_time': 'forecast_time',
-        'temperature': 'temperature',
-        'ws10': 'ws10',
-        'wind_direction': 'wind_direction',
-        'wg10': 'wg10',
-        'ws50': 'ws50',
-        'wg50': 'wg50',
-    }
+    if len(archive_df):
+        ensure_partitions(WindArchiveModel._meta.db_table, first_time, archive_df['forecast_time'].max())
 
     try:
-        # پاک کردن داده‌های قبلی forecast با TRUNCATE
+        # پاک کردن داده‌های قبلی forecast با TRUNCATE یا load در جدول staging
         with transaction.atomic():
-            with connection.cursor() as cursor:
-                cursor.execute(f'TRUNCATE TABLE "{WindForecastModel._meta.db_table}" RESTART IDENTITY CASCADE;') #CASCADE ینی اگه جدول فارن کی هم داشته باشه خالی میشه
-            logger.info("WindForecastModel truncated successfully.")
+            forecast_table = prepare_forecast_table(load_mode)
 
             # درج forecast
             logger.info("Inserting forecast data...")
-            for start in range(0, len(forecast_df), CHUNK_SIZE):
-                end = min(start + CHUNK_SIZE, len(forecast_df))
-                chunk = forecast_df.iloc[start:end].copy()
-                if chunk['forecast_time'].dtype.kind in ('M', 'm'):
-                    chunk['forecast_time'] = chunk['forecast_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-
-                csv_buffer = io.StringIO()
-                chunk.to_csv(csv_buffer, index=False)
-                csv_buffer.seek(0)
-                CopyMapping(WindForecastModel, csv_buffer, mapping).save()
-                csv_buffer.close()
-                del chunk, csv_buffer
-                gc.collect()
-
-            # درج archive
-            logger.info("Inserting archive data...")
-            for start in range(0, len(archive_df), CHUNK_SIZE):
-                end = min(start + CHUNK_SIZE, len(archive_df))
-                chunk = archive_df.iloc[start:end].copy()
-                if chunk['forecast_time'].dtype.kind in ('M', 'm'):
-                    chunk['forecast_time'] = chunk['forecast_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-
-                csv_buffer = io.StringIO()
-                chunk.to_csv(csv_buffer, index=False)
-                csv_buffer.seek(0)
-                CopyMapping(WindArchiveModel, csv_buffer, mapping).save()
-                csv_buffer.close()
-                del chunk, csv_buffer
-                gc.collect()
+            copy_dataframe_chunks(WindForecastModel, forecast_df, FORECAST_MAPPING, copy_format, forecast_table)
+
+            # درج archive: فقط زمان‌های بعد از آخرین زمان آرشیو شده
+            logger.info("Appending archive data...")
+            append_archive(
+                WindArchiveModel, archive_df, list(FORECAST_MAPPING),
+                lambda frame, table: copy_dataframe_chunks(WindArchiveModel, frame, FORECAST_MAPPING, copy_format, table),
+            )
+
+            finish_forecast_table(load_mode, forecast_table)
+
+        # بعد از commit: پاسخ‌های کش شده‌ی سیکل قبلی دیگر استفاده نمی‌شوند
+        bump_cycle_version('wind')
 
     except Exception as e:
         logger.exception(f"Error inserting forecast/archive data: {e}")
@@ -198,23 +576,6 @@ def etl_netcdf_to_db(nc_path):
     del forecast_df, archive_df
     gc.collect()
 
-    # مدیریت ایندکس‌ها و کلستر و ریندکس
-    station_table = WindStationModel._meta.db_table
-    forecast_table = WindForecastModel._meta.db_table
-    archive_table = WindArchiveModel._meta.db_table
-
-    try:
-        ensure_index_exists(station_table, 'windstation_location_gist', 'GIST', 'location')
-        ensure_btree_index(forecast_table, 'windforecast_forecast_time_idx', 'forecast_time')
-        ensure_btree_index(archive_table, 'windarchive_forecast_time_idx', 'forecast_time')
-
-        cluster_table_on_index(station_table, 'windstation_location_gist')
-
-        # periodic_reindex('windstation_location_gist', days_threshold=7)
-        # periodic_reindex('windforecast_forecast_time_idx', days_threshold=7)
-        # periodic_reindex('windarchive_forecast_time_idx', days_threshold=7)
-
-    except Exception as e:
-        logger.exception(f"Error managing indexes, clustering, or reindexing: {e}")
+    manage_indexes()
 
     logger.info("ETL completed successfully.")
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Station reads from the wide-row forecast layout (WindForecastSeriesModel).
+
+A point query reads the single (station, cycle) row and slices its arrays
+with the time axis stored on the cycle, instead of gathering one row per
+forecast time by index.
+"""
+import pandas as pd
+from common.utils.station_resolver import get_station_resolver
+from windforecastapp.models import WindStationModel, WindForecastCycleModel, WindForecastSeriesModel
+
+SERIES_VARIABLES = ['temperature', 'ws10', 'wind_direction', 'wg10', 'ws50', 'wg50']
+
+
+def _utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+
+def _series_rows(series, times, first, last):
+    columns = [getattr(series, name)[first:last] for name in SERIES_VARIABLES]
+    rows = []
+    for offset, forecast_time in enumerate(times[first:last]):
+        row = {'forecast_time': forecast_time.strftime('%Y-%m-%dT%H:%M:%SZ')}
+        for name, values in zip(SERIES_VARIABLES, columns):
+            value = values[offset]
+            row[name] = None if value != value else value
+        rows.append(row)
+    return rows
+
+
+def forecast_series_by_station(station_ids, start_date=None, end_date=None):
+    """
+    {station id: [{'forecast_time', variables...}]} from the latest stored
+    cycle, one row read per station. Raises ValueError for unparsable dates.
+    """
+    cycle = WindForecastCycleModel.objects.order_by('-cycle_time').first()
+    if cycle is None:
+        return {}
+
+    times = pd.DatetimeIndex(cycle.forecast_times).tz_convert('UTC')
+    first, last = 0, len(times)
+    if start_date and end_date:
+        first = times.searchsorted(_utc(start_date), side='left')
+        last = times.searchsorted(_utc(end_date), side='right')
+
+    return {
+        series.station_id: _series_rows(series, times, first, last)
+        for series in WindForecastSeriesModel.objects.filter(cycle=cycle, station_id__in=list(station_ids))
+    }
+
+
+def forecast_series_rows(station, start_date=None, end_date=None):
+    """
+    Forecast of `station` (instance or id) between start_date and end_date
+    in the WindForecastSerializer layout (without the row id, which this
+    layout does not have). Raises ValueError for unparsable dates.
+    """
+    station_id = getattr(station, 'pk', station)
+    rows = forecast_series_by_station([station_id], start_date, end_date).get(station_id)
+    if not rows:
+        return []
+
+    info = get_station_resolver(WindStationModel).station_info(station_id)
+    if info is None:
+        station = WindStationModel.objects.get(pk=station_id)
+        info = station.name, station.location.y, station.location.x
+    station_fields = dict(zip(('station_name', 'latitude', 'longitude'), info))
+    return [{**station_fields, **row} for row in rows]
@@ -0,0 +1,159 @@
+"""
+Preprocessing of the per-hour WRF output (*.mean.nc) of a wind cycle.
+
+Replaces merge_nc_files_v01.py, which loaded every file, kept them all in a
+list and concatenated them in memory. Here the files are visited in time
+order with only one of them (a few time steps) in memory at a time: the
+derived wind variables are computed for that chunk and appended to a
+single NetCDF4 file, compressed and chunked one time step per chunk
+(time-major), which is the layout the time-block ETL reads.
+"""
+import os
+import glob
+import logging
+import numpy as np
+import pandas as pd
+import xarray as xr
+import netCDF4
+
+logger = logging.getLogger(__name__)
+
+WRF_FILE_PATTERN = '*.mean.nc'
+MERGED_FILE_NAME = 'merged_nc_file.nc'
+OUTPUT_VARIABLES = ['u10', 'v10', 'T2', 'WS10', 'wind_direction', 'WG10', 'WS50', 'WG50']
+TIME_UNITS = 'seconds since 1970-01-01 00:00:00'
+DEFAULT_COMPLEVEL = 4
+
+
+def derive_wind_variables(u10, v10):
+    """Derived wind fields, with the formulas of merge_nc_files_v01.create_mini_dataset_fun."""
+    ws10 = np.sqrt(u10 ** 2 + v10 ** 2)
+    ws50 = ws10 * 1.1488
+    return {
+        'WS10': ws10,
+        'wind_direction': (np.arctan2(-u10, -v10) * 180 / np.pi) % 360,
+        'WG10': ws10 * 1.3,
+        'WS50': ws50,
+        'WG50': ws50 * 1.3,
+    }
+
+
+def list_wrf_files(folder, pattern=WRF_FILE_PATTERN):
+    return glob.glob(os.path.join(folder, pattern))
+
+
+def _file_times(ds):
+    return pd.to_datetime(np.atleast_1d(ds['XTIME'].values))
+
+
+def _first_time(path):
+    # فقط XTIME خوانده می‌شود، نه خود داده‌ها
+    with xr.open_dataset(path) as ds:
+        return _file_times(ds)[0]
+
+
+def read_wrf_file(path):
+    """
+    One WRF file as a (time, lat, lon) Dataset with u10, v10, T2 and the
+    derived wind variables (float32), named as the wind ETL expects.
+    """
+    with xr.open_dataset(path) as ds:
+        times = _file_times(ds)
+        xlat = ds['XLAT'].values
+        xlon = ds['XLONG'].values
+        lat = xlat.reshape(-1, *xlat.shape[-2:])[0][:, 0]
+        lon = xlon.reshape(-1, *xlon.shape[-2:])[0][0, :]
+        shape = (times.size, lat.size, lon.size)
+        u10 = ds['U10'].values.astype(np.float32).reshape(shape)
+        v10 = ds['V10'].values.astype(np.float32).reshape(shape)
+        t2 = ds['T2'].values.astype(np.float32).reshape(shape)
+
+    variables = {'u10': u10, 'v10': v10, 'T2': t2, **derive_wind_variables(u10, v10)}
+    return xr.Dataset(
+        {name: (['time', 'lat', 'lon'], variables[name]) for name in OUTPUT_VARIABLES},
+        coords={'time': times, 'lat': lat, 'lon': lon},
+    )
+
+
+def iter_wrf_cycle(paths):
+    """
+    Yield the files of a cycle as read_wrf_file() Datasets in time order,
+    one at a time. Time steps already yielded by an earlier file are dropped.
+    """
+    last_time = None
+    for path in sorted(paths, key=_first_time):
+        ds = read_wrf_file(path)
+        if last_time is not None:
+            ds = ds.isel(time=np.flatnonzero(ds['time'].values > last_time))
+        if not ds.sizes['time']:
+            logger.info(f"Skipping {path}: no new time steps")
+            continue
+        last_time = ds['time'].values[-1]
+        logger.info(f"Read {os.path.basename(path)} ({ds.sizes['time']} time steps)")
+        yield ds
+
+
+def _create_output(path, first, complevel):
+    nc = netCDF4.Dataset(path, 'w', format='NETCDF4')
+    n_lat, n_lon = first.sizes['lat'], first.sizes['lon']
+    nc.createDimension('time', None)
+    nc.createDimension('lat', n_lat)
+    nc.createDimension('lon', n_lon)
+
+    time_var = nc.createVariable('time', 'i8', ('time',))
+    time_var.units = TIME_UNITS
+    time_var.calendar = 'standard'
+    nc.createVariable('lat', 'f8', ('lat',))[:] = first['lat'].values
+    nc.createVariable('lon', 'f8', ('lon',))[:] = first['lon'].values
+
+    for name in OUTPUT_VARIABLES:
+        # هر chunk یک گام زمانی کامل است؛ خواندن بلوک‌های زمانی بدون باز کردن chunkهای دیگر
+        nc.createVariable(
+            name, 'f4', ('time', 'lat', 'lon'),
+            zlib=True, complevel=complevel, shuffle=True, chunksizes=(1, n_lat, n_lon),
+        )
+    return nc
+
+
+def write_wind_netcdf(datasets, output_path, complevel=DEFAULT_COMPLEVEL):
+    """
+    Append the (time, lat, lon) `datasets` to one compressed NetCDF4 file,
+    written under a temporary name and renamed when complete.
+    Returns the number of time steps written.
+    """
+    partial_path = f"{output_path}.part"
+    nc = None
+    written = 0
+    try:
+        for ds in datasets:
+            if nc is None:
+                nc = _create_output(partial_path, ds, complevel)
+            n_time = ds.sizes['time']
+            seconds = (ds['time'].values - np.datetime64('1970-01-01T00:00:00')) // np.timedelta64(1, 's')
+            nc['time'][written:written + n_time] = seconds.astype(np.int64)
+            for name in OUTPUT_VARIABLES:
+                nc[name][written:written + n_time] = ds[name].values
+            written += n_time
+    except Exception:
+        if nc is not None:
+            nc.close()
+            os.remove(partial_path)
+        raise
+    if nc is not None:
+        nc.close()
+
+    if not written:
+        raise ValueError("No WRF time steps to write")
+    os.replace(partial_path, output_path)
+    logger.info(f"Wrote {output_path} ({written} time steps)")
+    return written
+
+
+def prepare_wind_cycle(input_dir, output_path=None, pattern=WRF_FILE_PATTERN, complevel=DEFAULT_COMPLEVEL):
+    """Merge the WRF files of `input_dir` into one NetCDF; returns (output path, time steps)."""
+    paths = list_wrf_files(input_dir, pattern)
+    if not paths:
+        raise FileNotFoundError(f"No {pattern} files in {input_dir}")
+    output_path = output_path or os.path.join(input_dir, MERGED_FILE_NAME)
+    logger.info(f"Preparing {len(paths)} WRF files from {input_dir}")
+    return output_path, write_wind_netcdf(iter_wrf_cycle(paths), output_path, complevel)